@@ -1,22 +1,46 @@
 # -*- coding: utf-8 -*-
+import contextvars
+import datetime
 import logging
-import uuid
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import Iterator, List
+from urllib.parse import urlsplit
 
 import requests
 
-from b2c2.api_client.errors import get_api_error_by_code
+from b2c2.api_client.base import BaseB2C2Client
+from b2c2.api_client.batch import (
+    DEFAULT_RFQ_CONCURRENCY,
+    RFQBatch,
+    RFQResult,
+    build_rfq_results,
+)
+from b2c2.api_client.coalescing import SingleFlight, get_request_key
+from b2c2.api_client.errors import PaginationOffsetTooBig
 from b2c2.api_client.exceptions import (
     ConnectionLost,
+    DeadlineExceeded,
     Forbidden,
-    HTTPException,
     NotFound,
-    get_http_exception_by_code,
+)
+from b2c2.api_client.execution import (
+    DEFAULT_ORDER_VALIDITY,
+    UNKNOWN_OUTCOME_ERRORS,
+    ExecutionResult,
+    OrderResubmission,
+    prepare_resubmission,
+)
+from b2c2.api_client.metrics import HEDGE_SENT, HEDGE_WON
+from b2c2.api_client.pagination import DEFAULT_PAGE_SIZE, HistoryPaginator
+from b2c2.api_client.session import (
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE,
+    create_session,
 )
 from b2c2.common.models import (
     Balance,
     FillOrKillOrderRequest,
-    Instrument,
     MarketOrderRequest,
     OrderResponse,
     RFQResponse,
@@ -26,81 +50,265 @@ from b2c2.common.models import (
 logger = logging.getLogger(__name__)
 
 
-class B2C2Client:
-    API_URL = "https://api.uat.b2c2.net"
-
-    def __init__(self, token, api_url=None):
-        self.token = token
-        self.api_url = api_url or self.API_URL
-        self.headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Token {self.token}",
-        }
-
-    def _raise_api_errors(self, response_json):
-        if isinstance(response_json, list):
-            # returned data, no problem.
-            return
-        errors = response_json.get("errors")
-        if not errors:
-            return
-
-        api_errors = []
-        for error in errors:
-            code = error.get("code")
-            message = error.get("message")
-            error = get_api_error_by_code(code)(message)
-            api_errors.append(error)
-            # Log all the API errors sent.
-            logger.error(error)
-
-        # Raise the first error
-        raise api_errors[0]
-
-    def _make_request(self, url: str, method="get", data: dict = None):
-        """
-        requests.get/post wrapper handling exceptions
+class B2C2Client(BaseB2C2Client):
+    def __init__(
+        self,
+        token,
+        api_url=None,
+        pool_connections=DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        keep_alive=True,
+        prewarm=False,
+        session=None,
+        codec=None,
+        rate_limits=None,
+        retry_policy=None,
+        trusted=False,
+        rfq_cache=None,
+        metrics=None,
+        timeout=None,
+        hedging=None,
+        coalescing=None,
+        health=None,
+        resubmit_orders=False,
+    ):
+        """
+        :param token: API token
+        :param api_url: base URL of the API, defaults to `API_URL`
+        :param pool_connections: number of host connection pools to cache
+        :param pool_maxsize: maximum number of connections kept per host
+        :param keep_alive: whether to keep connections open between requests
+        :param prewarm: if True, opens a connection to the server right away
+        :param codec: JSON codec or codec name, defaults to the fastest installed
+        :param rate_limits: `RateLimiter` or request budgets by endpoint group,
+        requests are not paced if not given
+        :param retry_policy: `RetryPolicy` applied to 429 and 503 responses
+        :param trusted: if True, skips the validation of the API responses
+        :param rfq_cache: `QuoteCache` (or True) to reuse unexpired quotes
+        :param metrics: `ClientMetrics` recording the requests, can be shared
+        :param timeout: `Timeouts` or (connect, read[, total]) tuple in seconds
+        :param hedging: `HedgePolicy` (or True) to hedge the slow GET requests
+        :param coalescing: `SingleFlight` (or True) sharing the result of the
+        concurrent identical GET requests, optionally caching it for a short time
+        :param health: `ConnectionHealth` caching the liveness of the connection
+        :param resubmit_orders: if True, orders without response are looked up and
+        sent again only if the server does not have them
+        :param session: a `requests.Session` to use instead of creating one
+        """
+        super().__init__(
+            token,
+            api_url=api_url,
+            codec=codec,
+            rate_limits=rate_limits,
+            retry_policy=retry_policy,
+            trusted=trusted,
+            rfq_cache=rfq_cache,
+            metrics=metrics,
+            timeout=timeout,
+            hedging=hedging,
+            health=health,
+            resubmit_orders=resubmit_orders,
+        )
+        self.session = session or create_session(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            keep_alive=keep_alive,
+        )
+        self.single_flight = SingleFlight() if coalescing is True else coalescing
+        # Threads waiting for the first attempt of the hedged requests.
+        self._hedge_executor = None
+        if self.hedge_policy is not None:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=pool_maxsize, thread_name_prefix="b2c2-hedge"
+            )
+        if prewarm:
+            self.prewarm()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Closes the pooled connections of the client."""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        # The metrics may be shared with clients still open.
+        self.metrics.remove_hooks(post=self.health.observe)
+        if self._owns_health:
+            self.health.stop()
+        self.session.close()
+
+    def prewarm(self):
+        """
+        Opens a connection to the server in advance so that the first real
+        request does not pay for the TCP and TLS handshakes.
+        :return: True if the connection could be established.
+        """
+        try:
+            self.session.head(
+                self.api_url,
+                headers=self.headers,
+                timeout=(self.timeouts.connect, self.timeouts.read),
+            )
+            return True
+        except requests.exceptions.RequestException as _:
+            logger.warning("Could not pre-warm the connection to %s", self.api_url)
+            return False
+
+    def _make_request(
+        self, url: str, method="get", data: dict = None, params: dict = None
+    ):
+        """
+        session.get/post wrapper handling exceptions
         :param url: URL to make request to
         :param method: "get" or "post"
         :param data: data to post
+        :param params: query string parameters
         :return: response in json format
         """
-        try:
+        with self.metrics.track(method, url) as info:
+            try:
+                if method not in ("get", "post"):
+                    logger.warning("Invalid request type:", method)
+                    return
+                body = self.codec.dumps(data) if method == "post" else None
+                info.request_size = len(body or b"")
+                response, sent, received = self._send(
+                    url, method=method, body=body, params=params
+                )
+                info.status_code = response.status_code
+                info.response_size = len(response.content or b"")
+                info.elapsed = received - sent
+                if isinstance(response.elapsed, datetime.timedelta):
+                    info.ttfb = response.elapsed.total_seconds()
+
+                if response.status_code == 403:
+                    logger.error("Forbidden. Check your credentials and IP")
+                    raise Forbidden()
+
+                response_json = self._decode_response(
+                    response.content, response.status_code
+                )
+                self._observe_server_time(
+                    sent, received, method, response, response_json
+                )
+                self._raise_api_errors(response_json)
+                response.raise_for_status()
+                return response_json
+            except requests.exceptions.HTTPError as exc:
+                self._raise_http_exception(response.status_code, exc=exc)
+            except requests.exceptions.ConnectionError as exc:
+                info.error = exc
+                logger.exception("Error Connecting Server")
+            except requests.exceptions.Timeout as exc:
+                info.error = exc
+                logger.exception("Timeout Error")
+            except requests.exceptions.RequestException as exc:
+                info.error = exc
+                logger.exception("Unknown error")
+
+    def _send(self, url: str, method="get", body: bytes = None, params: dict = None):
+        """
+        Sends the request, pacing it with the rate limiter and retrying the
+        throttled (429) or unavailable (503) responses, within the deadline of the
+        call.
+        :param url: URL to make request to
+        :param method: "get" or "post"
+        :param body: encoded data to post
+        :param params: query string parameters
+        :return: the last response received, with the `server_clock.clock()` times
+        it was sent and received at
+        :raise DeadlineExceeded: if the deadline passes before a response arrives
+        """
+        endpoint = urlsplit(url).path
+        expires_at = self.timeouts.get_expires_at()
+        attempt = 0
+        while True:
+            delay = self._get_rate_limit_delay(method, endpoint)
+            if not self._fits_deadline(expires_at, delay):
+                raise DeadlineExceeded()
+            if delay > 0:
+                time.sleep(delay)
+            sent = self.server_clock.clock()
             if method == "get":
-                response = requests.get(url, headers=self.headers)
-            elif method == "post":
-                response = requests.post(url, json=data, headers=self.headers)
-            else:
-                logger.warning("Invalid request type:", method)
-                return
-
-            if response.status_code == 403:
-                logger.error("Forbidden. Check your credentials and IP")
-                raise Forbidden()
-
-            self._raise_api_errors(response.json())
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as exc:
-            exception_class = get_http_exception_by_code(response.status_code)
-            if exception_class:
-                raise exception_class()
+                response = self._get_response(url, endpoint, params, expires_at)
             else:
-                raise HTTPException(exc=exc)
-        except requests.exceptions.ConnectionError as _:
-            logger.exception("Error Connecting Server")
-        except requests.exceptions.Timeout as _:
-            logger.exception("Timeout Error")
-        except requests.exceptions.RequestException as _:
-            logger.exception("Unknown error")
+                response = self.session.post(
+                    url,
+                    data=body,
+                    headers=self.headers,
+                    timeout=self.timeouts.for_attempt(expires_at),
+                )
+            received = self.server_clock.clock()
+            backoff = self._get_retry_backoff(
+                method, endpoint, response.status_code, response.headers, attempt
+            )
+            if backoff is None or not self._fits_deadline(expires_at, backoff):
+                return response, sent, received
+            time.sleep(backoff)
+            attempt += 1
+
+    def _get_response(self, url: str, endpoint: str, params, expires_at):
+        """
+        Sends a GET request. With a hedge policy, a second copy is sent if the
+        first one is not answered in time, and the first response received wins.
+        :param url: URL to make request to
+        :param endpoint: path of the request. Ex: /balance/
+        :param params: query string parameters
+        :param expires_at: deadline of the call
+        :return: response
+        """
+
+        def send():
+            return self.session.get(
+                url,
+                params=params,
+                headers=self.headers,
+                timeout=self.timeouts.for_attempt(expires_at),
+            )
+
+        hedge_delay = self._get_hedge_delay("get", endpoint)
+        if hedge_delay is None:
+            return send()
 
-    def _get(self, endpoint: str):
+        first = self._hedge_executor.submit(send)
+        done, _ = wait([first], timeout=hedge_delay)
+        # The hedged request must not be throttled: it is only worth sending now.
+        if done or not self._try_reserve_request("get", endpoint):
+            return first.result()
+
+        self.metrics.record_hedge("get", endpoint, HEDGE_SENT)
+        hedged = self._hedge_executor.submit(send)
+        error = None
+        for future in as_completed([first, hedged]):
+            try:
+                response = future.result()
+            except requests.exceptions.RequestException as exc:
+                error = exc
+                continue
+            if future is hedged:
+                self.metrics.record_hedge("get", endpoint, HEDGE_WON)
+            return response
+        raise error
+
+    def _get(self, endpoint: str, params: dict = None):
         """
-        Performs get request to the given endpoint.
+        Performs get request to the given endpoint. With coalescing, identical
+        requests made while one is in flight share its result.
         :param endpoint: Ex: /balance/
+        :param params: query string parameters
         :return: Response in json format
         """
-        return self._make_request(f"{self.api_url}{endpoint}", method="get")
+        url = f"{self.api_url}{endpoint}"
+        if self.single_flight is None:
+            return self._make_request(url, method="get", params=params)
+        return self.single_flight.do(
+            get_request_key(endpoint, params),
+            lambda: self._make_request(url, method="get", params=params),
+            expires_at=self.timeouts.get_expires_at(),
+        )
 
     def _post(self, endpoint: str, data: dict):
         """
@@ -109,7 +317,14 @@ class B2C2Client:
         :param data: Data dictionary
         :return:
         """
-        return self._make_request(f"{self.api_url}{endpoint}", method="post", data=data)
+        try:
+            return self._make_request(
+                f"{self.api_url}{endpoint}", method="post", data=data
+            )
+        finally:
+            # Orders change the balance and the history.
+            if self.single_flight is not None:
+                self.single_flight.clear()
 
     def get_balance(self):
         """
@@ -121,79 +336,204 @@ class B2C2Client:
 
     def list_instruments(self):
         """
-        Returns the instruments available for trading.
+        Returns the instruments available for trading and registers them in the
+        instrument registry.
         :return: A list of Instrument objects (with name attribute).
         """
         try:
             instruments = self._get("/instruments/")
-            return [Instrument(**instrument) for instrument in instruments]
+            return self.instrument_registry.load(instruments)
         except ConnectionError as exc:
             logger.exception("Could not connect to the server. Please try again later.")
         except:
             logger.exception("Could not perform the request. Please try again later.")
 
-    def get_rfq(self, instrument, side, quantity):
+    def get_rfq(self, instrument, side, quantity, use_cache=True):
         """
         Sends a `RFQ (request for quote)` and returns the response from the server
         :param instrument: Instrument object or instrument name (Ex: "BTCUSD.SPOT")
         :param side: "buy" or "sell"
         :param quantity: A numerical value to be handled as Decimal.
+        :param use_cache: whether an unexpired quote of the RFQ cache can be
+        returned instead, if the client has one
         :return: `RFQResponse` object
         """
-        if isinstance(instrument, Instrument):
-            instrument = instrument.name
-        data = dict(
-            instrument=instrument,
-            side=side,
-            quantity=str(quantity),
-            client_rfq_id=str(uuid.uuid4()),
-        )
+        if use_cache:
+            rfq = self._get_cached_rfq(instrument, side, quantity)
+            if rfq is not None:
+                return rfq
+        data = self._build_rfq_data(instrument, side, quantity)
+        rfq = self._request_rfq(data)
+        self._cache_rfq(instrument, side, quantity, rfq)
+        return rfq
+
+    def _request_rfq(self, data: dict):
+        """
+        Posts a RFQ payload built by `_build_rfq_data`.
+        :param data: RFQ payload
+        :return: `RFQResponse` object, None if the server could not be reached.
+        """
         response = self._post("/request_for_quote/", data=data)
         if not response:
             logger.error("Could not get RFQ", extra=dict(data=data))
             return None
-        return RFQResponse(**response)
+        return self._parse_model(RFQResponse, response)
+
+    def get_rfqs(self, rfq_requests, max_concurrency=DEFAULT_RFQ_CONCURRENCY):
+        """
+        Sends several RFQs concurrently, at most `max_concurrency` at a time.
+        :param rfq_requests: iterable of (instrument, side, quantity) tuples
+        :param max_concurrency: maximum number of RFQs in flight
+        :return: `RFQBatch` holding one `RFQResult` per request, in input order
+        """
+        results = build_rfq_results(self._build_rfq_data, rfq_requests)
 
-    def create_fok_order(self, fok_order_request: FillOrKillOrderRequest):
-        return self.create_order(fok_order_request.dict())
+        def request(result: RFQResult):
+            started = time.perf_counter()
+            try:
+                result.response = self._request_rfq(result.data)
+                if result.response is None:
+                    result.error = ConnectionLost()
+            except Exception as exc:
+                result.error = exc
+            result.elapsed = time.perf_counter() - started
 
-    def create_mkt_order(self, mkt_order_request: MarketOrderRequest):
-        return self.create_order(mkt_order_request.dict())
+        started = time.perf_counter()
+        if results:
+            # The threads run in copies of the caller's context, to share its
+            # deadline.
+            context = contextvars.copy_context()
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                list(
+                    executor.map(
+                        lambda result: context.copy().run(request, result), results
+                    )
+                )
+        return RFQBatch(results=results, elapsed=time.perf_counter() - started)
 
-    def create_order(self, order_data):
-        response = self._post("/order/", data=order_data)
-        if not response:
+    def execute_rfq(
+        self,
+        instrument,
+        side,
+        quantity,
+        slippage=None,
+        price_limit=None,
+        executing_unit=None,
+        validity=DEFAULT_ORDER_VALIDITY,
+        force_open=False,
+    ) -> ExecutionResult:
+        """
+        Requests a quote and sends a FOK order at its price as soon as it arrives,
+        if the price is acceptable. The order payload is built before the RFQ is
+        sent, so only its price is set between the two requests.
+        :param instrument: Instrument object or instrument name (Ex: "BTCUSD.SPOT")
+        :param side: "buy" or "sell"
+        :param quantity: A numerical value to be handled as Decimal.
+        :param slippage: acceptable slippage of the order in basis points
+        :param price_limit: highest price to buy at, or lowest price to sell at.
+        Any quoted price is accepted if not given.
+        :param executing_unit: executing unit of the order
+        :param validity: seconds the order is valid for
+        :param force_open: whether to open a new contract (CFD instruments only)
+        :return: `ExecutionResult` holding the quote, the order response and the
+        time spent in each stage
+        """
+        order_data, rfq_data = self._build_execution_data(
+            instrument, side, quantity, slippage, executing_unit, validity, force_open
+        )
+
+        started = time.perf_counter()
+        rfq = self._request_rfq(rfq_data)
+        quoted = time.perf_counter()
+        if rfq is None:
             raise ConnectionLost()
+        result = ExecutionResult(rfq=rfq, quote_rtt=quoted - started)
 
-        order_response = OrderResponse(**response)
+        accepted = self._accept_quote(result, order_data, price_limit)
+        sent = time.perf_counter()
+        result.processing = sent - quoted
+        if accepted:
+            result.order = self.create_order(order_data)
+            result.order_rtt = time.perf_counter() - sent
+        return result
 
-        if order_response.is_rejected:
-            logger.exception(
-                "Order %s was rejected",
-                order_response.order_id,
-                extra={
-                    "order_request": order_data,
-                    "order_response": order_response,
-                },
-            )
-        else:
-            logger.info(
-                "Order %s was successfully placed",
-                order_response.order_id,
-                extra={
-                    "order_request": order_data,
-                    "order_response": order_response,
-                },
-            )
+    def create_fok_order(
+        self, fok_order_request: FillOrKillOrderRequest, resubmit=None
+    ):
+        return self.create_order(fok_order_request.dict(), resubmit=resubmit)
+
+    def create_mkt_order(self, mkt_order_request: MarketOrderRequest, resubmit=None):
+        return self.create_order(mkt_order_request.dict(), resubmit=resubmit)
+
+    def create_order(self, order_data, resubmit=None):
+        """
+        Sends an order.
+
+        When resubmitting, an order which got no response is looked up by its
+        `client_order_id`, and sent again with the same identifier only if the
+        server does not have it and it is still valid. The server accepts an
+        identifier once, so the order can not be filled twice.
+        :param order_data: order payload
+        :param resubmit: whether to resubmit the order safely, defaults to the
+        `resubmit_orders` setting of the client
+        :return: OrderResponse object
+        :raise ConnectionLost: if it is unknown whether the order was received
+        :raise TooManyRequests, ServiceUnavailable: if the order was throttled or the
+        service unavailable (not resubmitting). Orders are never retried blindly.
+        :raise OrderNotReceived: if the order was not received before its
+        `valid_until` (resubmitting only)
+        """
+        if resubmit is None:
+            resubmit = self.resubmit_orders
+        if resubmit:
+            order_data, valid_until = prepare_resubmission(order_data)
+        try:
+            response = self._post("/order/", data=order_data)
+        except UNKNOWN_OUTCOME_ERRORS:
+            # The order may have been accepted upstream anyway.
+            if not resubmit:
+                raise
+            response = None
+        if not response and resubmit:
+            response = self._resubmit_order(order_data, valid_until)
+        if not response:
+            raise ConnectionLost()
+
+        order_response = self._parse_model(OrderResponse, response)
+        self._log_order_response(order_data, order_response)
         return order_response
 
+    def _resubmit_order(self, order_data: dict, valid_until) -> dict:
+        """
+        Finds out whether an order sent without response was received, and sends
+        it again while it is valid if it was not.
+        :param order_data: order payload, with its `client_order_id`
+        :param valid_until: `valid_until` of the order, in UTC
+        :return: the order returned by the server
+        """
+        resubmission = OrderResubmission(order_data, valid_until, self._has_expired)
+        while not resubmission.done:
+            try:
+                response = self._get(resubmission.lookup_endpoint)
+            except NotFound:
+                resubmission.not_found()
+            else:
+                return resubmission.found(response)
+            try:
+                response = self._post("/order/", data=order_data)
+            except resubmission.RESEND_ERRORS:
+                continue
+            if response:
+                return response
+        raise ConnectionLost()
+
     def get_order_history(self) -> List[OrderResponse]:
         """
         Returns the list of orders performed.
         :return: List[OrderResponse]
         """
         order_list = self._get("/order/")
-        return [OrderResponse(**order) for order in order_list]
+        return [self._parse_model(OrderResponse, order) for order in order_list]
 
     def get_order_detail(self, order_id) -> OrderResponse:
         """
@@ -203,7 +543,7 @@ class B2C2Client:
         """
         try:
             order = self._get(f"/order/{order_id}/")
-            return OrderResponse(**order)
+            return self._parse_model(OrderResponse, order)
         except NotFound:
             logger.exception("Order not found: {}".format(order_id))
         return None
@@ -214,7 +554,148 @@ class B2C2Client:
         :return: List[Trade] objects
         """
         trade_list = self._get("/trade/")
-        return [Trade(**trade) for trade in trade_list]
+        return [self._parse_model(Trade, trade) for trade in trade_list]
+
+    def _iter_history(self, endpoint: str, id_field: str, page_size, filters):
+        """
+        Pages through a history endpoint.
+        :param endpoint: /order/ or /trade/
+        :param id_field: name of the identifier of the records
+        :param page_size: number of records requested per page
+        :param filters: created__gte, created__lt and since filters
+        :return: generator of records (dicts)
+        """
+        paginator = HistoryPaginator(id_field, page_size=page_size, **filters)
+        while not paginator.done:
+            try:
+                page = self._get(endpoint, params=paginator.params)
+            except PaginationOffsetTooBig:
+                if not paginator.narrow():
+                    raise
+                continue
+            if page is None:
+                raise ConnectionLost()
+            yield from paginator.feed(page)
+
+    def iter_order_records(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ) -> Iterator[dict]:
+        """
+        Pages through the orders, without building models.
+        :param created__gte: only the orders created at or after this datetime
+        :param created__lt: only the orders created before this datetime
+        :param since: only the orders created since this datetime
+        :param page_size: number of orders requested per page
+        :return: generator of orders (dicts) as returned by the API
+        """
+        filters = dict(created__gte=created__gte, created__lt=created__lt, since=since)
+        return self._iter_history("/order/", "order_id", page_size, filters)
+
+    def iter_trade_records(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ) -> Iterator[dict]:
+        """
+        Pages through the trades, without building models.
+        :param created__gte: only the trades created at or after this datetime
+        :param created__lt: only the trades created before this datetime
+        :param since: only the trades created since this datetime
+        :param page_size: number of trades requested per page
+        :return: generator of trades (dicts) as returned by the API
+        """
+        filters = dict(created__gte=created__gte, created__lt=created__lt, since=since)
+        return self._iter_history("/trade/", "trade_id", page_size, filters)
+
+    def iter_orders(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ) -> Iterator[OrderResponse]:
+        """
+        Pages through the orders, building `OrderResponse` objects lazily.
+        :param created__gte: only the orders created at or after this datetime
+        :param created__lt: only the orders created before this datetime
+        :param since: only the orders created since this datetime
+        :param page_size: number of orders requested per page
+        :return: generator of OrderResponse objects
+        """
+        for order in self.iter_order_records(
+            created__gte, created__lt, since, page_size
+        ):
+            yield self._parse_model(OrderResponse, order)
+
+    def iter_trades(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ) -> Iterator[Trade]:
+        """
+        Pages through the trades, building `Trade` objects lazily.
+        :param created__gte: only the trades created at or after this datetime
+        :param created__lt: only the trades created before this datetime
+        :param since: only the trades created since this datetime
+        :param page_size: number of trades requested per page
+        :return: generator of Trade objects
+        """
+        for trade in self.iter_trade_records(
+            created__gte, created__lt, since, page_size
+        ):
+            yield self._parse_model(Trade, trade)
+
+    def get_order_frame(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ):
+        """
+        Downloads the orders into an `OrderFrame`, without building a model per
+        order. Requires numpy.
+        :param created__gte: only the orders created at or after this datetime
+        :param created__lt: only the orders created before this datetime
+        :param since: only the orders created since this datetime
+        :param page_size: number of orders requested per page
+        :return: OrderFrame
+        """
+        from b2c2.common.frames import OrderFrame
+
+        return OrderFrame.from_records(
+            self.iter_order_records(created__gte, created__lt, since, page_size)
+        )
+
+    def get_trade_frame(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ):
+        """
+        Downloads the trades into a `TradeFrame`, without building a model per
+        trade. Requires numpy.
+        :param created__gte: only the trades created at or after this datetime
+        :param created__lt: only the trades created before this datetime
+        :param since: only the trades created since this datetime
+        :param page_size: number of trades requested per page
+        :return: TradeFrame
+        """
+        from b2c2.common.frames import TradeFrame
+
+        return TradeFrame.from_records(
+            self.iter_trade_records(created__gte, created__lt, since, page_size)
+        )
 
     def get_trade_detail(self, trade_id) -> Trade:
         """
@@ -223,8 +704,8 @@ class B2C2Client:
         :return: Trade object
         """
         try:
-            trade = self._get(f"/trade/{trade_id}")
-            return Trade(**trade)
+            trade = self._get(f"/trade/{trade_id}/")
+            return self._parse_model(Trade, trade)
         except NotFound:
             logger.exception("Trade not found: {}".format(trade_id))
         return None
@@ -232,8 +713,20 @@ class B2C2Client:
     def check_connection(self):
         """Checks whether we can connect to the server or not."""
         try:
-            requests.get(f"{self.api_url}/instruments/", headers=self.headers)
+            self.session.get(
+                f"{self.api_url}/instruments/",
+                headers=self.headers,
+                timeout=(self.timeouts.connect, self.timeouts.read),
+            )
             return True
-        except (ConnectionError, requests.exceptions.ConnectionError) as exc:
+        except (ConnectionError, requests.exceptions.RequestException) as exc:
             logger.exception("Connection could not be established with the server.")
             return False
+
+    def is_available(self) -> bool:
+        """
+        Tells from the cached connection health whether requests can be sent. The
+        connection is only probed, blocking, when it is known to be down.
+        :return: False if the server could not be reached
+        """
+        return self.health.check(self.check_connection)
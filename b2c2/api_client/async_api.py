@@ -0,0 +1,732 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, List
+from urllib.parse import urlsplit
+
+import httpx
+
+from b2c2.api_client.base import BaseB2C2Client
+from b2c2.api_client.batch import (
+    DEFAULT_RFQ_CONCURRENCY,
+    RFQBatch,
+    RFQResult,
+    build_rfq_results,
+)
+from b2c2.api_client.coalescing import AsyncSingleFlight, get_request_key
+from b2c2.api_client.errors import PaginationOffsetTooBig
+from b2c2.api_client.exceptions import (
+    ConnectionLost,
+    DeadlineExceeded,
+    Forbidden,
+    NotFound,
+)
+from b2c2.api_client.execution import (
+    DEFAULT_ORDER_VALIDITY,
+    UNKNOWN_OUTCOME_ERRORS,
+    ExecutionResult,
+    OrderResubmission,
+    prepare_resubmission,
+)
+from b2c2.api_client.health import DOWN
+from b2c2.api_client.metrics import HEDGE_SENT, HEDGE_WON
+from b2c2.api_client.pagination import DEFAULT_PAGE_SIZE, HistoryPaginator
+from b2c2.api_client.session import DEFAULT_POOL_MAXSIZE
+from b2c2.common.models import (
+    Balance,
+    FillOrKillOrderRequest,
+    MarketOrderRequest,
+    OrderResponse,
+    RFQResponse,
+    Trade,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds an idle connection is kept in the pool.
+DEFAULT_KEEPALIVE_EXPIRY = 5.0
+
+
+class AsyncB2C2Client(BaseB2C2Client):
+    """
+    asyncio counterpart of `B2C2Client`. Shares the same models and error mapping,
+    every API method is a coroutine.
+    """
+
+    def __init__(
+        self,
+        token,
+        api_url=None,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        keep_alive=True,
+        keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+        session=None,
+        codec=None,
+        rate_limits=None,
+        retry_policy=None,
+        trusted=False,
+        rfq_cache=None,
+        metrics=None,
+        timeout=None,
+        hedging=None,
+        coalescing=None,
+        health=None,
+        resubmit_orders=False,
+    ):
+        """
+        :param token: API token
+        :param api_url: base URL of the API, defaults to `API_URL`
+        :param pool_maxsize: maximum number of concurrent connections
+        :param keep_alive: whether to keep connections open between requests
+        :param keepalive_expiry: seconds an idle connection is kept in the pool
+        :param codec: JSON codec or codec name, defaults to the fastest installed
+        :param rate_limits: `RateLimiter` or request budgets by endpoint group,
+        requests are not paced if not given
+        :param retry_policy: `RetryPolicy` applied to 429 and 503 responses
+        :param trusted: if True, skips the validation of the API responses
+        :param rfq_cache: `QuoteCache` (or True) to reuse unexpired quotes
+        :param metrics: `ClientMetrics` recording the requests, can be shared
+        :param timeout: `Timeouts` or (connect, read[, total]) tuple in seconds
+        :param hedging: `HedgePolicy` (or True) to hedge the slow GET requests
+        :param coalescing: `AsyncSingleFlight` (or True) sharing the result of the
+        concurrent identical GET requests, optionally caching it for a short time
+        :param health: `ConnectionHealth` caching the liveness of the connection
+        :param resubmit_orders: if True, orders without response are looked up and
+        sent again only if the server does not have them
+        :param session: an `httpx.AsyncClient` to use instead of creating one
+        """
+        super().__init__(
+            token,
+            api_url=api_url,
+            codec=codec,
+            rate_limits=rate_limits,
+            retry_policy=retry_policy,
+            trusted=trusted,
+            rfq_cache=rfq_cache,
+            metrics=metrics,
+            timeout=timeout,
+            hedging=hedging,
+            health=health,
+            resubmit_orders=resubmit_orders,
+        )
+        self.single_flight = AsyncSingleFlight() if coalescing is True else coalescing
+        limits = httpx.Limits(
+            max_connections=pool_maxsize,
+            max_keepalive_connections=pool_maxsize if keep_alive else 0,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.session = session or httpx.AsyncClient(limits=limits)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """Closes the pooled connections of the client."""
+        # The metrics may be shared with clients still open.
+        self.metrics.remove_hooks(post=self.health.observe)
+        if self._owns_health:
+            self.health.stop()
+        await self.session.aclose()
+
+    async def _make_request(
+        self, url: str, method="get", data: dict = None, params: dict = None
+    ):
+        """
+        session.get/post wrapper handling exceptions
+        :param url: URL to make request to
+        :param method: "get" or "post"
+        :param data: data to post
+        :param params: query string parameters
+        :return: response in json format
+        """
+        with self.metrics.track(method, url) as info:
+            try:
+                if method not in ("get", "post"):
+                    logger.warning("Invalid request type:", method)
+                    return
+                body = self.codec.dumps(data) if method == "post" else None
+                info.request_size = len(body or b"")
+                response, sent, received = await self._send(
+                    url, method=method, body=body, params=params
+                )
+                info.status_code = response.status_code
+                info.response_size = len(response.content or b"")
+                info.elapsed = received - sent
+
+                if response.status_code == 403:
+                    logger.error("Forbidden. Check your credentials and IP")
+                    raise Forbidden()
+
+                response_json = self._decode_response(
+                    response.content, response.status_code
+                )
+                self._observe_server_time(
+                    sent, received, method, response, response_json
+                )
+                self._raise_api_errors(response_json)
+                response.raise_for_status()
+                return response_json
+            except httpx.HTTPStatusError as exc:
+                self._raise_http_exception(response.status_code, exc=exc)
+            except httpx.ConnectError as exc:
+                info.error = exc
+                logger.exception("Error Connecting Server")
+            except httpx.TimeoutException as exc:
+                info.error = exc
+                logger.exception("Timeout Error")
+            except httpx.HTTPError as exc:
+                info.error = exc
+                logger.exception("Unknown error")
+
+    async def _send(
+        self, url: str, method="get", body: bytes = None, params: dict = None
+    ):
+        """
+        Sends the request, pacing it with the rate limiter and retrying the
+        throttled (429) or unavailable (503) responses, within the deadline of the
+        call.
+        :param url: URL to make request to
+        :param method: "get" or "post"
+        :param body: encoded data to post
+        :param params: query string parameters
+        :return: the last response received, with the `server_clock.clock()` times
+        it was sent and received at
+        :raise DeadlineExceeded: if the deadline passes before a response arrives
+        """
+        endpoint = urlsplit(url).path
+        expires_at = self.timeouts.get_expires_at()
+        attempt = 0
+        while True:
+            delay = self._get_rate_limit_delay(method, endpoint)
+            if not self._fits_deadline(expires_at, delay):
+                raise DeadlineExceeded()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            sent = self.server_clock.clock()
+            if method == "get":
+                response = await self._get_response(url, endpoint, params, expires_at)
+            else:
+                response = await self.session.post(
+                    url,
+                    content=body,
+                    headers=self.headers,
+                    timeout=self._get_attempt_timeout(expires_at),
+                )
+            received = self.server_clock.clock()
+            backoff = self._get_retry_backoff(
+                method, endpoint, response.status_code, response.headers, attempt
+            )
+            if backoff is None or not self._fits_deadline(expires_at, backoff):
+                return response, sent, received
+            await asyncio.sleep(backoff)
+            attempt += 1
+
+    def _get_attempt_timeout(self, expires_at) -> httpx.Timeout:
+        connect, read = self.timeouts.for_attempt(expires_at)
+        return httpx.Timeout(connect=connect, read=read, write=read, pool=connect)
+
+    async def _get_response(self, url: str, endpoint: str, params, expires_at):
+        """
+        Sends a GET request. With a hedge policy, a second copy is sent if the
+        first one is not answered in time, the first response received wins and
+        the other request is cancelled.
+        :param url: URL to make request to
+        :param endpoint: path of the request. Ex: /balance/
+        :param params: query string parameters
+        :param expires_at: deadline of the call
+        :return: response
+        """
+
+        def send():
+            return self.session.get(
+                url,
+                params=params,
+                headers=self.headers,
+                timeout=self._get_attempt_timeout(expires_at),
+            )
+
+        hedge_delay = self._get_hedge_delay("get", endpoint)
+        if hedge_delay is None:
+            return await send()
+
+        first = asyncio.ensure_future(send())
+        done, _ = await asyncio.wait({first}, timeout=hedge_delay)
+        # The hedged request must not be throttled: it is only worth sending now.
+        if done or not self._try_reserve_request("get", endpoint):
+            return await first
+
+        self.metrics.record_hedge("get", endpoint, HEDGE_SENT)
+        hedged = asyncio.ensure_future(send())
+        pending = {first, hedged}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if isinstance(task.exception(), httpx.HTTPError):
+                        error = task.exception()
+                        continue
+                    if task is hedged:
+                        self.metrics.record_hedge("get", endpoint, HEDGE_WON)
+                    return task.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _get(self, endpoint: str, params: dict = None):
+        """
+        Performs get request to the given endpoint. With coalescing, identical
+        requests made while one is in flight share its result.
+        :param endpoint: Ex: /balance/
+        :param params: query string parameters
+        :return: Response in json format
+        """
+        url = f"{self.api_url}{endpoint}"
+        if self.single_flight is None:
+            return await self._make_request(url, method="get", params=params)
+        return await self.single_flight.do(
+            get_request_key(endpoint, params),
+            lambda: self._make_request(url, method="get", params=params),
+            expires_at=self.timeouts.get_expires_at(),
+        )
+
+    async def _post(self, endpoint: str, data: dict):
+        """
+        Performs POST request to the given endpoint
+        :param endpoint: Ex: /order/
+        :param data: Data dictionary
+        :return:
+        """
+        try:
+            return await self._make_request(
+                f"{self.api_url}{endpoint}", method="post", data=data
+            )
+        finally:
+            # Orders change the balance and the history.
+            if self.single_flight is not None:
+                self.single_flight.clear()
+
+    async def get_balance(self):
+        """
+        Returns the account balance
+        :return: `Balance` object containing quantities for each asset (USD, BTC, etc.)
+        """
+        balance_dict = await self._get("/balance/")
+        return Balance(**balance_dict)
+
+    async def list_instruments(self):
+        """
+        Returns the instruments available for trading and registers them in the
+        instrument registry.
+        :return: A list of Instrument objects (with name attribute).
+        """
+        try:
+            instruments = await self._get("/instruments/")
+            return self.instrument_registry.load(instruments)
+        except ConnectionError as exc:
+            logger.exception("Could not connect to the server. Please try again later.")
+        except:
+            logger.exception("Could not perform the request. Please try again later.")
+
+    async def get_rfq(self, instrument, side, quantity, use_cache=True):
+        """
+        Sends a `RFQ (request for quote)` and returns the response from the server
+        :param instrument: Instrument object or instrument name (Ex: "BTCUSD.SPOT")
+        :param side: "buy" or "sell"
+        :param quantity: A numerical value to be handled as Decimal.
+        :param use_cache: whether an unexpired quote of the RFQ cache can be
+        returned instead, if the client has one
+        :return: `RFQResponse` object
+        """
+        if use_cache:
+            rfq = self._get_cached_rfq(instrument, side, quantity)
+            if rfq is not None:
+                return rfq
+        data = self._build_rfq_data(instrument, side, quantity)
+        rfq = await self._request_rfq(data)
+        self._cache_rfq(instrument, side, quantity, rfq)
+        return rfq
+
+    async def _request_rfq(self, data: dict):
+        """
+        Posts a RFQ payload built by `_build_rfq_data`.
+        :param data: RFQ payload
+        :return: `RFQResponse` object, None if the server could not be reached.
+        """
+        response = await self._post("/request_for_quote/", data=data)
+        if not response:
+            logger.error("Could not get RFQ", extra=dict(data=data))
+            return None
+        return self._parse_model(RFQResponse, response)
+
+    async def get_rfqs(self, rfq_requests, max_concurrency=DEFAULT_RFQ_CONCURRENCY):
+        """
+        Sends several RFQs concurrently, at most `max_concurrency` at a time.
+        :param rfq_requests: iterable of (instrument, side, quantity) tuples
+        :param max_concurrency: maximum number of RFQs in flight
+        :return: `RFQBatch` holding one `RFQResult` per request, in input order
+        """
+        results = build_rfq_results(self._build_rfq_data, rfq_requests)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def request(result: RFQResult):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    result.response = await self._request_rfq(result.data)
+                    if result.response is None:
+                        result.error = ConnectionLost()
+                except Exception as exc:
+                    result.error = exc
+                result.elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request(result) for result in results))
+        return RFQBatch(results=results, elapsed=time.perf_counter() - started)
+
+    async def execute_rfq(
+        self,
+        instrument,
+        side,
+        quantity,
+        slippage=None,
+        price_limit=None,
+        executing_unit=None,
+        validity=DEFAULT_ORDER_VALIDITY,
+        force_open=False,
+    ) -> ExecutionResult:
+        """
+        Requests a quote and sends a FOK order at its price as soon as it arrives,
+        if the price is acceptable. The order payload is built before the RFQ is
+        sent, so only its price is set between the two requests.
+        :param instrument: Instrument object or instrument name (Ex: "BTCUSD.SPOT")
+        :param side: "buy" or "sell"
+        :param quantity: A numerical value to be handled as Decimal.
+        :param slippage: acceptable slippage of the order in basis points
+        :param price_limit: highest price to buy at, or lowest price to sell at.
+        Any quoted price is accepted if not given.
+        :param executing_unit: executing unit of the order
+        :param validity: seconds the order is valid for
+        :param force_open: whether to open a new contract (CFD instruments only)
+        :return: `ExecutionResult` holding the quote, the order response and the
+        time spent in each stage
+        """
+        order_data, rfq_data = self._build_execution_data(
+            instrument, side, quantity, slippage, executing_unit, validity, force_open
+        )
+
+        started = time.perf_counter()
+        rfq = await self._request_rfq(rfq_data)
+        quoted = time.perf_counter()
+        if rfq is None:
+            raise ConnectionLost()
+        result = ExecutionResult(rfq=rfq, quote_rtt=quoted - started)
+
+        accepted = self._accept_quote(result, order_data, price_limit)
+        sent = time.perf_counter()
+        result.processing = sent - quoted
+        if accepted:
+            result.order = await self.create_order(order_data)
+            result.order_rtt = time.perf_counter() - sent
+        return result
+
+    async def create_fok_order(
+        self, fok_order_request: FillOrKillOrderRequest, resubmit=None
+    ):
+        return await self.create_order(fok_order_request.dict(), resubmit=resubmit)
+
+    async def create_mkt_order(
+        self, mkt_order_request: MarketOrderRequest, resubmit=None
+    ):
+        return await self.create_order(mkt_order_request.dict(), resubmit=resubmit)
+
+    async def create_order(self, order_data, resubmit=None):
+        """
+        Sends an order.
+
+        When resubmitting, an order which got no response is looked up by its
+        `client_order_id`, and sent again with the same identifier only if the
+        server does not have it and it is still valid. The server accepts an
+        identifier once, so the order can not be filled twice.
+        :param order_data: order payload
+        :param resubmit: whether to resubmit the order safely, defaults to the
+        `resubmit_orders` setting of the client
+        :return: OrderResponse object
+        :raise ConnectionLost: if it is unknown whether the order was received
+        :raise TooManyRequests, ServiceUnavailable: if the order was throttled or the
+        service unavailable (not resubmitting). Orders are never retried blindly.
+        :raise OrderNotReceived: if the order was not received before its
+        `valid_until` (resubmitting only)
+        """
+        if resubmit is None:
+            resubmit = self.resubmit_orders
+        if resubmit:
+            order_data, valid_until = prepare_resubmission(order_data)
+        try:
+            response = await self._post("/order/", data=order_data)
+        except UNKNOWN_OUTCOME_ERRORS:
+            # The order may have been accepted upstream anyway.
+            if not resubmit:
+                raise
+            response = None
+        if not response and resubmit:
+            response = await self._resubmit_order(order_data, valid_until)
+        if not response:
+            raise ConnectionLost()
+
+        order_response = self._parse_model(OrderResponse, response)
+        self._log_order_response(order_data, order_response)
+        return order_response
+
+    async def _resubmit_order(self, order_data: dict, valid_until) -> dict:
+        """
+        Finds out whether an order sent without response was received, and sends
+        it again while it is valid if it was not.
+        :param order_data: order payload, with its `client_order_id`
+        :param valid_until: `valid_until` of the order, in UTC
+        :return: the order returned by the server
+        """
+        resubmission = OrderResubmission(order_data, valid_until, self._has_expired)
+        while not resubmission.done:
+            try:
+                response = await self._get(resubmission.lookup_endpoint)
+            except NotFound:
+                resubmission.not_found()
+            else:
+                return resubmission.found(response)
+            try:
+                response = await self._post("/order/", data=order_data)
+            except resubmission.RESEND_ERRORS:
+                continue
+            if response:
+                return response
+        raise ConnectionLost()
+
+    async def get_order_history(self) -> List[OrderResponse]:
+        """
+        Returns the list of orders performed.
+        :return: List[OrderResponse]
+        """
+        order_list = await self._get("/order/")
+        return [self._parse_model(OrderResponse, order) for order in order_list]
+
+    async def get_order_detail(self, order_id) -> OrderResponse:
+        """
+        Returns details of a particular order
+        :param order_id: the ID of the order
+        :return: OrderResponse object
+        """
+        try:
+            order = await self._get(f"/order/{order_id}/")
+            return self._parse_model(OrderResponse, order)
+        except NotFound:
+            logger.exception("Order not found: {}".format(order_id))
+        return None
+
+    async def get_trade_history(self) -> List[Trade]:
+        """
+        Returns the list of trade objects performed.
+        :return: List[Trade] objects
+        """
+        trade_list = await self._get("/trade/")
+        return [self._parse_model(Trade, trade) for trade in trade_list]
+
+    async def _iter_history(self, endpoint: str, id_field: str, page_size, filters):
+        """
+        Pages through a history endpoint.
+        :param endpoint: /order/ or /trade/
+        :param id_field: name of the identifier of the records
+        :param page_size: number of records requested per page
+        :param filters: created__gte, created__lt and since filters
+        :return: async generator of records (dicts)
+        """
+        paginator = HistoryPaginator(id_field, page_size=page_size, **filters)
+        while not paginator.done:
+            try:
+                page = await self._get(endpoint, params=paginator.params)
+            except PaginationOffsetTooBig:
+                if not paginator.narrow():
+                    raise
+                continue
+            if page is None:
+                raise ConnectionLost()
+            for record in paginator.feed(page):
+                yield record
+
+    def iter_order_records(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ) -> AsyncIterator[dict]:
+        """
+        Pages through the orders, without building models.
+        :param created__gte: only the orders created at or after this datetime
+        :param created__lt: only the orders created before this datetime
+        :param since: only the orders created since this datetime
+        :param page_size: number of orders requested per page
+        :return: async generator of orders (dicts) as returned by the API
+        """
+        filters = dict(created__gte=created__gte, created__lt=created__lt, since=since)
+        return self._iter_history("/order/", "order_id", page_size, filters)
+
+    def iter_trade_records(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ) -> AsyncIterator[dict]:
+        """
+        Pages through the trades, without building models.
+        :param created__gte: only the trades created at or after this datetime
+        :param created__lt: only the trades created before this datetime
+        :param since: only the trades created since this datetime
+        :param page_size: number of trades requested per page
+        :return: async generator of trades (dicts) as returned by the API
+        """
+        filters = dict(created__gte=created__gte, created__lt=created__lt, since=since)
+        return self._iter_history("/trade/", "trade_id", page_size, filters)
+
+    async def iter_orders(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ) -> AsyncIterator[OrderResponse]:
+        """
+        Pages through the orders, building `OrderResponse` objects lazily.
+        :param created__gte: only the orders created at or after this datetime
+        :param created__lt: only the orders created before this datetime
+        :param since: only the orders created since this datetime
+        :param page_size: number of orders requested per page
+        :return: async generator of OrderResponse objects
+        """
+        async for order in self.iter_order_records(
+            created__gte, created__lt, since, page_size
+        ):
+            yield self._parse_model(OrderResponse, order)
+
+    async def iter_trades(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ) -> AsyncIterator[Trade]:
+        """
+        Pages through the trades, building `Trade` objects lazily.
+        :param created__gte: only the trades created at or after this datetime
+        :param created__lt: only the trades created before this datetime
+        :param since: only the trades created since this datetime
+        :param page_size: number of trades requested per page
+        :return: async generator of Trade objects
+        """
+        async for trade in self.iter_trade_records(
+            created__gte, created__lt, since, page_size
+        ):
+            yield self._parse_model(Trade, trade)
+
+    async def get_order_frame(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ):
+        """
+        Downloads the orders into an `OrderFrame`, without building a model per
+        order. Requires numpy.
+        :param created__gte: only the orders created at or after this datetime
+        :param created__lt: only the orders created before this datetime
+        :param since: only the orders created since this datetime
+        :param page_size: number of orders requested per page
+        :return: OrderFrame
+        """
+        from b2c2.common.frames import OrderFrame
+
+        records = [
+            record
+            async for record in self.iter_order_records(
+                created__gte, created__lt, since, page_size
+            )
+        ]
+        return OrderFrame.from_records(records)
+
+    async def get_trade_frame(
+        self,
+        created__gte=None,
+        created__lt=None,
+        since=None,
+        page_size=DEFAULT_PAGE_SIZE,
+    ):
+        """
+        Downloads the trades into a `TradeFrame`, without building a model per
+        trade. Requires numpy.
+        :param created__gte: only the trades created at or after this datetime
+        :param created__lt: only the trades created before this datetime
+        :param since: only the trades created since this datetime
+        :param page_size: number of trades requested per page
+        :return: TradeFrame
+        """
+        from b2c2.common.frames import TradeFrame
+
+        records = [
+            record
+            async for record in self.iter_trade_records(
+                created__gte, created__lt, since, page_size
+            )
+        ]
+        return TradeFrame.from_records(records)
+
+    async def get_trade_detail(self, trade_id) -> Trade:
+        """
+        Returns details of a particular trade
+        :param trade_id: the ID of the trade
+        :return: Trade object
+        """
+        try:
+            trade = await self._get(f"/trade/{trade_id}/")
+            return self._parse_model(Trade, trade)
+        except NotFound:
+            logger.exception("Trade not found: {}".format(trade_id))
+        return None
+
+    async def check_connection(self):
+        """Checks whether we can connect to the server or not."""
+        try:
+            await self.session.get(
+                f"{self.api_url}/instruments/",
+                headers=self.headers,
+                timeout=httpx.Timeout(
+                    connect=self.timeouts.connect,
+                    read=self.timeouts.read,
+                    write=self.timeouts.read,
+                    pool=self.timeouts.connect,
+                ),
+            )
+            return True
+        except (ConnectionError, httpx.TransportError) as exc:
+            logger.exception("Connection could not be established with the server.")
+            return False
+
+    async def is_available(self) -> bool:
+        """
+        Tells from the cached connection health whether requests can be sent. The
+        connection is only probed when it is known to be down.
+        :return: False if the server could not be reached
+        """
+        if self.health.state != DOWN:
+            return True
+        up = await self.check_connection()
+        self.health.record(up)
+        return up
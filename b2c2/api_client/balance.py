@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Optional
+
+from b2c2.common.instruments import instrument_registry
+from b2c2.common.models import Balance, Instrument, OrderResponse, Side, Trade
+
+logger = logging.getLogger(__name__)
+
+# Seconds after which the balance is fetched from the server again.
+DEFAULT_RESYNC_INTERVAL = 60.0
+# Number of order and trade identifiers remembered to apply each fill once.
+DEFAULT_SEEN_SIZE = 10_000
+
+
+class BalanceTracker:
+    """
+    Local shadow of the account balance, so that pre-trade checks do not need a
+    round trip.
+
+    The balance is seeded from `get_balance()`, then the fills of the orders and
+    trades passed to `apply_order()` / `apply_trade()` are applied to the base and
+    quote currencies of their instrument. It is fetched again once
+    `resync_interval` has passed, or as soon as it may have drifted: a fill which
+    could not be applied (unknown instrument, CFD), an order whose outcome is
+    unknown (`mark_stale()`), or a currency going negative. Differences found by
+    a sync beyond `tolerance` are logged and kept in `drift`.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        resync_interval: Optional[float] = DEFAULT_RESYNC_INTERVAL,
+        tolerance=Decimal(0),
+        clock=time.monotonic,
+    ):
+        """
+        :param client: B2C2Client fetching the balance. Without one, the balance is
+        only updated with `update()`, Ex: with the result of the asyncio client.
+        :param resync_interval: seconds after which the balance is fetched again,
+        never if None
+        :param tolerance: difference with the server's balance below which a
+        currency is not considered to have drifted
+        :param clock: monotonic clock returning seconds
+        """
+        self.client = client
+        self.resync_interval = resync_interval
+        self.tolerance = Decimal(str(tolerance))
+        self.clock = clock
+        # Differences (server - local) found by the last sync, by currency.
+        self.drift = {}  # type: Dict[str, Decimal]
+        self.syncs = 0
+        self._balance = {}  # type: Dict[str, Decimal]
+        self._synced_at = None  # type: Optional[float]
+        self._stale = True
+        self._seen = OrderedDict()  # type: OrderedDict[str, None]
+        self._lock = threading.RLock()
+
+    @property
+    def needs_sync(self) -> bool:
+        """Whether the balance must be fetched before being used."""
+        if self._stale or self._synced_at is None:
+            return True
+        if self.resync_interval is None:
+            return False
+        return self.clock() - self._synced_at >= self.resync_interval
+
+    def mark_stale(self):
+        """Fetches the balance again before its next use."""
+        self._stale = True
+
+    def update(self, balance: dict):
+        """
+        Replaces the local balance with the server's, recording the drift.
+        :param balance: balance returned by the server
+        """
+        balance = {currency: Decimal(str(value)) for currency, value in balance.items()}
+        with self._lock:
+            if self._synced_at is not None:
+                self.drift = {}
+                zero = Decimal(0)
+                for currency in set(balance) | set(self._balance):
+                    local = self._balance.get(currency, zero)
+                    difference = balance.get(currency, zero) - local
+                    if abs(difference) > self.tolerance:
+                        self.drift[currency] = difference
+                if self.drift:
+                    logger.warning("Balance drifted: %s", self.drift)
+            self._balance = balance
+            self._synced_at = self.clock()
+            self._stale = False
+            self.syncs += 1
+
+    def sync(self) -> Balance:
+        """
+        Fetches the balance from the server.
+        :return: the balance
+        """
+        balance = self.client.get_balance()
+        self.update(balance)
+        return self.get_balance(sync=False)
+
+    def get_balance(self, sync: bool = True) -> Balance:
+        """
+        :param sync: whether the balance can be fetched if it needs to be
+        :return: copy of the balance
+        """
+        if sync and self.client is not None and self.needs_sync:
+            return self.sync()
+        with self._lock:
+            return Balance(self._balance)
+
+    def get(self, currency: str, sync: bool = True) -> Decimal:
+        """
+        :param currency: Ex: BTC
+        :param sync: whether the balance can be fetched if it needs to be
+        :return: quantity of the currency, 0 if not held
+        """
+        if sync and self.client is not None and self.needs_sync:
+            self.sync()
+        with self._lock:
+            return self._balance.get(currency, Decimal(0))
+
+    def can_afford(self, instrument, side, quantity, price) -> bool:
+        """
+        Checks locally that the balance covers an order.
+        :param instrument: Instrument object or instrument name (Ex: "BTCUSD.SPOT")
+        :param side: "buy" or "sell"
+        :param quantity: quantity in base currency
+        :param price: expected price, Ex: the price of the quote
+        :return: True if the quote currency covers a buy, or the base currency a
+        sell
+        :raise UnknownInstrument: if the currencies of the instrument are unknown
+        """
+        base, quote = self._get_pair(instrument)
+        quantity = Decimal(str(quantity))
+        if Side(side) == Side.buy:
+            return self.get(quote) >= quantity * Decimal(str(price))
+        return self.get(base) >= quantity
+
+    def apply_order(self, order: OrderResponse):
+        """
+        Applies the fills of an order. Rejected orders are ignored.
+        :param order: response to the order
+        """
+        if order.is_rejected or not self._remember(order.order_id):
+            return
+        if order.trades:
+            for trade in order.trades:
+                self.apply_trade(trade)
+            return
+        self._apply_fill(
+            order.instrument, order.side, order.quantity, order.executed_price
+        )
+
+    def apply_trade(self, trade: Trade):
+        """
+        Applies a trade, unless it was already applied with its order.
+        :param trade: Ex: a trade of `get_trade_history()`
+        """
+        if self._remember(trade.trade_id):
+            self._apply_fill(trade.instrument, trade.side, trade.quantity, trade.price)
+
+    def _remember(self, key: str) -> bool:
+        """:return: False if the order or trade was already applied"""
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen[key] = None
+            if len(self._seen) > DEFAULT_SEEN_SIZE:
+                self._seen.popitem(last=False)
+            return True
+
+    def _get_instrument(self, instrument) -> Instrument:
+        if isinstance(instrument, Instrument):
+            instrument = instrument.name
+        registry = instrument_registry
+        if self.client is not None:
+            registry = self.client.instrument_registry
+        return registry.get(instrument)
+
+    def _get_pair(self, instrument):
+        return self._get_instrument(instrument).pair()
+
+    def _apply_fill(self, instrument: str, side, quantity, price):
+        instrument = self._get_instrument(instrument)
+        try:
+            base, quote = instrument.pair()
+        except Exception:
+            base = quote = None
+        # CFD fills change positions rather than balances.
+        if base is None or instrument.type == "CFD":
+            logger.warning("Could not apply a fill of %s, resyncing", instrument.name)
+            self.mark_stale()
+            return
+        quantity = Decimal(str(quantity))
+        amount = quantity * Decimal(str(price))
+        if Side(side) == Side.sell:
+            quantity, amount = -quantity, -amount
+        with self._lock:
+            self._balance[base] = self._balance.get(base, Decimal(0)) + quantity
+            self._balance[quote] = self._balance.get(quote, Decimal(0)) - amount
+            if self._balance[base] < 0 or self._balance[quote] < 0:
+                self.mark_stale()
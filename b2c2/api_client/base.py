@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+import logging
+import uuid
+from typing import Optional, Tuple, Type
+
+from b2c2.api_client.cache import QuoteCache
+from b2c2.api_client.clock import ServerClock
+from b2c2.api_client.errors import get_api_error_by_code
+from b2c2.api_client.exceptions import HTTPException, get_http_exception_by_code
+from b2c2.api_client.execution import (
+    DEFAULT_ORDER_VALIDITY,
+    PRICE_NOT_ACCEPTABLE,
+    QUOTE_EXPIRED,
+    ExecutionResult,
+    build_fok_order_template,
+    is_price_acceptable,
+)
+from b2c2.api_client.health import ConnectionHealth
+from b2c2.api_client.hedging import HedgePolicy
+from b2c2.api_client.metrics import ClientMetrics
+from b2c2.api_client.ratelimit import RateLimiter, RetryPolicy, parse_retry_after
+from b2c2.api_client.timeouts import Timeouts, deadline, get_remaining
+from b2c2.common.codecs import JSONCodec, get_codec
+from b2c2.common.construct import Model, construct_model
+from b2c2.common.instruments import instrument_registry
+from b2c2.common.models import Instrument, OrderResponse, RFQResponse, Trade
+
+logger = logging.getLogger(__name__)
+
+
+class BaseB2C2Client:
+    """
+    Transport independent parts of the B2C2 clients: authentication headers,
+    request payload building and mapping of the API errors to exceptions.
+    """
+
+    API_URL = "https://api.uat.b2c2.net"
+
+    def __init__(
+        self,
+        token,
+        api_url=None,
+        codec=None,
+        rate_limits=None,
+        retry_policy=None,
+        trusted=False,
+        rfq_cache=None,
+        metrics=None,
+        timeout=None,
+        hedging=None,
+        health=None,
+        resubmit_orders=False,
+    ):
+        """
+        :param token: API token
+        :param api_url: base URL of the API, defaults to `API_URL`
+        :param codec: `JSONCodec` instance or codec name ("orjson", "ujson", "json").
+        Defaults to the fastest one installed.
+        :param rate_limits: `RateLimiter` instance or (requests per second, burst)
+        by endpoint group (see `ratelimit.DEFAULT_RATE_LIMITS`). Requests are not
+        paced if not given.
+        :param retry_policy: `RetryPolicy` for 429 and 503 responses. Defaults to
+        3 retries with jittered exponential backoff.
+        :param trusted: if True, models are built from the API responses without
+        running the pydantic validators (see `construct_model`).
+        :param rfq_cache: `QuoteCache` reusing the unexpired quotes in `get_rfq`, or
+        True for a cache with the default settings. Quotes are not cached if not
+        given.
+        :param metrics: `ClientMetrics` recording the latency, errors and payload
+        sizes of the requests, and running the request hooks. A new one is created
+        if not given.
+        :param timeout: `Timeouts`, or a (connect, read) or (connect, read, total)
+        tuple in seconds. Defaults to `Timeouts()`.
+        :param hedging: `HedgePolicy` (or True for the default policy) sending a
+        second copy of the slow GET requests. GET requests are not hedged if not
+        given, POST requests never are.
+        :param health: `ConnectionHealth` caching the liveness of the connection,
+        updated from the outcome of the requests. A new one is created if not
+        given. A given one may be shared with other clients, so its background
+        probes are left to its owner to stop (see `ConnectionHealth.stop()`).
+        :param resubmit_orders: if True, `create_order` looks an order up when no
+        response was received and sends it again if the server does not have it,
+        see `create_order`.
+        """
+        self.token = token
+        self.api_url = api_url or self.API_URL
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Token {self.token}",
+        }
+        self.codec = codec if isinstance(codec, JSONCodec) else get_codec(codec)
+        if rate_limits is None or isinstance(rate_limits, RateLimiter):
+            self.rate_limiter = rate_limits
+        else:
+            self.rate_limiter = RateLimiter(rate_limits)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.instrument_registry = instrument_registry
+        self.trusted = trusted
+        self.metrics = metrics or ClientMetrics()
+        self.server_clock = ServerClock()
+        self.health = health or ConnectionHealth()
+        # Background probes of a shared health are stopped by its owner.
+        self._owns_health = health is None
+        self.metrics.add_hooks(post=self.health.observe)
+        self.timeouts = Timeouts.create(timeout)
+        self.hedge_policy = HedgePolicy() if hedging is True else hedging
+        self.resubmit_orders = resubmit_orders
+        self.rfq_cache = QuoteCache() if rfq_cache is True else rfq_cache
+        if self.rfq_cache is not None and self.rfq_cache.server_clock is None:
+            self.rfq_cache.server_clock = self.server_clock
+
+    def _parse_model(self, model_class: Type[Model], data: dict) -> Model:
+        """
+        Builds a model from an API payload, skipping validation in trusted mode.
+        :param model_class: Ex: OrderResponse
+        :param data: payload returned by the API
+        :return: model instance
+        """
+        if self.trusted:
+            return construct_model(model_class, data)
+        return model_class(**data)
+
+    def parse_order(self, data: dict) -> OrderResponse:
+        """
+        Builds an order from an API payload, like `get_orders` does. Ex: the
+        records of `iter_order_records`.
+        :param data: payload returned by the API
+        """
+        return self._parse_model(OrderResponse, data)
+
+    def parse_trade(self, data: dict) -> Trade:
+        """
+        Builds a trade from an API payload, like `get_trades` does. Ex: the records
+        of `iter_trade_records`.
+        :param data: payload returned by the API
+        """
+        return self._parse_model(Trade, data)
+
+    @staticmethod
+    def deadline(seconds: float):
+        """
+        Context manager bounding the time the requests sent in the block may take
+        altogether. `DeadlineExceeded` is raised when it is over.
+            with client.deadline(0.5):
+                balance = client.get_balance()
+        :param seconds: time budget of the block
+        """
+        return deadline(seconds)
+
+    @staticmethod
+    def _fits_deadline(expires_at: Optional[float], delay: float) -> bool:
+        """
+        :param expires_at: deadline of the call, see `Timeouts.get_expires_at()`
+        :param delay: seconds to wait before the next attempt
+        :return: False if waiting would leave no time before the deadline
+        """
+        remaining = get_remaining(expires_at)
+        return remaining is None or delay < remaining
+
+    def _get_hedge_delay(self, method: str, endpoint: str) -> Optional[float]:
+        """
+        :return: seconds after which a hedged copy of the request is sent, None if
+        it must not be hedged
+        """
+        if self.hedge_policy is None:
+            return None
+        return self.hedge_policy.get_delay(self.metrics, method, endpoint)
+
+    def _get_cached_rfq(self, instrument, side, quantity) -> Optional[RFQResponse]:
+        """
+        :return: the unexpired quote cached for the request, None if there is none
+        or the cache is disabled
+        """
+        if self.rfq_cache is None:
+            return None
+        return self.rfq_cache.get(instrument, side, quantity)
+
+    def _cache_rfq(self, instrument, side, quantity, rfq: Optional[RFQResponse]):
+        if self.rfq_cache is not None and rfq is not None:
+            self.rfq_cache.put(instrument, side, quantity, rfq)
+
+    def get_instrument(self, name: str) -> Instrument:
+        """
+        Returns the interned `Instrument` with the given name.
+        :param name: instrument name. Ex: BTCUSD.SPOT
+        """
+        return self.instrument_registry.get(name)
+
+    def _get_rate_limit_delay(self, method: str, endpoint: str) -> float:
+        """
+        Reserves the request on the rate limiter.
+        :return: seconds to wait before sending the request
+        """
+        if not self.rate_limiter:
+            return 0.0
+        return self.rate_limiter.reserve(method, endpoint)
+
+    def _try_reserve_request(self, method: str, endpoint: str) -> bool:
+        """
+        Reserves the request on the rate limiter only if it can be sent now.
+        :return: False if the request would be throttled
+        """
+        if not self.rate_limiter:
+            return True
+        return self.rate_limiter.try_reserve(method, endpoint)
+
+    def _get_retry_backoff(
+        self, method: str, endpoint: str, status_code: int, headers, attempt: int
+    ) -> Optional[float]:
+        """
+        Decides whether a response should be retried. Throttled responses also
+        pause the rate limit budget of the endpoint.
+        :param method: "get" or "post"
+        :param endpoint: path of the request. Ex: /order/
+        :param status_code: HTTP status code of the response
+        :param headers: headers of the response
+        :param attempt: number of the attempt, starting from 0
+        :return: seconds to wait before retrying, None if it should not be retried
+        """
+        if not self.retry_policy.should_retry(status_code, attempt, method, endpoint):
+            return None
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        backoff = self.retry_policy.get_backoff(attempt, retry_after=retry_after)
+        self.metrics.record_retry(method, endpoint, status_code)
+        if status_code == 429 and self.rate_limiter:
+            self.rate_limiter.pause(method, endpoint, backoff)
+        logger.warning(
+            "%s %s returned %s, retrying in %.2f seconds",
+            method.upper(),
+            endpoint,
+            status_code,
+            backoff,
+        )
+        return backoff
+
+    def _observe_server_time(
+        self, sent: float, received: float, method: str, response, response_json
+    ):
+        """
+        Updates the estimate of the server's clock with the `Date` header of the
+        response and the creation date of the RFQ or order it returns.
+        :param sent: `server_clock.clock()` when the request was sent
+        :param received: `server_clock.clock()` when the response was received
+        :param method: "get" or "post"
+        :param response: response of the request
+        :param response_json: decoded response body
+        """
+        created = method == "post" and response.status_code < 400
+        self.server_clock.observe_response(
+            sent, received, response.headers, response_json if created else None
+        )
+
+    def _decode_response(self, content: bytes, status_code: int):
+        """
+        Parses the response body. Bodies of failed responses which are not JSON
+        (Ex: an HTML error page of a proxy) are left to the HTTP status handling.
+        :param content: raw response body
+        :param status_code: HTTP status code of the response
+        :return: decoded JSON, None if the body is empty
+        """
+        if not content:
+            return None
+        try:
+            return self.codec.loads(content)
+        except ValueError:
+            if status_code < 400:
+                raise
+            return None
+
+    def _raise_api_errors(self, response_json):
+        if not isinstance(response_json, dict):
+            # returned data, no problem.
+            return
+        errors = response_json.get("errors")
+        if not errors:
+            return
+
+        api_errors = []
+        for error in errors:
+            code = error.get("code")
+            message = error.get("message")
+            error = get_api_error_by_code(code)(message)
+            api_errors.append(error)
+            # Log all the API errors sent.
+            logger.error(error)
+
+        # Raise the first error
+        raise api_errors[0]
+
+    @staticmethod
+    def _raise_http_exception(status_code: int, exc: Exception = None):
+        """
+        Raises the HTTPException subclass relevant to the status code.
+        :param status_code: HTTP status code of the response
+        :param exc: the original exception raised by the HTTP library
+        """
+        exception_class = get_http_exception_by_code(status_code)
+        if exception_class:
+            raise exception_class()
+        else:
+            raise HTTPException(exc=exc)
+
+    @staticmethod
+    def _build_rfq_data(instrument, side, quantity) -> dict:
+        """
+        Builds the payload of a `RFQ (request for quote)`.
+        :param instrument: Instrument object or instrument name (Ex: "BTCUSD.SPOT")
+        :param side: "buy" or "sell"
+        :param quantity: A numerical value to be handled as Decimal.
+        :return: RFQ payload with a newly generated `client_rfq_id`
+        """
+        if isinstance(instrument, Instrument):
+            instrument = instrument.name
+        return dict(
+            instrument=instrument,
+            side=side,
+            quantity=str(quantity),
+            client_rfq_id=str(uuid.uuid4()),
+        )
+
+    def _has_expired(self, valid_until) -> bool:
+        """
+        :param valid_until: expiry of a quote or an order
+        :return: True if a request sent now would reach the server after it
+        """
+        margin = (self.server_clock.rtt or 0.0) / 2
+        return self.server_clock.has_expired(valid_until, margin=margin)
+
+    def _build_execution_data(
+        self,
+        instrument,
+        side,
+        quantity,
+        slippage=None,
+        executing_unit=None,
+        validity=DEFAULT_ORDER_VALIDITY,
+        force_open=False,
+    ) -> Tuple[dict, dict]:
+        """
+        Builds the payloads of an `execute_rfq` call, before the RFQ is sent.
+        :return: (FOK order payload without price, RFQ payload)
+        """
+        if not isinstance(instrument, Instrument):
+            instrument = self.get_instrument(instrument)
+        order_data = build_fok_order_template(
+            instrument,
+            side,
+            quantity,
+            slippage=slippage,
+            executing_unit=executing_unit,
+            validity=validity,
+            force_open=force_open,
+            now=self.server_clock.now(),
+        )
+        return order_data, self._build_rfq_data(instrument, side, quantity)
+
+    def _accept_quote(
+        self, result: ExecutionResult, order_data: dict, price_limit=None
+    ) -> bool:
+        """
+        Decides whether the order of an `execute_rfq` call is sent at the quoted
+        price, and sets its price and `rfq_id` if it is.
+        :param result: result holding the quote
+        :param order_data: FOK order payload without price
+        :param price_limit: highest price to buy at, or lowest price to sell at
+        :return: True if the order is to be sent. Otherwise, `result.reason` says
+        why it is not.
+        """
+        rfq = result.rfq
+        # The order must reach the server before the quote expires.
+        if self._has_expired(rfq.valid_until):
+            result.reason = QUOTE_EXPIRED
+            logger.warning("Quote %s expired before the order", rfq.rfq_id)
+            return False
+        if not is_price_acceptable(rfq.side, rfq.price, price_limit):
+            result.reason = PRICE_NOT_ACCEPTABLE
+            logger.info(
+                "Quote %s at %s is beyond the price limit %s",
+                rfq.rfq_id,
+                rfq.price,
+                price_limit,
+            )
+            return False
+        order_data["price"] = str(rfq.price)
+        order_data["rfq_id"] = rfq.rfq_id
+        return True
+
+    @staticmethod
+    def _log_order_response(order_data: dict, order_response: OrderResponse):
+        if order_response.is_rejected:
+            logger.exception(
+                "Order %s was rejected",
+                order_response.order_id,
+                extra={
+                    "order_request": order_data,
+                    "order_response": order_response,
+                },
+            )
+        else:
+            logger.info(
+                "Order %s was successfully placed",
+                order_response.order_id,
+                extra={
+                    "order_request": order_data,
+                    "order_response": order_response,
+                },
+            )
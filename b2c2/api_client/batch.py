@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+from b2c2.common.models import RFQResponse
+
+# Maximum number of RFQs of a batch sent at the same time.
+DEFAULT_RFQ_CONCURRENCY = 8
+
+
+@dataclass
+class RFQResult:
+    """Outcome of a single RFQ sent as part of a batch."""
+
+    # RFQ payload sent to the server, including the generated client_rfq_id.
+    data: dict
+    # Response of the server, None if the RFQ failed.
+    response: Optional[RFQResponse] = None
+    # Exception raised while requesting the quote, if any.
+    error: Optional[Exception] = None
+    # Round trip time of the request in seconds.
+    elapsed: float = 0.0
+
+    @property
+    def client_rfq_id(self) -> str:
+        return self.data["client_rfq_id"]
+
+    @property
+    def ok(self) -> bool:
+        return self.response is not None
+
+
+@dataclass
+class RFQBatch:
+    """Results of `get_rfqs`, in the same order as the requests."""
+
+    results: List[RFQResult] = field(default_factory=list)
+    # Wall clock time of the whole batch in seconds.
+    elapsed: float = 0.0
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __getitem__(self, index):
+        return self.results[index]
+
+    @property
+    def responses(self) -> List[Optional[RFQResponse]]:
+        return [result.response for result in self.results]
+
+    @property
+    def errors(self) -> List[RFQResult]:
+        return [result for result in self.results if not result.ok]
+
+
+def build_rfq_results(build_rfq_data, rfq_requests: Iterable[Tuple]) -> List[RFQResult]:
+    """
+    Prepares one `RFQResult` per (instrument, side, quantity) request.
+    :param build_rfq_data: callable building the RFQ payload of a request
+    :param rfq_requests: iterable of (instrument, side, quantity) tuples
+    :return: list of results holding the payloads to send
+    """
+    return [
+        RFQResult(data=build_rfq_data(instrument, side, quantity))
+        for instrument, side, quantity in rfq_requests
+    ]
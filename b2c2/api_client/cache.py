@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import OrderedDict
+from decimal import ROUND_CEILING, Decimal
+from typing import Any, Optional, Tuple
+
+from b2c2.common.models import Instrument, RFQResponse, Side
+
+# Maximum number of quotes kept.
+DEFAULT_QUOTE_CACHE_SIZE = 256
+# Seconds before `valid_until` from which a quote is not reused anymore.
+DEFAULT_SAFETY_MARGIN = 1.0
+
+
+class QuoteCache:
+    """
+    Thread-safe LRU cache of `RFQResponse` objects keyed by
+    (instrument, side, quantity bucket).
+
+    A quote is reused until `valid_until` minus `safety_margin`. The time left
+    until `valid_until` is estimated with the `ServerClock` of the client (or from
+    the `created` date of the quote) when it is received, and counted down on a
+    monotonic clock, so the expiry does not depend on the local wall clock.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_QUOTE_CACHE_SIZE,
+        safety_margin: float = DEFAULT_SAFETY_MARGIN,
+        quantity_step=None,
+        clock=time.monotonic,
+        server_clock=None,
+    ):
+        """
+        :param maxsize: maximum number of quotes kept, the least recently used
+        ones are evicted first
+        :param safety_margin: seconds before `valid_until` from which a quote is
+        considered expired
+        :param quantity_step: size of the quantity buckets. Ex: "0.1" reuses the
+        quote of 0.15 BTC for 0.12 BTC. Quantities must match exactly if not given.
+        :param clock: monotonic clock returning seconds
+        :param server_clock: `ServerClock` giving the time left until `valid_until`.
+        The clients set their own. If not set, the lifetime of a quote is counted
+        from its reception.
+        """
+        self.maxsize = maxsize
+        self.safety_margin = safety_margin
+        self.quantity_step = Decimal(str(quantity_step)) if quantity_step else None
+        self.clock = clock
+        self.server_clock = server_clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (instrument, side, quantity bucket) -> (expiry on `clock`, quote)
+        self._quotes = OrderedDict()  # type: OrderedDict[tuple, Tuple[float, Any]]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._quotes)
+
+    @property
+    def hit_ratio(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def get_key(self, instrument, side, quantity) -> tuple:
+        """
+        :param instrument: Instrument object or instrument name (Ex: "BTCUSD.SPOT")
+        :param side: "buy" or "sell"
+        :param quantity: A numerical value to be handled as Decimal.
+        :return: (instrument name, side, quantity bucket)
+        """
+        if isinstance(instrument, Instrument):
+            instrument = instrument.name
+        quantity = Decimal(str(quantity))
+        if self.quantity_step:
+            buckets = (quantity / self.quantity_step).to_integral_value(ROUND_CEILING)
+            quantity = buckets * self.quantity_step
+        return instrument, Side(side).value, quantity.normalize()
+
+    def get(self, instrument, side, quantity) -> Optional[RFQResponse]:
+        """
+        :return: the cached quote, None if there is none or it expired
+        """
+        key = self.get_key(instrument, side, quantity)
+        with self._lock:
+            entry = self._quotes.get(key)
+            if entry is not None:
+                expires_at, rfq = entry
+                if self.clock() < expires_at:
+                    self._quotes.move_to_end(key)
+                    self.hits += 1
+                    return rfq
+                del self._quotes[key]
+            self.misses += 1
+            return None
+
+    def put(self, instrument, side, quantity, rfq: RFQResponse):
+        """
+        Caches a quote received just now.
+        :param rfq: response of the RFQ
+        """
+        if self.server_clock is not None:
+            lifetime = self.server_clock.time_left(rfq.valid_until)
+        else:
+            lifetime = (rfq.valid_until - rfq.created).total_seconds()
+        expires_at = self.clock() + lifetime - self.safety_margin
+        key = self.get_key(instrument, side, quantity)
+        with self._lock:
+            self._quotes[key] = (expires_at, rfq)
+            self._quotes.move_to_end(key)
+            while len(self._quotes) > self.maxsize:
+                self._quotes.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._quotes.clear()
+
+    def stats(self) -> dict:
+        """:return: size, hits, misses, evictions and hit ratio of the cache"""
+        return dict(
+            size=len(self),
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            hit_ratio=self.hit_ratio,
+        )
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+import datetime
+import email.utils
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from b2c2.common.construct import to_datetime
+from b2c2.common.models import as_utc
+
+# Number of recent samples the offset is estimated from.
+DEFAULT_CLOCK_WINDOW = 8
+# Weight of the new samples in the smoothed round trip time (as in TCP).
+RTT_SMOOTHING = 0.125
+# Resolution of the `Date` response header, in seconds.
+DATE_HEADER_RESOLUTION = 1.0
+
+
+def parse_date_header(value) -> Optional[datetime.datetime]:
+    """
+    :param value: value of a `Date` header. Ex: Wed, 21 Oct 2015 07:28:00 GMT
+    :return: UTC datetime, None if missing or invalid
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return as_utc(email.utils.parsedate_to_datetime(value))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class ServerClock:
+    """
+    Running estimate of the server's clock, used to decide whether quotes and
+    orders are still valid regardless of the skew of the local clock.
+
+    Each response gives a sample: the server time it carries (`Date` header, or
+    the `created` field of a newly created RFQ or order) was read between sending
+    the request and receiving the response, so the offset is estimated against
+    the middle of that interval, with an uncertainty of half the round trip time
+    plus the resolution of the timestamp. The offset of the most accurate recent
+    sample is used, as NTP does.
+
+    Local time is measured on a monotonic clock anchored to the wall clock once,
+    so adjustments of the local clock do not affect the estimate.
+    """
+
+    def __init__(
+        self,
+        window: int = DEFAULT_CLOCK_WINDOW,
+        clock=time.monotonic,
+        wall_clock=time.time,
+    ):
+        """
+        :param window: number of recent samples the offset is estimated from
+        :param clock: monotonic clock returning seconds
+        :param wall_clock: clock returning the seconds since the epoch
+        """
+        self.clock = clock
+        self._origin = wall_clock() - clock()
+        self._samples = deque(maxlen=window)  # (uncertainty, offset)
+        self._rtt = None  # type: Optional[float]
+        self._lock = threading.Lock()
+
+    @property
+    def offset(self) -> float:
+        """Estimated seconds the server's clock is ahead of the local one."""
+        with self._lock:
+            return min(self._samples)[1] if self._samples else 0.0
+
+    @property
+    def uncertainty(self) -> Optional[float]:
+        """Maximum error of `offset` in seconds, None before the first sample."""
+        with self._lock:
+            return min(self._samples)[0] if self._samples else None
+
+    @property
+    def rtt(self) -> Optional[float]:
+        """Smoothed round trip time in seconds, None before the first sample."""
+        return self._rtt
+
+    def observe(
+        self,
+        sent: float,
+        received: float,
+        server_time: datetime.datetime,
+        resolution: float = 0.0,
+    ):
+        """
+        Adds a sample.
+        :param sent: `clock()` when the request was sent
+        :param received: `clock()` when the response was received
+        :param server_time: server time read while handling the request
+        :param resolution: resolution of `server_time` in seconds
+        """
+        rtt = received - sent
+        if rtt < 0:
+            return
+        # The server time is truncated to its resolution.
+        server_timestamp = as_utc(server_time).timestamp() + resolution / 2
+        local_timestamp = self._origin + (sent + received) / 2
+        sample = (rtt / 2 + resolution / 2, server_timestamp - local_timestamp)
+        with self._lock:
+            self._samples.append(sample)
+            if self._rtt is None:
+                self._rtt = rtt
+            else:
+                self._rtt += RTT_SMOOTHING * (rtt - self._rtt)
+
+    def observe_response(self, sent: float, received: float, headers, payload=None):
+        """
+        Adds the samples carried by a response: its `Date` header and, for newly
+        created RFQs and orders, their `created` field.
+        :param sent: `clock()` when the request was sent
+        :param received: `clock()` when the response was received
+        :param headers: headers of the response
+        :param payload: decoded body of a POST response
+        """
+        try:
+            date = parse_date_header(headers.get("Date"))
+        except AttributeError:
+            date = None
+        if date is not None:
+            self.observe(sent, received, date, resolution=DATE_HEADER_RESOLUTION)
+
+        created = payload.get("created") if isinstance(payload, dict) else None
+        if isinstance(created, str):
+            try:
+                created = as_utc(to_datetime(created))
+            except ValueError:
+                return
+            self.observe(sent, received, created)
+
+    def timestamp(self) -> float:
+        """:return: estimated seconds since the epoch on the server"""
+        return self._origin + self.clock() + self.offset
+
+    def now(self) -> datetime.datetime:
+        """:return: estimated current time of the server, in UTC"""
+        return datetime.datetime.fromtimestamp(self.timestamp(), datetime.timezone.utc)
+
+    def time_left(self, deadline: datetime.datetime) -> float:
+        """
+        :param deadline: server time. Naive datetimes are considered to be in UTC.
+        :return: seconds left until the deadline on the server, negative if passed
+        """
+        return as_utc(deadline).timestamp() - self.timestamp()
+
+    def has_expired(self, deadline: datetime.datetime, margin: float = 0.0) -> bool:
+        """
+        :param deadline: server time. Ex: `RFQResponse.valid_until`
+        :param margin: seconds the deadline must be ahead by, Ex: the time for a
+        request to reach the server
+        """
+        return self.time_left(deadline) <= margin
+
+    def valid_until(self, seconds: float) -> datetime.datetime:
+        """
+        :param seconds: validity of an order
+        :return: the server time in `seconds`, for `valid_until`
+        """
+        return datetime.datetime.fromtimestamp(
+            self.timestamp() + seconds, datetime.timezone.utc
+        )
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import functools
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from b2c2.api_client.exceptions import DeadlineExceeded
+from b2c2.api_client.timeouts import get_remaining
+
+
+def get_request_key(endpoint: str, params: dict = None) -> tuple:
+    """
+    :param endpoint: Ex: /order/
+    :param params: query string parameters
+    :return: key identifying the GET requests returning the same payload
+    """
+    if not params:
+        return endpoint, ()
+    return endpoint, tuple(sorted((key, str(value)) for key, value in params.items()))
+
+
+class BaseSingleFlight:
+    """
+    Result sharing of concurrent identical calls, with an optional micro-cache
+    keeping the results for `ttl` seconds once received.
+
+    The results are shared between callers as is: they must not be modified.
+    """
+
+    def __init__(self, ttl: float = 0.0, clock=time.monotonic):
+        """
+        :param ttl: seconds a result is reused after being received, not cached
+        if 0. Errors and None results are never cached.
+        :param clock: monotonic clock returning seconds
+        """
+        self.ttl = ttl
+        self.clock = clock
+        # Calls which were executed.
+        self.calls = 0
+        # Calls which waited for the result of an identical call in flight.
+        self.shared = 0
+        # Calls answered by the micro-cache.
+        self.cache_hits = 0
+        # key -> (expiry on `clock`, result)
+        self._results = {}  # type: Dict[tuple, Tuple[float, Any]]
+        self._lock = threading.Lock()
+
+    def _get_cached(self, key: tuple) -> Tuple[bool, Any]:
+        """
+        Must be called with the lock held.
+        :return: (True, result) if an unexpired result is cached, (False, None)
+        otherwise
+        """
+        if not self.ttl:
+            return False, None
+        cached = self._results.get(key)
+        if cached is None:
+            return False, None
+        expires_at, result = cached
+        if self.clock() >= expires_at:
+            del self._results[key]
+            return False, None
+        self.cache_hits += 1
+        return True, result
+
+    def _cache(self, key: tuple, result):
+        if self.ttl and result is not None:
+            with self._lock:
+                self._results[key] = (self.clock() + self.ttl, result)
+
+    def clear(self):
+        """Drops the cached results, Ex: once an order changed the balance."""
+        with self._lock:
+            self._results.clear()
+
+    def stats(self) -> dict:
+        return dict(calls=self.calls, shared=self.shared, cache_hits=self.cache_hits)
+
+
+class _Call:
+    """Call in flight, awaited by the identical calls made meanwhile."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None  # type: Optional[BaseException]
+
+
+class SingleFlight(BaseSingleFlight):
+    """
+    Thread-safe single-flight group: while a call is in flight, the identical
+    calls made by other threads wait for it and receive its result, or its
+    exception, instead of making their own.
+    """
+
+    def __init__(self, ttl: float = 0.0, clock=time.monotonic):
+        super().__init__(ttl=ttl, clock=clock)
+        self._calls = {}  # type: Dict[tuple, _Call]
+
+    def do(self, key: tuple, function: Callable[[], Any], expires_at: float = None):
+        """
+        :param key: identifies the identical calls, see `get_request_key()`
+        :param function: makes the call
+        :param expires_at: monotonic time after which a waiting caller gives up
+        :return: result of the function, possibly shared or cached
+        :raise DeadlineExceeded: if the shared call is not over by `expires_at`
+        """
+        with self._lock:
+            found, result = self._get_cached(key)
+            if found:
+                return result
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            remaining = get_remaining(expires_at)
+            if not call.done.wait(None if remaining is None else max(remaining, 0)):
+                raise DeadlineExceeded()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        self._cache(key, call.result)
+        return call.result
+
+
+class AsyncSingleFlight(BaseSingleFlight):
+    """
+    Single-flight group of an event loop: while a call is in flight, the
+    identical calls made by other tasks await it and receive its result, or its
+    exception. Cancelling a waiting task does not cancel the shared call.
+    """
+
+    def __init__(self, ttl: float = 0.0, clock=time.monotonic):
+        super().__init__(ttl=ttl, clock=clock)
+        self._calls = {}  # type: Dict[tuple, asyncio.Future]
+
+    async def do(
+        self,
+        key: tuple,
+        function: Callable[[], Awaitable],
+        expires_at: float = None,
+    ):
+        """
+        :param key: identifies the identical calls, see `get_request_key()`
+        :param function: coroutine function making the call
+        :param expires_at: monotonic time after which a waiting caller gives up
+        :return: result of the function, possibly shared or cached
+        :raise DeadlineExceeded: if the shared call is not over by `expires_at`
+        """
+        with self._lock:
+            found, result = self._get_cached(key)
+            if found:
+                return result
+            task = self._calls.get(key)
+            if task is None:
+                task = self._calls[key] = asyncio.ensure_future(function())
+                task.add_done_callback(functools.partial(self._on_done, key))
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        remaining = get_remaining(expires_at)
+        try:
+            if remaining is None:
+                result = await asyncio.shield(task)
+            else:
+                result = await asyncio.wait_for(asyncio.shield(task), max(remaining, 0))
+        except asyncio.TimeoutError:
+            if task.done():
+                raise
+            raise DeadlineExceeded() from None
+        return result
+
+    def _on_done(self, key: tuple, task: asyncio.Future):
+        with self._lock:
+            self._calls.pop(key, None)
+        # The call completes even if all its callers gave up.
+        if not task.cancelled() and task.exception() is None:
+            self._cache(key, task.result())
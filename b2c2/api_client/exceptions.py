@@ -5,6 +5,14 @@ class ConnectionLost(Exception):
     message = "Connection is lost"
 
 
+class DeadlineExceeded(ConnectionLost):
+    message = "Deadline exceeded before a response was received"
+
+
+class OrderNotReceived(ConnectionLost):
+    message = "The order did not reach the server before it expired"
+
+
 class HTTPException(Exception):
     message = None
 
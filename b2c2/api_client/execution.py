@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+import datetime
+import logging
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Optional, Tuple
+
+from b2c2.api_client.exceptions import (
+    BadRequest,
+    ConnectionLost,
+    OrderNotReceived,
+    ServiceUnavailable,
+    TooManyRequests,
+)
+from b2c2.common.constants import DATETIME_FORMAT
+from b2c2.common.construct import to_datetime
+from b2c2.common.instruments import instrument_registry
+from b2c2.common.models import Instrument, OrderResponse, RFQResponse, Side, as_utc
+
+logger = logging.getLogger(__name__)
+
+# Seconds the FOK orders sent by `execute_rfq` are valid for.
+DEFAULT_ORDER_VALIDITY = 10
+
+# Maximum number of times an order is sent again after a transport failure.
+DEFAULT_ORDER_RESUBMISSIONS = 2
+
+# Responses to an order after which it may still have been accepted upstream.
+# Orders are not retried on them, but looked up and resubmitted.
+UNKNOWN_OUTCOME_ERRORS = (TooManyRequests, ServiceUnavailable)
+
+# Reasons for not sending the order.
+PRICE_NOT_ACCEPTABLE = "price_not_acceptable"
+QUOTE_EXPIRED = "quote_expired"
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of an `execute_rfq` call, with the time spent in each stage."""
+
+    # Quote received from the server.
+    rfq: RFQResponse
+    # Response to the FOK order, None if the order was not sent.
+    order: Optional[OrderResponse] = None
+    # Why the order was not sent: PRICE_NOT_ACCEPTABLE or QUOTE_EXPIRED
+    reason: Optional[str] = None
+    # Seconds between sending the RFQ and decoding its response.
+    quote_rtt: float = 0.0
+    # Seconds spent locally between the quote and sending the order.
+    processing: float = 0.0
+    # Seconds between sending the order and decoding its response.
+    order_rtt: float = 0.0
+
+    @property
+    def executed(self) -> bool:
+        return self.order is not None and not self.order.is_rejected
+
+    @property
+    def quote_to_order(self) -> float:
+        """Seconds between receiving the quote and receiving the order response."""
+        return self.processing + self.order_rtt
+
+    @property
+    def elapsed(self) -> float:
+        return self.quote_rtt + self.processing + self.order_rtt
+
+
+def build_fok_order_template(
+    instrument,
+    side,
+    quantity,
+    slippage=None,
+    executing_unit=None,
+    validity=DEFAULT_ORDER_VALIDITY,
+    force_open=False,
+    now: datetime.datetime = None,
+) -> dict:
+    """
+    Builds the payload of a FOK order ahead of the quote, so that only its price
+    is left to set once the quote arrives.
+    :param instrument: Instrument object or instrument name (Ex: "BTCUSD.SPOT"),
+    interned in the shared `instrument_registry`
+    :param side: "buy" or "sell"
+    :param quantity: A numerical value to be handled as Decimal.
+    :param slippage: acceptable slippage in basis points
+    :param executing_unit: executing unit of the order
+    :param validity: seconds the order is valid for
+    :param force_open: whether to open a new contract (CFD instruments only)
+    :param now: current time of the server (see `ServerClock.now()`), defaults to
+    the local clock
+    :return: order payload without price
+    """
+    if not isinstance(instrument, Instrument):
+        instrument = instrument_registry.get(instrument)
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    valid_until = as_utc(now) + datetime.timedelta(seconds=validity)
+    order = dict(
+        instrument=instrument.name,
+        side=Side(side).value,
+        quantity=str(quantity),
+        client_order_id=str(uuid.uuid4()),
+        order_type="FOK",
+        valid_until=valid_until.strftime(DATETIME_FORMAT),
+        executing_unit=executing_unit,
+    )
+    if slippage is not None:
+        order["acceptable_slippage_in_basis_points"] = str(slippage)
+    if instrument.type == "CFD":
+        order["force_open"] = force_open
+    return order
+
+
+def is_price_acceptable(side, price: Decimal, price_limit=None) -> bool:
+    """
+    :param side: "buy" or "sell"
+    :param price: price of the quote
+    :param price_limit: highest price to buy at, or lowest price to sell at
+    :return: True if there is no limit or the price is within it
+    """
+    if price_limit is None:
+        return True
+    price_limit = Decimal(str(price_limit))
+    if Side(side) == Side.buy:
+        return price <= price_limit
+    return price >= price_limit
+
+
+def prepare_resubmission(order_data: dict) -> Tuple[dict, datetime.datetime]:
+    """
+    Makes an order payload safe to send several times: the server accepts a
+    `client_order_id` only once, so resending the same payload can not fill the
+    order twice.
+    :param order_data: order payload
+    :return: (payload with a `client_order_id`, its `valid_until` in UTC)
+    """
+    if not order_data.get("client_order_id"):
+        order_data = dict(order_data, client_order_id=str(uuid.uuid4()))
+    return order_data, as_utc(to_datetime(order_data["valid_until"]))
+
+
+class OrderResubmission:
+    """
+    Keeps the state of the resubmission of an order sent without response.
+
+    The order is looked up by its `client_order_id` (`lookup_endpoint`). If the
+    server does not have it, it is sent again while it is valid, at most
+    `attempts` times. After a resend failing with one of `RESEND_ERRORS`, the
+    order is looked up again.
+    """
+
+    # Received in the meantime (its identifier is already used), or unknown
+    # outcome.
+    RESEND_ERRORS = (BadRequest, *UNKNOWN_OUTCOME_ERRORS)
+
+    def __init__(
+        self,
+        order_data: dict,
+        valid_until: datetime.datetime,
+        has_expired: Callable[[datetime.datetime], bool],
+        attempts: int = DEFAULT_ORDER_RESUBMISSIONS,
+    ):
+        """
+        :param order_data: order payload, with its `client_order_id`
+        :param valid_until: `valid_until` of the order, in UTC
+        :param has_expired: returns True if an order sent now would reach the
+        server after the given expiry
+        :param attempts: maximum number of times the order is sent again
+        """
+        self.order_data = order_data
+        self.valid_until = valid_until
+        self.has_expired = has_expired
+        self.client_order_id = order_data["client_order_id"]
+        self.lookup_endpoint = f"/order/{self.client_order_id}/"
+        self.remaining = attempts
+
+    @property
+    def done(self) -> bool:
+        return self.remaining <= 0
+
+    @staticmethod
+    def found(response) -> dict:
+        """
+        Consumes the response of a lookup which found the order.
+        :return: the order returned by the server
+        :raise ConnectionLost: if there was no response
+        """
+        if not response:
+            raise ConnectionLost()
+        return response
+
+    def not_found(self):
+        """
+        Consumes a lookup which did not find the order, before it is sent again.
+        :raise OrderNotReceived: if it is too late to send it
+        """
+        # The order must reach the server before it expires.
+        if self.has_expired(self.valid_until):
+            raise OrderNotReceived()
+        self.remaining -= 1
+        logger.warning("Order %s was not received, resending", self.client_order_id)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Union
+
+from b2c2.api_client.metrics import LatencyHistogram
+from b2c2.common.models import MarketOrderRequest
+
+# Number of threads sending the orders.
+DEFAULT_ORDER_WORKERS = 4
+# Orders of the same instrument sent at the same time.
+DEFAULT_MAX_IN_FLIGHT_PER_INSTRUMENT = 1
+
+
+@dataclass
+class QueuedOrder:
+    """Order waiting in the queue of an `OrderExecutor`."""
+
+    data: dict
+    future: Future
+    # `time.perf_counter()` when the order was submitted.
+    submitted: float
+    # Context of the submitting thread, Ex: its deadline.
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+    @property
+    def instrument(self) -> str:
+        return self.data["instrument"]
+
+
+class OrderExecutor:
+    """
+    Sends orders in the background with a `B2C2Client`, so that the submitting
+    threads do not wait for the round trips.
+
+    Orders are queued and sent by a pool of worker threads in submission order,
+    except that at most `max_in_flight_per_instrument` orders of an instrument
+    are sent at the same time: the next orders of a busy instrument wait while
+    the orders of the other instruments go ahead. Each submission returns a
+    `Future` resolving to the `OrderResponse`, or raising the `APIError`,
+    `HTTPException` or `ConnectionLost` of the request.
+        with OrderExecutor(client) as executor:
+            future = executor.submit(fok_order_request)
+            ...
+            order_response = future.result()
+    """
+
+    def __init__(
+        self,
+        client,
+        workers: int = DEFAULT_ORDER_WORKERS,
+        max_in_flight_per_instrument: int = DEFAULT_MAX_IN_FLIGHT_PER_INSTRUMENT,
+        max_queue_size: int = 0,
+    ):
+        """
+        :param client: B2C2Client sending the orders
+        :param workers: number of threads sending the orders
+        :param max_in_flight_per_instrument: orders of an instrument sent at the
+        same time
+        :param max_queue_size: orders waiting to be sent above which `submit`
+        blocks, unbounded if 0
+        """
+        self.client = client
+        self.max_in_flight_per_instrument = max_in_flight_per_instrument
+        self.max_queue_size = max_queue_size
+        # Seconds the orders waited in the queue.
+        self.queue_latency = LatencyHistogram()
+        # Seconds between the submission and the response of the orders.
+        self.latency = LatencyHistogram()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._queue = deque()  # type: Deque[QueuedOrder]
+        self._in_flight = defaultdict(int)  # type: Dict[str, int]
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"b2c2-order-{index}", daemon=True)
+            for index in range(workers)
+        ]  # type: List[threading.Thread]
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of orders waiting to be sent."""
+        return len(self._queue)
+
+    @property
+    def in_flight(self) -> Dict[str, int]:
+        """Number of orders being sent, by instrument."""
+        with self._condition:
+            return {key: count for key, count in self._in_flight.items() if count}
+
+    def submit(
+        self,
+        order: Union[MarketOrderRequest, dict],
+        block: bool = True,
+        timeout: float = None,
+    ) -> Future:
+        """
+        Queues an order.
+        :param order: `FillOrKillOrderRequest`, `MarketOrderRequest` or payload
+        :param block: whether to wait for room in a full queue
+        :param timeout: seconds to wait for room in a full queue
+        :return: future resolving to the `OrderResponse`
+        :raise queue.Full: if the queue stayed full
+        :raise RuntimeError: if the executor was shut down
+        """
+        data = order if isinstance(order, dict) else order.dict()
+        queued = QueuedOrder(data=data, future=Future(), submitted=time.perf_counter())
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Can not submit orders after shutdown")
+            if not self._has_room() and not (
+                block and self._condition.wait_for(self._has_room, timeout)
+            ):
+                raise queue.Full()
+            self._queue.append(queued)
+            self.submitted += 1
+            self._condition.notify_all()
+        return queued.future
+
+    def _has_room(self) -> bool:
+        return not self.max_queue_size or len(self._queue) < self.max_queue_size
+
+    def _next(self):
+        """
+        Must be called with the condition held.
+        :return: the oldest order whose instrument can take one more order in
+        flight, None if there is none
+        """
+        for index, queued in enumerate(self._queue):
+            if self._in_flight[queued.instrument] < self.max_in_flight_per_instrument:
+                del self._queue[index]
+                return queued
+        return None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                queued = None
+                while queued is None:
+                    queued = self._next()
+                    if queued is None:
+                        if self._shutdown and not self._queue:
+                            return
+                        self._condition.wait()
+                self._in_flight[queued.instrument] += 1
+                # Room was made in the queue.
+                self._condition.notify_all()
+            try:
+                if queued.future.set_running_or_notify_cancel():
+                    self.queue_latency.record(time.perf_counter() - queued.submitted)
+                    queued.context.run(self._send, queued)
+            finally:
+                with self._condition:
+                    self._in_flight[queued.instrument] -= 1
+                    self._condition.notify_all()
+
+    def _send(self, queued: QueuedOrder):
+        try:
+            order_response = self.client.create_order(queued.data)
+        except Exception as exc:
+            with self._condition:
+                self.failed += 1
+            queued.future.set_exception(exc)
+        else:
+            with self._condition:
+                self.completed += 1
+            queued.future.set_result(order_response)
+        self.latency.record(time.perf_counter() - queued.submitted)
+
+    def stats(self) -> dict:
+        """
+        :return: counters, queue depth, orders in flight and latency quantiles
+        """
+        return dict(
+            submitted=self.submitted,
+            completed=self.completed,
+            failed=self.failed,
+            queue_depth=self.queue_depth,
+            in_flight=self.in_flight,
+            queue_latency=self.queue_latency.snapshot(),
+            latency=self.latency.snapshot(),
+        )
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """
+        Stops accepting orders. The queued orders are still sent unless
+        `cancel_pending` is set.
+        :param wait: whether to wait for the queued orders to be sent
+        :param cancel_pending: whether to cancel the orders not sent yet
+        """
+        with self._condition:
+            self._shutdown = True
+            if cancel_pending:
+                while self._queue:
+                    self._queue.popleft().future.cancel()
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from b2c2.api_client.exceptions import DeadlineExceeded
+from b2c2.api_client.metrics import RequestInfo
+
+logger = logging.getLogger(__name__)
+
+# Seconds an observation of the connection is trusted for.
+DEFAULT_HEALTH_TTL = 30.0
+
+# Connection states.
+UP = "up"
+DOWN = "down"
+UNKNOWN = "unknown"
+
+Probe = Callable[[], bool]
+
+
+class ConnectionHealth:
+    """
+    Cached liveness of the connection to the server.
+
+    The state is updated passively from the outcome of the real requests (any
+    HTTP response means the server is reachable, a transport error that it is
+    not) and by probes, either run on demand or periodically in the background.
+    An observation is trusted for `ttl` seconds, after which the state is UNKNOWN.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_HEALTH_TTL, clock=time.monotonic):
+        """
+        :param ttl: seconds an observation is trusted for
+        :param clock: monotonic clock returning seconds
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self.failures = 0
+        self._up = None  # type: Optional[bool]
+        self._observed_at = None  # type: Optional[float]
+        self._lock = threading.Lock()
+        self._probing = False
+        self._stopped = threading.Event()
+        self._prober = None  # type: Optional[threading.Thread]
+        # Number of `start()` calls not stopped yet.
+        self._starts = 0
+
+    @property
+    def state(self) -> str:
+        """UP, DOWN, or UNKNOWN if nothing was observed for `ttl` seconds."""
+        with self._lock:
+            if self._up is None or self.clock() - self._observed_at >= self.ttl:
+                return UNKNOWN
+            return UP if self._up else DOWN
+
+    def record(self, up: bool):
+        """
+        :param up: whether the server could be reached
+        """
+        with self._lock:
+            if not up and self._up is not False:
+                logger.warning("Connection to the server lost")
+            self.failures = 0 if up else self.failures + 1
+            self._up = up
+            self._observed_at = self.clock()
+
+    def observe(self, info: RequestInfo):
+        """
+        Request hook updating the state from the outcome of a request.
+        :param info: completed or failed request
+        """
+        if info.status_code is not None:
+            self.record(True)
+        elif info.error is not None and not isinstance(info.error, DeadlineExceeded):
+            self.record(False)
+
+    def probe(self, probe: Probe) -> bool:
+        """
+        Runs a probe and records its outcome.
+        :param probe: function returning whether the server could be reached. Ex:
+        `B2C2Client.check_connection`
+        :return: outcome of the probe
+        """
+        try:
+            up = bool(probe())
+        except Exception:
+            logger.exception("Connection probe failed")
+            up = False
+        self.record(up)
+        return up
+
+    def check(self, probe: Probe) -> bool:
+        """
+        Tells whether requests can be sent, only blocking when the connection is
+        known to be down: the probe is then run to find out whether it is back.
+        An UNKNOWN state is refreshed by a probe in the background.
+        :param probe: function returning whether the server could be reached
+        :return: False if the server could not be reached
+        """
+        state = self.state
+        if state == DOWN:
+            return self.probe(probe)
+        if state == UNKNOWN:
+            self._probe_in_background(probe)
+        return True
+
+    def _probe_in_background(self, probe: Probe):
+        with self._lock:
+            if self._probing:
+                return
+            self._probing = True
+
+        def run():
+            try:
+                self.probe(probe)
+            finally:
+                with self._lock:
+                    self._probing = False
+
+        threading.Thread(target=run, name="b2c2-health-probe", daemon=True).start()
+
+    def start(self, probe: Probe, interval: float = None):
+        """
+        Probes the connection periodically in a background thread, skipping the
+        probes while the requests keep the state fresh. The probes go on until
+        `stop()` is called as many times as `start()`, so a health shared by
+        several clients is probed while one of them needs it. Only the probe of
+        the first call is used.
+        :param probe: function returning whether the server could be reached
+        :param interval: seconds between two probes, defaults to half the TTL
+        """
+        interval = self.ttl / 2 if interval is None else interval
+
+        def run(stopped: threading.Event):
+            while not stopped.wait(interval):
+                with self._lock:
+                    fresh = (
+                        self._observed_at is not None
+                        and self.clock() - self._observed_at < interval
+                    )
+                if not fresh:
+                    self.probe(probe)
+
+        with self._lock:
+            self._starts += 1
+            if self._prober is not None:
+                return
+            self._stopped = threading.Event()
+            self._prober = threading.Thread(
+                target=run,
+                args=(self._stopped,),
+                name="b2c2-health-prober",
+                daemon=True,
+            )
+            self._prober.start()
+
+    def stop(self):
+        """
+        Stops the background probes once every `start()` is stopped, without
+        waiting for one in progress.
+        """
+        with self._lock:
+            if self._starts > 1:
+                self._starts -= 1
+                return
+            self._starts = 0
+            self._stopped.set()
+            self._prober = None
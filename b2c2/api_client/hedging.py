@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from dataclasses import dataclass
+from typing import Optional
+
+from b2c2.api_client.metrics import TOTAL, ClientMetrics, get_endpoint_template
+
+# Only idempotent requests are hedged.
+HEDGED_METHODS = ("get",)
+
+
+@dataclass
+class HedgePolicy:
+    """
+    When to send a second, hedged, copy of an idempotent request: if the first
+    attempt has not been answered after the `quantile` of the endpoint's recent
+    latency, the second one is sent and the first response received is used.
+    """
+
+    # Latency quantile after which the hedged request is sent.
+    quantile: float = 0.95
+    # Number of requests to the endpoint needed to trust its latency quantile.
+    min_samples: int = 20
+    # Delay used until `min_samples` requests were made, no hedging if None.
+    default_delay: Optional[float] = None
+    # Bounds of the delay, in seconds.
+    min_delay: float = 0.005
+    max_delay: Optional[float] = None
+
+    def get_delay(
+        self, metrics: ClientMetrics, method: str, endpoint: str
+    ) -> Optional[float]:
+        """
+        :param metrics: metrics of the client, holding the latency histograms
+        :param method: "get" or "post"
+        :param endpoint: path of the request. Ex: /balance/
+        :return: seconds to wait for the first attempt before sending the hedged
+        one, None if the request must not be hedged
+        """
+        if method not in HEDGED_METHODS:
+            return None
+        histogram = metrics.histograms.get(
+            (method, get_endpoint_template(endpoint), TOTAL)
+        )
+        if histogram is None or histogram.count < self.min_samples:
+            delay = self.default_delay
+        else:
+            delay = histogram.quantile(self.quantile)
+        if delay is None:
+            return None
+        delay = max(delay, self.min_delay)
+        return delay if self.max_delay is None else min(delay, self.max_delay)
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+Request instrumentation of the clients.
+
+Every request goes through `ClientMetrics.track()`, which records per endpoint:
+- latency histograms of the total time and, where the HTTP library reports it,
+  the time to the first byte (`requests` only, `httpx` only reports the total),
+- request counters by status code, error counters by exception class, retry
+  and hedged request counters,
+- request and response payload sizes,
+and runs the pre/post request hooks. Metrics are exported with `snapshot()` or in
+the Prometheus text format with `to_prometheus()`.
+"""
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Latency phases.
+TOTAL = "total"
+TTFB = "ttfb"
+
+# Outcomes of the hedged requests.
+HEDGE_SENT = "sent"
+HEDGE_WON = "won"
+
+# Quantiles exported for each histogram.
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+# Sub-buckets per power of two, giving a relative error below 1 / 2 ** 5 = 3%.
+SUB_BUCKET_BITS = 6
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF_COUNT = SUB_BUCKET_COUNT >> 1
+
+
+def get_endpoint_template(path: str) -> str:
+    """
+    Replaces the identifiers of a path so that the metrics of all the orders or
+    trades are grouped together.
+    :param path: Ex: /order/03a85fb7-8b31-4388-b6e7-170c65ed242f/
+    :return: Ex: /order/{id}/
+    """
+    segments = path.strip("/").split("/")
+    if len(segments) > 1:
+        segments[1:] = ["{id}"] * (len(segments) - 1)
+    template = "/" + "/".join(segments)
+    return template + "/" if path.endswith("/") and template != "/" else template
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of durations, in microseconds.
+
+    Values are counted in buckets whose width doubles every `SUB_BUCKET_HALF_COUNT`
+    buckets, so the relative error is the same from microseconds to minutes while
+    only the buckets used are stored.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None  # type: Optional[float]
+        self.max = None  # type: Optional[float]
+        self._buckets = defaultdict(int)  # type: Dict[int, int]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_bucket(value: int) -> int:
+        """:return: index of the bucket of a value in microseconds"""
+        if value < SUB_BUCKET_COUNT:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS
+        return shift * SUB_BUCKET_HALF_COUNT + (value >> shift)
+
+    @staticmethod
+    def get_bucket_limit(bucket: int) -> int:
+        """:return: highest value in microseconds counted in the bucket"""
+        if bucket < SUB_BUCKET_COUNT:
+            return bucket
+        shift = bucket // SUB_BUCKET_HALF_COUNT - 1
+        sub_bucket = bucket - shift * SUB_BUCKET_HALF_COUNT
+        return ((sub_bucket + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        """
+        :param seconds: duration to record
+        """
+        value = max(0, int(seconds * 1_000_000))
+        bucket = self.get_bucket(value)
+        with self._lock:
+            self._buckets[bucket] += 1
+            self.count += 1
+            self.sum += seconds
+            if self.min is None or seconds < self.min:
+                self.min = seconds
+            if self.max is None or seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        :param q: Ex: 0.99
+        :return: upper bound in seconds of the q-quantile, None if empty
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(1, round(q * self.count))
+            seen = 0
+            for bucket in sorted(self._buckets):
+                seen += self._buckets[bucket]
+                if seen >= rank:
+                    return min(self.get_bucket_limit(bucket) / 1_000_000, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        """:return: count, sum, min, max and quantiles in seconds"""
+        return dict(
+            count=self.count,
+            sum=self.sum,
+            min=self.min,
+            max=self.max,
+            **{f"p{q * 100:g}": self.quantile(q) for q in QUANTILES},
+        )
+
+
+@dataclass
+class RequestInfo:
+    """Request passed to the hooks, completed as the request goes."""
+
+    method: str
+    url: str
+    # Path with the identifiers replaced. Ex: /order/{id}/
+    endpoint: str
+    request_size: int = 0
+    status_code: Optional[int] = None
+    response_size: int = 0
+    # Seconds between sending the request and receiving the response body.
+    elapsed: Optional[float] = None
+    # Seconds between sending the request and receiving the response headers.
+    ttfb: Optional[float] = None
+    # Exception raised or logged by the client, if any.
+    error: Optional[BaseException] = None
+    # Free-form values set by the hooks. Ex: the start of a trace span.
+    extra: dict = field(default_factory=dict)
+
+
+Hook = Callable[[RequestInfo], None]
+
+
+def _without(hooks: List[Hook], hook: Hook) -> List[Hook]:
+    """:return: a copy of the hooks without the first occurrence of the hook"""
+    hooks = list(hooks)
+    if hook in hooks:
+        hooks.remove(hook)
+    return hooks
+
+
+class ClientMetrics:
+    """
+    Thread-safe registry of the metrics of one or more clients, with the request
+    hooks.
+    """
+
+    def __init__(self):
+        self.histograms = {}  # type: Dict[Tuple[str, str, str], LatencyHistogram]
+        self.requests = defaultdict(int)  # type: Dict[Tuple[str, str, int], int]
+        self.errors = defaultdict(int)  # type: Dict[Tuple[str, str, str], int]
+        self.retries = defaultdict(int)  # type: Dict[Tuple[str, str, int], int]
+        self.hedges = defaultdict(int)  # type: Dict[Tuple[str, str, str], int]
+        self.request_bytes = defaultdict(int)  # type: Dict[Tuple[str, str], int]
+        self.response_bytes = defaultdict(int)  # type: Dict[Tuple[str, str], int]
+        self.pre_request_hooks = []  # type: List[Hook]
+        self.post_request_hooks = []  # type: List[Hook]
+        self._lock = threading.Lock()
+
+    def add_hooks(self, pre: Hook = None, post: Hook = None):
+        """
+        Registers functions called with the `RequestInfo` before each request is
+        sent, and after it completed or failed. Exceptions of the hooks are logged
+        and ignored.
+        :param pre: called before the request
+        :param post: called after the request
+        """
+        with self._lock:
+            if pre is not None:
+                self.pre_request_hooks.append(pre)
+            if post is not None:
+                self.post_request_hooks.append(post)
+
+    def remove_hooks(self, pre: Hook = None, post: Hook = None):
+        """
+        Unregisters functions registered with `add_hooks()`, once each. Ignores the
+        functions which are not registered.
+        :param pre: called before the request
+        :param post: called after the request
+        """
+        # The lists are replaced rather than changed, so that requests running
+        # their hooks meanwhile are not affected.
+        with self._lock:
+            if pre is not None:
+                self.pre_request_hooks = _without(self.pre_request_hooks, pre)
+            if post is not None:
+                self.post_request_hooks = _without(self.post_request_hooks, post)
+
+    @staticmethod
+    def _run_hooks(hooks: List[Hook], info: RequestInfo):
+        for hook in hooks:
+            try:
+                hook(info)
+            except Exception:
+                logger.exception("Request hook %s failed", hook)
+
+    @contextmanager
+    def track(self, method: str, url: str) -> Iterator[RequestInfo]:
+        """
+        Tracks a request: runs the hooks and records its metrics once done.
+        Exceptions raised in the block are recorded as errors and re-raised.
+        :param method: "get" or "post"
+        :param url: URL of the request
+        """
+        info = RequestInfo(method, url, get_endpoint_template(urlsplit(url).path))
+        self._run_hooks(self.pre_request_hooks, info)
+        try:
+            yield info
+        except BaseException as exc:
+            info.error = exc
+            raise
+        finally:
+            self.record(info)
+            self._run_hooks(self.post_request_hooks, info)
+
+    def _get_histogram(self, key: Tuple[str, str, str]) -> LatencyHistogram:
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def record(self, info: RequestInfo):
+        """Records the metrics of a completed or failed request."""
+        key = (info.method, info.endpoint)
+        if info.elapsed is not None:
+            self._get_histogram(key + (TOTAL,)).record(info.elapsed)
+        if info.ttfb is not None:
+            self._get_histogram(key + (TTFB,)).record(info.ttfb)
+        with self._lock:
+            if info.status_code is not None:
+                self.requests[key + (info.status_code,)] += 1
+            if info.error is not None:
+                self.errors[key + (type(info.error).__name__,)] += 1
+            self.request_bytes[key] += info.request_size
+            self.response_bytes[key] += info.response_size
+
+    def record_retry(self, method: str, endpoint: str, status_code: int):
+        with self._lock:
+            self.retries[(method, get_endpoint_template(endpoint), status_code)] += 1
+
+    def record_hedge(self, method: str, endpoint: str, outcome: str):
+        """
+        :param outcome: HEDGE_SENT when a hedged request is sent, HEDGE_WON when
+        its response is received before the first attempt's
+        """
+        with self._lock:
+            self.hedges[(method, get_endpoint_template(endpoint), outcome)] += 1
+
+    def snapshot(self) -> dict:
+        """
+        :return: metrics by endpoint. Ex:
+        {"post /order/": {"latency": {"total": {"count": 1, "p99": 0.1, ...}},
+                          "requests": {201: 1}, "errors": {}, "retries": {},
+                          "hedges": {},
+                          "request_bytes": 250, "response_bytes": 900}}
+        """
+        endpoints = {}
+
+        def get_endpoint(method, endpoint):
+            return endpoints.setdefault(
+                f"{method} {endpoint}",
+                dict(
+                    latency={},
+                    requests={},
+                    errors={},
+                    retries={},
+                    hedges={},
+                    request_bytes=0,
+                    response_bytes=0,
+                ),
+            )
+
+        with self._lock:
+            histograms = list(self.histograms.items())
+            requests = list(self.requests.items())
+            errors = list(self.errors.items())
+            retries = list(self.retries.items())
+            hedges = list(self.hedges.items())
+            request_bytes = list(self.request_bytes.items())
+            response_bytes = list(self.response_bytes.items())
+
+        for (method, endpoint, phase), histogram in histograms:
+            get_endpoint(method, endpoint)["latency"][phase] = histogram.snapshot()
+        for name, counters in (
+            ("requests", requests),
+            ("errors", errors),
+            ("retries", retries),
+            ("hedges", hedges),
+        ):
+            for (method, endpoint, label), count in counters:
+                get_endpoint(method, endpoint)[name][label] = count
+        for name, sizes in (
+            ("request_bytes", request_bytes),
+            ("response_bytes", response_bytes),
+        ):
+            for (method, endpoint), size in sizes:
+                get_endpoint(method, endpoint)[name] = size
+        return endpoints
+
+    def to_prometheus(self, prefix: str = "b2c2_client") -> str:
+        """
+        :param prefix: prefix of the metric names
+        :return: metrics in the Prometheus text exposition format. Latencies are
+        exported as summaries.
+        """
+        lines = []
+        snapshot = self.snapshot()
+
+        def labels(name, **extra):
+            method, endpoint = name.split(" ", 1)
+            values = dict(method=method, endpoint=endpoint, **extra)
+            return ",".join(f'{key}="{value}"' for key, value in values.items())
+
+        lines.append(f"# TYPE {prefix}_request_duration_seconds summary")
+        for name, endpoint in snapshot.items():
+            for phase, histogram in endpoint["latency"].items():
+                base = labels(name, phase=phase)
+                for q in QUANTILES:
+                    value = histogram[f"p{q * 100:g}"]
+                    lines.append(
+                        f'{prefix}_request_duration_seconds{{{base},quantile="{q:g}"}}'
+                        f" {value}"
+                    )
+                lines.append(
+                    f"{prefix}_request_duration_seconds_sum{{{base}}} "
+                    f"{histogram['sum']}"
+                )
+                lines.append(
+                    f"{prefix}_request_duration_seconds_count{{{base}}} "
+                    f"{histogram['count']}"
+                )
+
+        for metric, key, label in (
+            ("requests_total", "requests", "status"),
+            ("errors_total", "errors", "error"),
+            ("retries_total", "retries", "status"),
+            ("hedges_total", "hedges", "outcome"),
+        ):
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for name, endpoint in snapshot.items():
+                for value, count in endpoint[key].items():
+                    lines.append(
+                        f"{prefix}_{metric}{{{labels(name, **{label: value})}}} "
+                        f"{count}"
+                    )
+
+        for metric in ("request_bytes", "response_bytes"):
+            lines.append(f"# TYPE {prefix}_{metric}_total counter")
+            for name, endpoint in snapshot.items():
+                lines.append(
+                    f"{prefix}_{metric}_total{{{labels(name)}}} {endpoint[metric]}"
+                )
+        return "\n".join(lines) + "\n"
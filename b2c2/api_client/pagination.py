@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import datetime
+from typing import List, Optional
+
+from pydantic.datetime_parse import parse_datetime
+
+# Number of records requested per page.
+DEFAULT_PAGE_SIZE = 100
+
+
+def format_param(value) -> str:
+    """Formats a query string parameter (Ex: datetime filters) for the API."""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class HistoryPaginator:
+    """
+    Keeps the state of a paginated history query (`/order/`, `/trade/`).
+
+    Pages are requested with `offset` and `limit`. The API returns the most recent
+    records first, so when it refuses an offset (`PaginationOffsetTooBig`) the
+    query is narrowed to the records older than the oldest one received and the
+    offset starts over. Records sharing the timestamp of that boundary are kept
+    aside to skip the duplicates.
+    """
+
+    def __init__(self, id_field: str, page_size: int = DEFAULT_PAGE_SIZE, **filters):
+        """
+        :param id_field: name of the identifier of the records. Ex: trade_id
+        :param page_size: number of records requested per page
+        :param filters: `created__gte`, `created__lt`, `since` or other filters
+        """
+        self.id_field = id_field
+        self.page_size = page_size
+        self.filters = {
+            key: format_param(value)
+            for key, value in filters.items()
+            if value is not None
+        }
+        self.offset = 0
+        self.done = False
+        self._oldest_created = None  # type: Optional[datetime.datetime]
+        self._boundary_ids = set()
+
+    @property
+    def params(self) -> dict:
+        """Query string parameters of the next page."""
+        return {**self.filters, "offset": self.offset, "limit": self.page_size}
+
+    def feed(self, page: List[dict]) -> List[dict]:
+        """
+        Consumes a page returned by the API.
+        :param page: list of records
+        :return: the records of the page which were not returned before
+        """
+        self.offset += len(page)
+        if len(page) < self.page_size:
+            self.done = True
+
+        records = []
+        for record in page:
+            if record[self.id_field] in self._boundary_ids:
+                continue
+            records.append(record)
+            self._track_boundary(record)
+        return records
+
+    def narrow(self) -> bool:
+        """
+        Restricts the query to the records older than the ones received so far,
+        after the API refused the current offset.
+        :return: False if the query can't be narrowed any further.
+        """
+        if self._oldest_created is None or self.offset == 0:
+            return False
+        created__lt = self._oldest_created + datetime.timedelta(microseconds=1)
+        self.filters["created__lt"] = format_param(created__lt)
+        self.offset = 0
+        return True
+
+    def _track_boundary(self, record: dict):
+        created = parse_datetime(record["created"])
+        if self._oldest_created is None or created < self._oldest_created:
+            self._oldest_created = created
+            self._boundary_ids = set()
+        if created == self._oldest_created:
+            self._boundary_ids.add(record[self.id_field])
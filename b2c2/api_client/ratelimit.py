@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+import datetime
+import email.utils
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Endpoint groups with separate request budgets.
+RFQ = "rfq"
+ORDER = "order"
+HISTORY = "history"
+DEFAULT = "default"
+
+# (requests per second, burst capacity) per endpoint group.
+DEFAULT_RATE_LIMITS = {
+    RFQ: (10.0, 10),
+    ORDER: (10.0, 10),
+    HISTORY: (2.0, 4),
+    DEFAULT: (5.0, 10),
+}
+
+
+def get_endpoint_group(method: str, endpoint: str) -> str:
+    """
+    Returns the rate limit group of a request.
+    :param method: "get" or "post"
+    :param endpoint: path of the request. Ex: /order/
+    :return: one of RFQ, ORDER, HISTORY, DEFAULT
+    """
+    if endpoint.startswith("/request_for_quote/"):
+        return RFQ
+    if endpoint.startswith("/order/") and method == "post":
+        return ORDER
+    if endpoint.startswith(("/order/", "/trade/")):
+        return HISTORY
+    return DEFAULT
+
+
+def is_retry_safe(method: str, endpoint: str) -> bool:
+    """
+    Whether a request can be sent again blindly. A 429 or 503 may be returned
+    after an order was accepted upstream, so orders are only sent again by the
+    lookup and resubmission of `create_order`.
+    :param method: "get" or "post"
+    :param endpoint: path of the request. Ex: /order/
+    """
+    return method == "get" or get_endpoint_group(method, endpoint) == RFQ
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens are reserved rather than waited for, so the
+    same bucket can pace blocking and asyncio callers.
+    """
+
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic):
+        """
+        :param rate: tokens added per second
+        :param capacity: maximum number of tokens (burst size), defaults to `rate`
+        :param clock: monotonic clock returning seconds
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Takes `tokens` from the bucket.
+        :return: seconds the caller should wait before sending its request
+        """
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def try_reserve(self, tokens: float = 1) -> bool:
+        """
+        Takes `tokens` from the bucket only if they are available right now.
+        :return: True if they were taken, False if the bucket was left unchanged
+        """
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            if self._tokens < tokens or now < self._paused_until:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def pause(self, seconds: float):
+        """
+        Stops handing out tokens for the given period. Used when the server
+        answers with 429 Too Many Requests.
+        """
+        with self._lock:
+            now = self.clock()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = min(self._tokens, 0)
+
+
+class RateLimiter:
+    """Token buckets per endpoint group (RFQ, order, history, default)."""
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[float, float]] = None,
+        clock=time.monotonic,
+    ):
+        """
+        :param limits: (requests per second, burst capacity) by endpoint group.
+        Groups which are not given are not limited.
+        :param clock: monotonic clock returning seconds
+        """
+        limits = DEFAULT_RATE_LIMITS if limits is None else limits
+        self.buckets = {
+            group: TokenBucket(rate, capacity, clock=clock)
+            for group, (rate, capacity) in limits.items()
+        }
+
+    def get_bucket(self, method: str, endpoint: str) -> Optional[TokenBucket]:
+        return self.buckets.get(get_endpoint_group(method, endpoint))
+
+    def reserve(self, method: str, endpoint: str) -> float:
+        """
+        Reserves a request on the endpoint's budget.
+        :return: seconds to wait before sending the request
+        """
+        bucket = self.get_bucket(method, endpoint)
+        return bucket.reserve() if bucket else 0.0
+
+    def try_reserve(self, method: str, endpoint: str) -> bool:
+        """
+        Reserves a request on the endpoint's budget only if it can be sent now.
+        :return: False if the request would be throttled, nothing is reserved then
+        """
+        bucket = self.get_bucket(method, endpoint)
+        return bucket.try_reserve() if bucket else True
+
+    def pause(self, method: str, endpoint: str, seconds: float):
+        """Pauses the budget of the endpoint's group for the given period."""
+        bucket = self.get_bucket(method, endpoint)
+        if bucket:
+            bucket.pause(seconds)
+
+
+class RetryPolicy:
+    """Jittered exponential backoff for throttled (429) and unavailable (503) replies."""
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.25,
+        max_backoff: float = 8.0,
+        retry_statuses: Tuple[int, ...] = (429, 503),
+        jitter: bool = True,
+    ):
+        """
+        :param max_retries: number of retries after the first attempt
+        :param backoff_factor: backoff of the first retry in seconds, doubled each time
+        :param max_backoff: upper bound of a single backoff in seconds
+        :param retry_statuses: HTTP status codes to retry
+        :param jitter: if True, picks a random backoff up to the exponential one
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+        self.jitter = jitter
+
+    def should_retry(
+        self, status_code: int, attempt: int, method: str = "get", endpoint: str = ""
+    ) -> bool:
+        """
+        :param status_code: HTTP status code of the response
+        :param attempt: number of the attempt, starting from 0
+        :param method: "get" or "post"
+        :param endpoint: path of the request. Ex: /order/
+        :return: True for the retried statuses of the GET and RFQ requests, while
+        retries are left
+        """
+        return (
+            status_code in self.retry_statuses
+            and attempt < self.max_retries
+            and is_retry_safe(method, endpoint)
+        )
+
+    def get_backoff(self, attempt: int, retry_after: float = None) -> float:
+        """
+        :param attempt: number of the failed attempt, starting from 0
+        :param retry_after: seconds asked by the server in `Retry-After`
+        :return: seconds to wait before the next attempt
+        """
+        backoff = min(self.max_backoff, self.backoff_factor * 2 ** attempt)
+        if self.jitter:
+            backoff = random.uniform(0, backoff)
+        if retry_after is not None:
+            backoff = max(backoff, retry_after)
+        return backoff
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """
+    Parses a `Retry-After` header given either in seconds or as an HTTP date.
+    :return: seconds to wait, None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import requests
+from requests.adapters import HTTPAdapter
+
+# Number of per-host connection pools kept by the session.
+DEFAULT_POOL_CONNECTIONS = 4
+# Maximum number of connections kept alive per host.
+DEFAULT_POOL_MAXSIZE = 16
+
+
+def create_session(
+    pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    keep_alive: bool = True,
+) -> requests.Session:
+    """
+    Creates a `requests.Session` with a pooled HTTP adapter so that connections
+    (and their TLS handshakes) are reused across requests.
+    :param pool_connections: number of host pools to cache
+    :param pool_maxsize: maximum number of connections to keep per host
+    :param keep_alive: if False, asks the server to close the connection after
+    every response.
+    :return: configured session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
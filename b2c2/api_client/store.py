@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+import datetime
+import logging
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+from pydantic.datetime_parse import parse_datetime
+
+from b2c2.api_client.pagination import DEFAULT_PAGE_SIZE
+from b2c2.common.codecs import JSONCodec, get_codec
+from b2c2.common.models import OrderResponse, Side, Trade
+
+logger = logging.getLogger(__name__)
+
+# Sortable text representation of the creation dates, in UTC.
+CREATED_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    client_order_id TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    side TEXT NOT NULL,
+    created TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_created ON orders (created);
+CREATE INDEX IF NOT EXISTS orders_instrument ON orders (instrument, created);
+CREATE INDEX IF NOT EXISTS orders_side ON orders (side, created);
+CREATE INDEX IF NOT EXISTS orders_client_order_id ON orders (client_order_id);
+
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id TEXT PRIMARY KEY,
+    order_id TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    side TEXT NOT NULL,
+    created TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_created ON trades (created);
+CREATE INDEX IF NOT EXISTS trades_instrument ON trades (instrument, created);
+CREATE INDEX IF NOT EXISTS trades_side ON trades (side, created);
+CREATE INDEX IF NOT EXISTS trades_order_id ON trades (order_id);
+"""
+
+
+def format_created(value) -> str:
+    """
+    Converts a creation date to its sortable text representation in UTC.
+    Naive datetimes are considered to be in UTC, like the API's.
+    :param value: datetime or ISO 8601 string
+    """
+    created = parse_datetime(value)
+    if created.tzinfo is not None:
+        created = created.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return created.strftime(CREATED_FORMAT)
+
+
+class HistoryStore:
+    """
+    Local SQLite copy of the order and trade history.
+
+    `sync()` only downloads the records created since the most recent one stored,
+    and history queries are then answered locally using indexes on instrument,
+    side and creation date.
+    """
+
+    def __init__(self, path: str = ":memory:", codec: JSONCodec = None):
+        """
+        :param path: SQLite database file, in memory by default
+        :param codec: JSON codec used to store the payloads
+        """
+        self.path = path
+        self.codec = codec or get_codec()
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def sync(self, client, page_size=DEFAULT_PAGE_SIZE) -> Tuple[int, int]:
+        """
+        Downloads the orders and trades created since the last synchronization.
+        :param client: B2C2Client to download the history with
+        :param page_size: number of records requested per page
+        :return: (number of orders, number of trades) received
+        """
+        orders = self._sync_table(client, "orders", page_size)
+        trades = self._sync_table(client, "trades", page_size)
+        logger.info("Synchronized %s orders and %s trades", orders, trades)
+        return orders, trades
+
+    async def async_sync(self, client, page_size=DEFAULT_PAGE_SIZE) -> Tuple[int, int]:
+        """
+        Same as `sync()`, with an AsyncB2C2Client.
+        :param client: AsyncB2C2Client to download the history with
+        :param page_size: number of records requested per page
+        :return: (number of orders, number of trades) received
+        """
+        orders = await self._async_sync_table(client, "orders", page_size)
+        trades = await self._async_sync_table(client, "trades", page_size)
+        logger.info("Synchronized %s orders and %s trades", orders, trades)
+        return orders, trades
+
+    def _iter_records(self, client, table: str, page_size):
+        """
+        :return: (async) generator of the records created since the last stored
+        """
+        # Records created at the same time as the last one stored are downloaded
+        # again, in case some of them were not there yet during the previous sync.
+        last_created = self.get_last_created(table)
+        if table == "orders":
+            return client.iter_order_records(last_created, page_size=page_size)
+        return client.iter_trade_records(last_created, page_size=page_size)
+
+    def _sync_table(self, client, table, page_size) -> int:
+        count = 0
+        rows = []
+        for record in self._iter_records(client, table, page_size):
+            rows.append(self._to_row(client, table, record))
+            count += 1
+            if len(rows) >= page_size:
+                self._insert(table, rows)
+                rows = []
+        self._insert(table, rows)
+        return count
+
+    async def _async_sync_table(self, client, table, page_size) -> int:
+        count = 0
+        rows = []
+        async for record in self._iter_records(client, table, page_size):
+            rows.append(self._to_row(client, table, record))
+            count += 1
+            if len(rows) >= page_size:
+                self._insert(table, rows)
+                rows = []
+        self._insert(table, rows)
+        return count
+
+    def _to_row(self, client, table: str, record: dict) -> tuple:
+        # The records are checked like the client's models are, unless it is
+        # trusted, before being stored.
+        if table == "orders":
+            model = client.parse_order(record)
+            record_id, parent_id = model.order_id, model.client_order_id
+        else:
+            model = client.parse_trade(record)
+            record_id, parent_id = model.trade_id, model.order
+        return (
+            record_id,
+            parent_id,
+            model.instrument,
+            Side(model.side).value,
+            format_created(model.created),
+            self.codec.dumps(record),
+        )
+
+    def _insert(self, table: str, rows: List[tuple]):
+        if not rows:
+            return
+        with self._lock, self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def get_last_created(self, table: str) -> Optional[datetime.datetime]:
+        """
+        :param table: "orders" or "trades"
+        :return: creation date (UTC) of the most recent record stored
+        """
+        with self._lock:
+            (created,) = self.connection.execute(
+                f"SELECT MAX(created) FROM {table}"
+            ).fetchone()
+        if created is None:
+            return None
+        return datetime.datetime.strptime(created, CREATED_FORMAT)
+
+    def _select(self, table, instrument, side, created__gte, created__lt, limit):
+        conditions, params = [], []
+        if instrument:
+            conditions.append("instrument = ?")
+            params.append(instrument)
+        if side:
+            conditions.append("side = ?")
+            params.append(Side(side).value)
+        if created__gte:
+            conditions.append("created >= ?")
+            params.append(format_created(created__gte))
+        if created__lt:
+            conditions.append("created < ?")
+            params.append(format_created(created__lt))
+        query = f"SELECT payload FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self.connection.execute(query, params).fetchall()
+        return [self.codec.loads(payload) for (payload,) in rows]
+
+    def get_orders(
+        self,
+        instrument=None,
+        side=None,
+        created__gte=None,
+        created__lt=None,
+        limit=None,
+    ) -> List[OrderResponse]:
+        """
+        Returns the stored orders, most recent first.
+        :param instrument: only the orders of this instrument. Ex: BTCUSD.SPOT
+        :param side: only the orders of this side
+        :param created__gte: only the orders created at or after this datetime
+        :param created__lt: only the orders created before this datetime
+        :param limit: maximum number of orders to return
+        :return: List[OrderResponse]
+        """
+        records = self._select(
+            "orders", instrument, side, created__gte, created__lt, limit
+        )
+        return [OrderResponse(**record) for record in records]
+
+    def get_trades(
+        self,
+        instrument=None,
+        side=None,
+        created__gte=None,
+        created__lt=None,
+        limit=None,
+    ) -> List[Trade]:
+        """
+        Returns the stored trades, most recent first.
+        :param instrument: only the trades of this instrument. Ex: BTCUSD.SPOT
+        :param side: only the trades of this side
+        :param created__gte: only the trades created at or after this datetime
+        :param created__lt: only the trades created before this datetime
+        :param limit: maximum number of trades to return
+        :return: List[Trade]
+        """
+        records = self._select(
+            "trades", instrument, side, created__gte, created__lt, limit
+        )
+        return [Trade(**record) for record in records]
+
+    def get_order(self, order_id: str) -> Optional[OrderResponse]:
+        """
+        :param order_id: order_id or client_order_id
+        :return: the stored order, None if not found
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT payload FROM orders WHERE order_id = ? OR client_order_id = ?",
+                (order_id, order_id),
+            ).fetchone()
+        return OrderResponse(**self.codec.loads(row[0])) if row else None
+
+    def get_trade(self, trade_id: str) -> Optional[Trade]:
+        """
+        :param trade_id: trade_id
+        :return: the stored trade, None if not found
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT payload FROM trades WHERE trade_id = ?", (trade_id,)
+            ).fetchone()
+        return Trade(**self.codec.loads(row[0])) if row else None
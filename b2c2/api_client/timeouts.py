@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from b2c2.api_client.exceptions import DeadlineExceeded
+
+# Seconds to establish a connection (slightly above a TCP retransmission window).
+DEFAULT_CONNECT_TIMEOUT = 3.05
+# Seconds to wait for the server between two bytes of the response.
+DEFAULT_READ_TIMEOUT = 10.0
+
+# Monotonic time by which the requests of the current context must be answered.
+_deadline = contextvars.ContextVar("b2c2_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Bounds the time the requests sent in the block may take altogether, retries
+    and rate limit waits included. Nested deadlines can only shorten the current
+    one. The deadline follows the context: threads of `get_rfqs` and asyncio
+    tasks inherit it.
+    :param seconds: time budget of the block
+    """
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_remaining(expires_at: Optional[float]) -> Optional[float]:
+    """
+    :param expires_at: monotonic time of a deadline
+    :return: seconds left until the deadline, None if there is none
+    """
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+@dataclass(frozen=True)
+class Timeouts:
+    """Timeouts of the requests, in seconds. None means no limit."""
+
+    # Time to establish a connection.
+    connect: Optional[float] = DEFAULT_CONNECT_TIMEOUT
+    # Time to wait for the server between two bytes of the response.
+    read: Optional[float] = DEFAULT_READ_TIMEOUT
+    # Time a client call may take, retries and rate limit waits included.
+    total: Optional[float] = None
+
+    @classmethod
+    def create(cls, timeout=None) -> "Timeouts":
+        """
+        :param timeout: `Timeouts`, a number (connect and read timeout), a
+        (connect, read) or (connect, read, total) tuple, or None for the defaults
+        """
+        if timeout is None:
+            return cls()
+        if isinstance(timeout, cls):
+            return timeout
+        if isinstance(timeout, (tuple, list)):
+            return cls(*timeout)
+        return cls(connect=timeout, read=timeout)
+
+    def get_expires_at(self) -> Optional[float]:
+        """
+        :return: monotonic time by which a call starting now must complete, given
+        `total` and the `deadline()` of the context. None if unbounded.
+        """
+        expires_at = _deadline.get()
+        if self.total is not None:
+            total_expires_at = time.monotonic() + self.total
+            if expires_at is None or total_expires_at < expires_at:
+                expires_at = total_expires_at
+        return expires_at
+
+    def for_attempt(
+        self, expires_at: Optional[float]
+    ) -> Tuple[Optional[float], Optional[float]]:
+        """
+        :param expires_at: deadline of the call, see `get_expires_at()`
+        :return: (connect, read) timeouts of the next attempt, shortened to the
+        time left until the deadline
+        :raise DeadlineExceeded: if the deadline has passed
+        """
+        remaining = get_remaining(expires_at)
+        if remaining is None:
+            return self.connect, self.read
+        if remaining <= 0:
+            raise DeadlineExceeded()
+        connect = remaining if self.connect is None else min(self.connect, remaining)
+        read = remaining if self.read is None else min(self.read, remaining)
+        return connect, read
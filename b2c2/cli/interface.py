@@ -1,7 +1,5 @@
 # -*- coding: utf-8 -*-
-import datetime
 import logging
-import time
 from decimal import Decimal
 
 from PyInquirer import prompt
@@ -10,6 +8,7 @@ from rich.table import Table
 
 import b2c2.cli.questions as q
 from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.balance import BalanceTracker
 from b2c2.api_client.exceptions import ConnectionLost
 from b2c2.cli.config import ConfigManager
 from b2c2.cli.decorators import check_connection_before
@@ -27,6 +26,7 @@ from b2c2.common.models import (
     Instrument,
     MarketOrderRequest,
     Side,
+    UnknownInstrument,
 )
 from b2c2.common.settings import API_URL
 
@@ -38,6 +38,7 @@ class CommandLineInterface:
         self.token = self.config.get_token()
         self.api_url = self.config.get_api_url()
         self.api_client = None
+        self.balance_tracker = None
 
         if not self.token:
             # If no token provided, ask for one.
@@ -64,7 +65,14 @@ class CommandLineInterface:
         """
         Creates and sets a new client with provided credentials.
         """
-        self.api_client = B2C2Client(token=self.token, api_url=self.api_url)
+        if self.api_client:
+            self.api_client.close()
+        self.api_client = B2C2Client(
+            token=self.token, api_url=self.api_url, resubmit_orders=True
+        )
+        self.balance_tracker = BalanceTracker(self.api_client)
+        # Keeps the connection state fresh between the commands.
+        self.api_client.health.start(self.api_client.check_connection)
 
     def execute_command(self, action) -> None:
         """
@@ -114,6 +122,15 @@ class CommandLineInterface:
             return
 
         rfq_response.display()
+        try:
+            affordable = self.balance_tracker.can_afford(
+                rfq_response.instrument, side, quantity, rfq_response.price
+            )
+        except UnknownInstrument:
+            print_red(f"Unknown instrument: {rfq_response.instrument}")
+            return
+        if not affordable:
+            print_red("Your balance does not cover this quote.")
 
         # Ask for execution permission
         execute_order = prompt_yes_no(
@@ -131,9 +148,7 @@ class CommandLineInterface:
 
             executing_unit = prompt_string("Executing Unit:")
             validity_seconds = prompt_integer("Validity in seconds:", default=10)
-            valid_until = datetime.datetime.utcfromtimestamp(
-                time.time() + validity_seconds
-            ).strftime("%Y-%m-%dT%H:%M:%S")
+            valid_until = self.api_client.server_clock.valid_until(validity_seconds)
 
             if order_type == "FOK":
                 slippage = prompt_decimal(
@@ -151,8 +166,10 @@ class CommandLineInterface:
                     force_open=force_open,
                     price=price,
                     acceptable_slippage_in_basis_points=slippage,
+                    # Executed against the quote unless another price is given.
+                    rfq_id=rfq_response.rfq_id if price == rfq_response.price else None,
                 )
-                if rfq_response.has_expired():
+                if rfq_response.has_expired(now=self.api_client.server_clock.now()):
                     print_red("Your Request for Quote has expired. Please restart.")
                     return
                 try:
@@ -160,6 +177,8 @@ class CommandLineInterface:
                         fok_order_request=fok_order_request
                     )
                 except ConnectionLost:
+                    # The order may have been executed.
+                    self.balance_tracker.mark_stale()
                     print_red("Make sure your connection is available.")
                     return
             elif order_type == "MKT":
@@ -171,12 +190,13 @@ class CommandLineInterface:
                     executing_unit=executing_unit,
                     force_open=force_open,
                 )
-                if rfq_response.has_expired():
+                if rfq_response.has_expired(now=self.api_client.server_clock.now()):
                     print_red("Your Request for Quote has expired. Please restart.")
                     return
                 try:
                     order_response = self.api_client.create_mkt_order(mkt_order_request)
                 except ConnectionLost:
+                    self.balance_tracker.mark_stale()
                     print_red("Make sure your connection is available.")
                     return
 
@@ -186,6 +206,7 @@ class CommandLineInterface:
                 print_green(f"\nYour order was successfully placed.\n")
 
             order_response.display()
+            self.balance_tracker.apply_order(order_response)
             self.display_balance()
 
     @check_connection_before
@@ -198,9 +219,10 @@ class CommandLineInterface:
     @check_connection_before
     def display_balance(self) -> None:
         """
-        Menu for displaying balance
+        Menu for displaying balance, fetched from the server only when the local
+        one may be out of date.
         """
-        balance = self.api_client.get_balance()
+        balance = self.balance_tracker.get_balance()
         balance.display()
 
     @check_connection_before
@@ -346,5 +368,23 @@ class CommandLineInterface:
                 print("API URL has been reset.")
                 self._set_api_url()
 
-    def check_api_connection(self):
-        return self.api_client.check_connection()
+    def is_api_available(self) -> bool:
+        """
+        Tells from the cached connection state whether commands can be run, only
+        probing the server when it is known to be unreachable.
+        """
+        if self.api_client.is_available():
+            return True
+        print_red("Could not connect to the server. Please try again later.")
+        return False
+
+    def check_api_connection(self) -> bool:
+        """
+        Probes the connection to the server.
+        """
+        available = self.api_client.health.probe(self.api_client.check_connection)
+        if available:
+            print_green("Connection to the server is available.")
+        else:
+            print_red("Could not connect to the server.")
+        return available
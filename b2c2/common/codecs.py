@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+JSON codecs used to encode request bodies and decode response bodies.
+
+`orjson` and `ujson` are optional, `get_codec()` picks the fastest one installed.
+All codecs encode `Decimal` as string and `datetime` in `DATETIME_FORMAT`, which is
+what the API expects, so models can be serialized without converting their fields
+one by one.
+"""
+import datetime
+import json
+from decimal import Decimal
+from enum import Enum
+
+from b2c2.common.constants import DATETIME_FORMAT
+
+
+def default(obj):
+    """
+    Converts the objects the JSON libraries can't serialize.
+    :param obj: object to convert
+    :return: JSON serializable value
+    """
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, datetime.datetime):
+        return obj.strftime(DATETIME_FORMAT)
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def to_primitive(obj):
+    """
+    Recursively converts `obj` to JSON primitives using `default`.
+    :param obj: dict, list or scalar value
+    :return: JSON serializable value
+    """
+    if isinstance(obj, dict):
+        return {key: to_primitive(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_primitive(value) for value in obj]
+    if isinstance(obj, (Decimal, datetime.datetime, Enum)):
+        return default(obj)
+    return obj
+
+
+class JSONCodec:
+    """Codec based on the standard library `json` module."""
+
+    name = "json"
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj, default=default, separators=(",", ":")).encode()
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class UJSONCodec(JSONCodec):
+    """Codec based on `ujson`."""
+
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+
+        self._ujson = ujson
+
+    def dumps(self, obj) -> bytes:
+        # ujson serializes Decimal as float, so convert the values beforehand.
+        return self._ujson.dumps(to_primitive(obj)).encode()
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+
+class ORJSONCodec(JSONCodec):
+    """Codec based on `orjson`."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, obj) -> bytes:
+        return self._orjson.dumps(
+            obj, default=default, option=self._orjson.OPT_PASSTHROUGH_DATETIME
+        )
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+CODECS = {
+    ORJSONCodec.name: ORJSONCodec,
+    UJSONCodec.name: UJSONCodec,
+    JSONCodec.name: JSONCodec,
+}
+
+
+def get_codec(name: str = None) -> JSONCodec:
+    """
+    Returns the codec with the given name.
+    :param name: "orjson", "ujson" or "json". If not given, the fastest installed
+    codec is returned.
+    :return: JSONCodec instance
+    """
+    if name is not None:
+        if name not in CODECS:
+            raise ValueError(f"Unknown JSON codec: {name}")
+        return CODECS[name]()
+
+    for codec_class in CODECS.values():
+        try:
+            return codec_class()
+        except ImportError:
+            continue
@@ -83,3 +83,9 @@ CRYPTO_CURRENCIES = (
 )
 
 CURRENCIES = FIAT_CURRENCIES + CRYPTO_CURRENCIES
+# Sets for constant time membership checks.
+FIAT_CURRENCY_SET = frozenset(FIAT_CURRENCIES)
+CURRENCY_SET = frozenset(CURRENCIES)
+
+# Datetime format of the fields sent to the API (Ex: valid_until).
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Validation-free construction of models from trusted API payloads.
+
+`construct_model()` converts the fields with plain constructors (`Decimal`,
+`datetime.fromisoformat`, enums) and builds the model with pydantic's
+`construct()`, skipping validation. Only use it for payloads coming from the API:
+malformed data is not reported.
+"""
+import datetime
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache, partial
+from typing import Callable, Dict, Type, TypeVar
+
+from pydantic import BaseModel
+from pydantic.datetime_parse import parse_datetime
+from pydantic.fields import SHAPE_LIST
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+def to_datetime(value) -> datetime.datetime:
+    """
+    Parses an ISO 8601 datetime as pydantic does, using the fast
+    `datetime.fromisoformat` for the formats it supports.
+    """
+    if isinstance(value, datetime.datetime):
+        return value
+    try:
+        if value.endswith("Z"):
+            return datetime.datetime.fromisoformat(value[:-1]).replace(
+                tzinfo=datetime.timezone.utc
+            )
+        return datetime.datetime.fromisoformat(value)
+    except (AttributeError, ValueError):
+        return parse_datetime(value)
+
+
+def to_decimal(value) -> Decimal:
+    """Converts a decimal string or number, going through str for floats."""
+    if isinstance(value, float):
+        value = str(value)
+    return Decimal(value)
+
+
+def _optional(coerce: Callable) -> Callable:
+    def wrapper(value):
+        return None if value is None else coerce(value)
+
+    return wrapper
+
+
+def _list_of(coerce: Callable) -> Callable:
+    def wrapper(values):
+        return [coerce(value) for value in values]
+
+    return wrapper
+
+
+def _get_field_coercer(field) -> Callable:
+    type_ = field.type_
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        coerce = partial(construct_model, type_)
+    elif type_ is Decimal:
+        coerce = to_decimal
+    elif type_ is datetime.datetime:
+        coerce = to_datetime
+    elif isinstance(type_, type) and issubclass(type_, Enum):
+        coerce = type_
+    else:
+        return None
+
+    if field.shape == SHAPE_LIST:
+        coerce = _list_of(coerce)
+    return _optional(coerce) if field.allow_none else coerce
+
+
+@lru_cache(maxsize=None)
+def get_coercers(model_class: Type[BaseModel]) -> Dict[str, Callable]:
+    """
+    Returns the conversion functions of the fields which need one, computed once
+    per model class.
+    """
+    coercers = {}
+    for name, field in model_class.__fields__.items():
+        coerce = _get_field_coercer(field)
+        if coerce is not None:
+            coercers[name] = coerce
+    return coercers
+
+
+def construct_model(model_class: Type[Model], data: dict) -> Model:
+    """
+    Builds a model from a trusted payload without running the validators.
+    :param model_class: Ex: Trade
+    :param data: payload returned by the API
+    :return: model instance
+    """
+    values = dict(data)
+    for name, coerce in get_coercers(model_class).items():
+        if name in values:
+            values[name] = coerce(values[name])
+    return model_class.construct(**values)
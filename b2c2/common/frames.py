@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar containers for vectorized analytics over the order and trade history.
+
+`TradeFrame` and `OrderFrame` are built straight from the records returned by the
+API, without creating a model per record: prices and quantities are stored as
+float64 arrays, the instrument as a categorical column (codes + categories), the
+side as +1 (buy) / -1 (sell) and the creation date as datetime64 (UTC).
+
+Requires `numpy`: pip install b2c2_client[analytics]
+"""
+import csv
+import datetime
+import re
+import warnings
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from b2c2.common.construct import to_datetime
+
+# Side column values.
+BUY = 1
+SELL = -1
+
+INTERVAL_PATTERN = re.compile(r"^(\d*)(W|D|h|m|s|ms|us)$")
+
+
+def to_datetime64(values: Sequence) -> np.ndarray:
+    """
+    Converts ISO 8601 datetimes to a datetime64[us] array in UTC.
+    Naive datetimes are considered to be in UTC, like the API's.
+    :param values: datetime objects or ISO 8601 strings
+    """
+    with warnings.catch_warnings():
+        # numpy warns about (and ignores) the time zone of the strings having one.
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.array(values, dtype="datetime64[us]")
+        except (DeprecationWarning, TypeError, ValueError):
+            pass
+
+    converted = []
+    for value in values:
+        value = to_datetime(value)
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        converted.append(value)
+    return np.array(converted, dtype="datetime64[us]")
+
+
+def to_timedelta64(interval: Union[str, datetime.timedelta, np.timedelta64]):
+    """
+    :param interval: Ex: timedelta(hours=1), "1h", "15m", "1D" (numpy units)
+    :return: interval as timedelta64[us]
+    """
+    if isinstance(interval, str):
+        match = INTERVAL_PATTERN.match(interval)
+        if match is None:
+            raise ValueError(f"Invalid interval: {interval}")
+        count, unit = match.groups()
+        interval = np.timedelta64(int(count or 1), unit)
+    return np.timedelta64(interval, "us")
+
+
+class HistoryFrame:
+    """
+    Columns of a list of history records, with the aggregations shared by the
+    trades and the orders.
+    """
+
+    # Columns kept as float64 arrays.
+    FLOAT_COLUMNS = ()  # type: Tuple[str, ...]
+    # Columns kept as object arrays.
+    STRING_COLUMNS = ()  # type: Tuple[str, ...]
+    # Column holding the price the quantity was traded at, NaN when not traded.
+    PRICE_COLUMN = "price"
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        instruments: np.ndarray,
+        instrument_codes: np.ndarray,
+    ):
+        """
+        :param columns: arrays of the same length, by column name
+        :param instruments: categories of the instrument column
+        :param instrument_codes: index of the instrument of each row in `instruments`
+        """
+        self.columns = columns
+        self.instruments = instruments
+        self.instrument_codes = instrument_codes
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]):
+        """
+        Builds the frame from the records returned by the API, in one pass.
+        :param records: Ex: GET /trade/ response
+        """
+        names = ("instrument", "side", "created") + cls.FLOAT_COLUMNS
+        names += cls.STRING_COLUMNS
+        values = {name: [] for name in names}  # type: Dict[str, list]
+        appenders = [(name, values[name].append) for name in names]
+        for record in records:
+            for name, append in appenders:
+                append(record[name])
+
+        columns = {
+            "side": np.where(
+                np.array(values["side"], dtype=str) == "buy", BUY, SELL
+            ).astype(np.int8),
+            "created": to_datetime64(values["created"]),
+        }
+        for name in cls.FLOAT_COLUMNS:
+            # None (Ex: executed_price of rejected orders) becomes NaN.
+            columns[name] = np.array(values[name], dtype=np.float64)
+        for name in cls.STRING_COLUMNS:
+            columns[name] = np.array(values[name], dtype=object)
+
+        instruments, codes = np.unique(
+            np.array(values["instrument"], dtype=str), return_inverse=True
+        )
+        return cls(columns, instruments.astype(object), codes.astype(np.int32))
+
+    def __len__(self):
+        return len(self.instrument_codes)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name == "instrument":
+            return self.instruments[self.instrument_codes]
+        return self.columns[name]
+
+    @property
+    def column_names(self) -> List[str]:
+        return ["instrument", *self.columns]
+
+    @property
+    def price(self) -> np.ndarray:
+        return self.columns[self.PRICE_COLUMN]
+
+    @property
+    def quantity(self) -> np.ndarray:
+        return self.columns["quantity"]
+
+    @property
+    def side(self) -> np.ndarray:
+        return self.columns["side"]
+
+    @property
+    def created(self) -> np.ndarray:
+        return self.columns["created"]
+
+    @property
+    def traded(self) -> np.ndarray:
+        """Mask of the rows having a price."""
+        return ~np.isnan(self.price)
+
+    @property
+    def notional(self) -> np.ndarray:
+        """Quantity * price, in quote currency. 0 for the rows not traded."""
+        return np.where(self.traded, self.quantity * self.price, 0.0)
+
+    @property
+    def signed_quantity(self) -> np.ndarray:
+        """Quantity bought (+) or sold (-), in base currency."""
+        return np.where(self.traded, self.side * self.quantity, 0.0)
+
+    def filter(self, mask: np.ndarray):
+        """
+        :param mask: boolean array selecting the rows to keep
+        :return: new frame of the same type with the selected rows
+        """
+        columns = {name: column[mask] for name, column in self.columns.items()}
+        return type(self)(columns, self.instruments, self.instrument_codes[mask])
+
+    def for_instrument(self, instrument: str):
+        """:return: new frame with the rows of the given instrument only"""
+        codes = np.flatnonzero(self.instruments == instrument)
+        if not len(codes):
+            return self.filter(np.zeros(len(self), dtype=bool))
+        return self.filter(self.instrument_codes == codes[0])
+
+    def between(self, start=None, end=None):
+        """
+        :param start: keep the rows created at or after this datetime (UTC)
+        :param end: keep the rows created before this datetime (UTC)
+        :return: new frame with the rows created in [start, end)
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.created >= to_datetime64([start])[0]
+        if end is not None:
+            mask &= self.created < to_datetime64([end])[0]
+        return self.filter(mask)
+
+    def _aggregate(self, keys: np.ndarray, size: int) -> Dict[str, np.ndarray]:
+        traded = self.traded
+        notional = self.notional
+        quantity = np.where(traded, self.quantity, 0.0)
+        volume = np.bincount(keys, weights=quantity, minlength=size)
+        total_notional = np.bincount(keys, weights=notional, minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            vwap = total_notional / volume
+        return {
+            "count": np.bincount(keys, weights=traded, minlength=size).astype(np.int64),
+            "volume": volume,
+            "notional": total_notional,
+            "vwap": vwap,
+            "net_quantity": np.bincount(
+                keys, weights=self.signed_quantity, minlength=size
+            ),
+            # Quote currency received (+) or paid (-).
+            "cash_flow": np.bincount(
+                keys, weights=-self.side * notional, minlength=size
+            ),
+        }
+
+    def groupby_instrument(self) -> Dict[str, np.ndarray]:
+        """
+        Aggregates the traded rows by instrument.
+        :return: columns "instrument", "count", "volume" (base currency),
+            "notional" (quote currency), "vwap", "net_quantity" and "cash_flow"
+        """
+        aggregates = self._aggregate(self.instrument_codes, len(self.instruments))
+        return {"instrument": self.instruments, **aggregates}
+
+    def resample(self, interval, instrument: str = None) -> Dict[str, np.ndarray]:
+        """
+        Aggregates the traded rows by time bucket.
+        :param interval: bucket size. Ex: timedelta(hours=1), "1h", "15m", "1D"
+        :param instrument: only aggregate the rows of this instrument
+        :return: columns "start" (datetime64 of the bucket start) and the ones of
+            `groupby_instrument()`, for the non-empty buckets in chronological order
+        """
+        frame = self if instrument is None else self.for_instrument(instrument)
+        step = to_timedelta64(interval).astype(np.int64)
+        timestamps = frame.created.astype(np.int64)
+        starts, keys = np.unique(timestamps // step * step, return_inverse=True)
+        aggregates = frame._aggregate(keys, len(starts))
+        return {"start": starts.astype("datetime64[us]"), **aggregates}
+
+    def to_dict(self) -> Dict[str, list]:
+        """:return: columns as lists of Python values, by column name"""
+        data = {"instrument": self["instrument"].tolist()}
+        for name, column in self.columns.items():
+            if name == "side":
+                data[name] = np.where(column == BUY, "buy", "sell").tolist()
+            elif name == "created":
+                data[name] = column.astype(object).tolist()
+            else:
+                data[name] = column.tolist()
+        return data
+
+    def to_records(self) -> List[dict]:
+        """:return: one dict per row"""
+        data = self.to_dict()
+        return [dict(zip(data, row)) for row in zip(*data.values())]
+
+    def to_csv(self, path: str):
+        """
+        Writes the frame in a CSV file.
+        :param path: path of the CSV file
+        """
+        data = self.to_dict()
+        data["created"] = np.datetime_as_string(self.created).tolist()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(data)
+            writer.writerows(zip(*data.values()))
+
+
+class TradeFrame(HistoryFrame):
+    """Columns of the trade history (GET /trade/)."""
+
+    FLOAT_COLUMNS = ("price", "quantity")
+    STRING_COLUMNS = ("trade_id", "order", "rfq_id", "executing_unit")
+
+
+class OrderFrame(HistoryFrame):
+    """
+    Columns of the order history (GET /order/). The aggregations use the executed
+    price, so rejected orders are not counted.
+    """
+
+    FLOAT_COLUMNS = ("price", "executed_price", "quantity")
+    STRING_COLUMNS = ("order_id", "client_order_id", "executing_unit")
+    PRICE_COLUMN = "executed_price"
+
+    @property
+    def rejected(self) -> np.ndarray:
+        """Mask of the rejected orders."""
+        return ~self.traded
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import threading
+from typing import Dict, Iterable, List, Optional, Union
+
+from b2c2.common.models import Instrument
+
+
+class InstrumentRegistry:
+    """
+    Interns `Instrument` objects by name, so that every part of the application
+    shares one immutable object per instrument and its base/quote are parsed once.
+    """
+
+    def __init__(self, instruments: Iterable[Union[str, dict]] = ()):
+        """
+        :param instruments: instrument names or /instruments/ records to load
+        """
+        self._instruments = {}  # type: Dict[str, Instrument]
+        self._lock = threading.Lock()
+        self.load(instruments)
+
+    def __contains__(self, name) -> bool:
+        return name in self._instruments
+
+    def __len__(self):
+        return len(self._instruments)
+
+    def __iter__(self):
+        return iter(list(self._instruments.values()))
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._instruments)
+
+    def get(self, name: str) -> Instrument:
+        """
+        Returns the interned instrument, registering it if it is not known yet.
+        :param name: instrument name. Ex: BTCUSD.SPOT
+        """
+        instrument = self._instruments.get(name)
+        if instrument is None:
+            with self._lock:
+                instrument = self._instruments.setdefault(name, Instrument(name=name))
+        return instrument
+
+    def find(self, name: str) -> Optional[Instrument]:
+        """
+        :param name: instrument name. Ex: BTCUSD.SPOT
+        :return: the registered instrument, None if it is not registered.
+        """
+        return self._instruments.get(name)
+
+    def load(self, instruments: Iterable[Union[str, dict]]) -> List[Instrument]:
+        """
+        Registers the instruments, parsing their base and quote currencies.
+        Names which can not be parsed are registered as well, their base and quote
+        raise when accessed, like `Instrument.pair()`.
+        :param instruments: instrument names or /instruments/ records
+        :return: the interned instruments, in the same order
+        """
+        loaded = []
+        for instrument in instruments:
+            name = instrument["name"] if isinstance(instrument, dict) else instrument
+            instrument = self.get(name)
+            try:
+                instrument.pair()
+            except Exception:
+                pass
+            loaded.append(instrument)
+        return loaded
+
+
+# Registry shared by the clients of the process.
+instrument_registry = InstrumentRegistry()
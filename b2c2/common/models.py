@@ -3,12 +3,23 @@ import datetime
 import uuid
 from decimal import Decimal
 from enum import Enum
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from rich import print
 
-from b2c2.common.constants import CURRENCIES, FIAT_CURRENCIES
+from b2c2.common.constants import CURRENCY_SET, FIAT_CURRENCY_SET
+
+
+def as_utc(value: datetime.datetime) -> datetime.datetime:
+    """
+    Returns the datetime with the UTC time zone. Naive datetimes are considered to
+    be in UTC, like the API's.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
 
 
 class Side(str, Enum):
@@ -19,47 +30,81 @@ class Side(str, Enum):
         return self.name.upper()
 
 
-class Instrument(BaseModel):
+class B2C2Model(BaseModel):
+    class Config:
+        # Decimals are exchanged as strings to keep their precision.
+        json_encoders = {Decimal: str}
+
+
+class UnknownInstrument(Exception):
+    """Raised when the currencies of an instrument name can not be recognized."""
+
+
+# Bounded, since the names may come from untrusted input.
+@lru_cache(maxsize=1024)
+def parse_instrument_name(name: str) -> Tuple[str, str, str]:
+    """
+    Extracts (base, quote, type) from the instrument name (Ex: "BTCUSDT.SPOT").
+    Results are cached, so the names in use are parsed only once.
+    If can not validate the instrument, raises UnknownInstrument.
+    :return: (base, quote, type) - Ex: ("BTC", "USDT", "SPOT")
+    """
+    instrument = name.split(".")[0]
+    instrument_type = name.split(".")[-1]
+    if len(instrument) == 6:
+        return instrument[:3], instrument[3:], instrument_type
+    # BTCUSDT, USDTUSD, MATICUSD...
+    for index in range(3, len(instrument) - 2):
+        base, quote = instrument[:index], instrument[index:]
+        if base in CURRENCY_SET and quote in CURRENCY_SET:
+            return base, quote, instrument_type
+
+    raise UnknownInstrument("Unexpected instrument: {}".format(instrument))
+
+
+class Instrument(B2C2Model):
     name: str
 
+    _parsed: Optional[Tuple[str, str, str]] = PrivateAttr(default=None)
+
+    class Config:
+        frozen = True
+
     def _get_currencies(self):
-        return CURRENCIES
+        return CURRENCY_SET
 
     def _is_currency(self, currency):
         return currency in self._get_currencies()
 
+    def _parse(self) -> Tuple[str, str, str]:
+        if self._parsed is None:
+            self._parsed = parse_instrument_name(self.name)
+        return self._parsed
+
     def pair(self) -> Tuple[str, str]:
         """
         Extracts (base, quote) from the instrument name (Ex: "BTCUSDT")
-        If can not validate the instrument, raises Exception.
+        If can not validate the instrument, raises UnknownInstrument.
         :return: (base, quote) - Ex: ("BTC", "USDT")
         """
-        instrument = self.name.split(".")[0]
-        if len(instrument) == 6:
-            return instrument[:3], instrument[3:]
-        elif len(instrument) == 7:
-            if self._is_currency(instrument[:3]) and self._is_currency(instrument[3:]):
-                # BTCUSDT
-                return instrument[:3], instrument[3:]
-            elif self._is_currency(instrument[:4]) and self._is_currency(
-                instrument[4:]
-            ):
-                # USDTUSD
-                return instrument[:4], instrument[4:]
-
-        raise Exception("Unexpected instrument: {}".format(instrument))
+        base, quote, _ = self._parse()
+        return base, quote
 
     @property
     def base(self):
-        return self.pair()[0]
+        return self._parse()[0]
 
     @property
     def quote(self):
-        return self.pair()[1]
+        return self._parse()[1]
 
     @property
     def type(self):
-        return self.name.split(".")[-1]
+        """
+        If can not validate the instrument, raises UnknownInstrument.
+        :return: Ex: "SPOT"
+        """
+        return self._parse()[2]
 
 
 class Balance(dict):
@@ -70,13 +115,13 @@ class Balance(dict):
         print("=" * 20 + " Balances " + "=" * 20)
         for key, value in self.items():
             value = Decimal(value)
-            if key in FIAT_CURRENCIES:
+            if key in FIAT_CURRENCY_SET:
                 print(f"[bold green]{key:3s}[/bold green]: {value:>16.2f}")
             else:
                 print(f"[bold green]{key:3s}[/bold green]: {value:>22.8f}")
 
 
-class RFQRequest(BaseModel):
+class RFQRequest(B2C2Model):
     # Instrument name as given by the /instruments/ endpoint.
     instrument: str
     # Either ‘buy’ or ‘sell’.
@@ -87,7 +132,7 @@ class RFQRequest(BaseModel):
     client_rfq_id: str
 
 
-class RFQResponse(BaseModel):
+class RFQResponse(B2C2Model):
     # This RFQ is valid until this datetime.
     valid_until: datetime.datetime
     # uuid generated by the API.
@@ -105,20 +150,20 @@ class RFQResponse(BaseModel):
     # Creation date of this RFQ.
     created: datetime.datetime
 
-    def dict(self, *args, **kwargs):
-        d = super(RFQResponse, self).dict()
-        d["quantity"] = str(d["quantity"])
-        d["price"] = str(d["price"])
-        return d
-
     def display(self):
         print("=" * 20 + " RFQ Response " + "=" * 20)
         for key, value in self.__dict__.items():
             key = key.replace("_", " ").capitalize()
             print(f"[bold green]{key:25s}[/bold green]: {value}")
 
-    def has_expired(self):
-        return self.valid_until <= datetime.datetime.now()
+    def has_expired(self, now: datetime.datetime = None):
+        """
+        :param now: current time of the server (see `ServerClock.now()`), defaults
+        to the local clock. Naive datetimes are considered to be in UTC.
+        """
+        if now is None:
+            now = datetime.datetime.now(datetime.timezone.utc)
+        return as_utc(self.valid_until) <= as_utc(now)
 
     # TODO: Consider deleting this.
     @staticmethod
@@ -135,7 +180,7 @@ class RFQResponse(BaseModel):
         }
 
 
-class OrderRequest(BaseModel):
+class OrderRequest(B2C2Model):
     """
     Used by mock server.
     """
@@ -150,6 +195,8 @@ class OrderRequest(BaseModel):
     executing_unit: Optional[str]
     force_open: Optional[bool]
     acceptable_slippage_in_basis_points: Optional[str]
+    # Quote the order must match, optional.
+    rfq_id: Optional[str]
 
     def dict(self, *args, **kwargs):
         d = super(OrderRequest, self).dict()
@@ -173,7 +220,7 @@ class OrderRequest(BaseModel):
             return MarketOrderRequest(**kwargs)
 
 
-class MarketOrderRequest(BaseModel):
+class MarketOrderRequest(B2C2Model):
     order_type: str = "MKT"
     instrument: str
     side: Side
@@ -185,27 +232,21 @@ class MarketOrderRequest(BaseModel):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.client_order_id = str(uuid.uuid4())
-
-    def dict(self, *args, **kwargs):
-        d = super(MarketOrderRequest, self).dict()
-        d["quantity"] = str(d["quantity"])
-        d["valid_until"] = d["valid_until"].strftime("%Y-%m-%dT%H:%M:%S")
-        return d
+        # The given identifier is kept, so that the order can be looked up and
+        # resubmitted safely.
+        if not self.client_order_id:
+            self.client_order_id = str(uuid.uuid4())
 
 
 class FillOrKillOrderRequest(MarketOrderRequest):
     order_type: str = "FOK"
     price: Decimal
     acceptable_slippage_in_basis_points: Optional[str]
-
-    def dict(self, *args, **kwargs):
-        d = super(FillOrKillOrderRequest, self).dict()
-        d["price"] = str(d["price"])
-        return d
+    # Quote the order is executed against, optional.
+    rfq_id: Optional[str]
 
 
-class Trade(BaseModel):
+class Trade(B2C2Model):
     instrument: str
     trade_id: str
     origin: str
@@ -226,7 +267,7 @@ class Trade(BaseModel):
             print(f"[bold green]{key:25s}[/bold green]: {value}")
 
 
-class OrderResponse(BaseModel):
+class OrderResponse(B2C2Model):
     order_id: str
     client_order_id: str
     quantity: Decimal
@@ -242,13 +283,6 @@ class OrderResponse(BaseModel):
     def is_rejected(self):
         return self.executed_price is None
 
-    def dict(self, *args, **kwargs):
-        d = super(OrderResponse, self).dict()
-        d["quantity"] = str(d["quantity"])
-        d["price"] = str(d["price"])
-        d["executed_price"] = str(d["price"])
-        return d
-
     def display(self):
         color = "red" if self.is_rejected else "green"
         dashes = f"[bold {color}]" + "=" * 20 + f"[/bold {color}]"
@@ -263,7 +297,7 @@ class OrderResponse(BaseModel):
                 trade.display()
 
 
-class Ledger(BaseModel):
+class Ledger(B2C2Model):
     """
     Ledger Model, not used yet.
     """
@@ -14,6 +14,7 @@ BALANCE = {
     "LTC": Decimal(0),
     "XRP": Decimal(0),
     "BCH": Decimal(0),
+    "USDT": Decimal(0),
 }
 
 
@@ -27,6 +28,21 @@ INSTRUMENT_PRICES = {
     "LTCUSD.SPOT": Decimal("179.60"),
     "XRPUSD.SPOT": Decimal("1.12906"),
     "BCHUSD.SPOT": Decimal("595.72"),
+    "USDTUSD.SPOT": Decimal("1.0002"),
+}
+
+# Annualized volatility of the simulated prices.
+INSTRUMENT_VOLATILITY = {
+    "BTCUSD.CFD": 0.8,
+    "BTCUSD.SPOT": 0.8,
+    "BTCEUR.SPOT": 0.8,
+    "BTCGBP.SPOT": 0.8,
+    "ETHBTC.SPOT": 0.6,
+    "ETHUSD.SPOT": 1.0,
+    "LTCUSD.SPOT": 1.1,
+    "XRPUSD.SPOT": 1.2,
+    "BCHUSD.SPOT": 1.1,
+    "USDTUSD.SPOT": 0.01,
 }
 
 
@@ -64,4 +80,8 @@ INSTRUMENTS = [
         "name": "BCHUSD.SPOT",
         "price": Decimal("595.72"),
     },
+    {
+        "name": "USDTUSD.SPOT",
+        "price": Decimal("1.0002"),
+    },
 ]
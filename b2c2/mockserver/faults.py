@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Latency and faults injected into the responses of the mock server, to exercise
+the timeouts, hedging and retries of the clients.
+
+Profiles are given by endpoint: the key is a path prefix, optionally preceded by
+the method (Ex: "/order/", "POST /order/"), or "*" for the other endpoints. The
+most specific key matching a request is used.
+    {
+        "*": {"latency": {"distribution": "normal", "delay": 0.02, "jitter": 0.005}},
+        "POST /order/": {
+            "latency": {"distribution": "long_tail", "delay": 0.05, "jitter": 1},
+            "unavailable": 0.01,
+            "dropped": 0.005
+        }
+    }
+"""
+import asyncio
+import json
+import math
+import random
+from collections import Counter
+from enum import Enum
+from typing import Dict, Optional, Union
+
+from pydantic import BaseModel, confloat, conint, root_validator
+
+# Control endpoint of the faults, never affected by them.
+CONTROL_PATH = "/faults/"
+
+# Faults answering a request instead of the server, drawn in this order.
+ERROR_KINDS = ("rate_limited", "server_error", "unavailable", "dropped")
+
+Probability = confloat(ge=0, le=1)
+
+
+class Distribution(str, Enum):
+    fixed = "fixed"
+    normal = "normal"
+    # Log-normal.
+    long_tail = "long_tail"
+
+
+class Latency(BaseModel):
+    """Delay before the request is handled."""
+
+    distribution: Distribution = Distribution.fixed
+    # Seconds. Fixed delay, mean of the normal or median of the long tail.
+    delay: confloat(ge=0) = 0
+    # Standard deviation of the normal in seconds, or shape (sigma) of the long
+    # tail: its 99th percentile is `delay * exp(2.33 * jitter)`.
+    jitter: confloat(ge=0) = 0
+    # Seconds the delays are capped at.
+    max_delay: confloat(ge=0) = 60
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == Distribution.fixed:
+            delay = self.delay
+        elif self.distribution == Distribution.normal:
+            delay = rng.gauss(self.delay, self.jitter)
+        else:
+            delay = self.delay * math.exp(rng.gauss(0, self.jitter))
+        return min(max(delay, 0), self.max_delay)
+
+
+class FaultProfile(BaseModel):
+    """Faults of an endpoint. The error probabilities add up, at most to 1."""
+
+    latency: Latency = Latency()
+    # Probability of answering 429 Too Many Requests.
+    rate_limited: Probability = 0
+    # Seconds sent in the Retry-After header of the 429 responses.
+    retry_after: confloat(ge=0) = 1
+    # Probability of answering 500 Internal Server Error.
+    server_error: Probability = 0
+    # Probability of answering 503 Service Unavailable.
+    unavailable: Probability = 0
+    # Probability of closing the connection in the middle of the response.
+    dropped: Probability = 0
+    # Probability of sending the body slowly, in `slow_body_chunks` parts
+    # `slow_body_delay` seconds apart.
+    slow_body: Probability = 0
+    slow_body_chunks: conint(ge=1) = 10
+    slow_body_delay: confloat(ge=0) = 0.1
+
+    @root_validator(skip_on_failure=True)
+    def check_error_probabilities(cls, values):
+        total = sum(values[kind] for kind in ERROR_KINDS)
+        if total > 1:
+            raise ValueError(
+                f"The error probabilities add up to {total:g}, more than 1"
+            )
+        return values
+
+
+# Profiles selectable by name with MOCK_FAULTS.
+PRESETS = {
+    "none": {},
+    # Steady latency of a distant server.
+    "remote": {
+        "*": {"latency": {"distribution": "normal", "delay": 0.08, "jitter": 0.01}}
+    },
+    # Mostly fast responses with a long tail, as seen in production.
+    "long_tail": {
+        "*": {"latency": {"distribution": "long_tail", "delay": 0.03, "jitter": 1}}
+    },
+    # Long tail, throttling, errors and connection problems.
+    "flaky": {
+        "*": {
+            "latency": {"distribution": "long_tail", "delay": 0.03, "jitter": 1},
+            "rate_limited": 0.02,
+            "server_error": 0.01,
+            "unavailable": 0.02,
+            "dropped": 0.01,
+            "slow_body": 0.02,
+        }
+    },
+}
+
+Profiles = Dict[str, FaultProfile]
+
+
+def parse_profiles(value: Union[str, dict, None]) -> Profiles:
+    """
+    :param value: name of a preset, profiles by endpoint or their JSON
+    :raise ValueError: if the value is not a preset name or valid profiles
+    """
+    if not value:
+        return {}
+    if isinstance(value, str):
+        value = PRESETS[value] if value in PRESETS else json.loads(value)
+    if not isinstance(value, dict):
+        raise ValueError("Profiles must be given by endpoint")
+    profiles = {}
+    for key, profile in value.items():
+        if isinstance(profile, dict):
+            profile = FaultProfile(**profile)
+        elif not isinstance(profile, FaultProfile):
+            raise ValueError(f"The profile of {key} must be an object")
+        profiles[key] = profile
+    return profiles
+
+
+class ConnectionDropped(Exception):
+    """Raised to make the server close the connection of a response."""
+
+
+class FaultInjector:
+    """Picks the profile of the requests and draws their faults."""
+
+    def __init__(self, profiles: Union[str, dict] = None, seed: int = None):
+        """
+        :param profiles: name of a preset, profiles by endpoint or their JSON
+        :param seed: seed of the random draws, for reproducible runs
+        """
+        self.profiles = parse_profiles(profiles)
+        self.rng = random.Random(seed)
+        # Number of faults injected, by kind.
+        self.injected = Counter()
+
+    def get_profile(self, method: str, path: str) -> Optional[FaultProfile]:
+        """
+        :return: the profile of the most specific key matching the request
+        """
+        if path.startswith(CONTROL_PATH):
+            return None
+        best, best_score = None, None
+        for key, profile in self.profiles.items():
+            key_method, _, prefix = key.rpartition(" ")
+            if key_method and key_method.upper() != method:
+                continue
+            if prefix == "*":
+                prefix = ""
+            if not path.startswith(prefix):
+                continue
+            score = (len(prefix), bool(key_method))
+            if best_score is None or score > best_score:
+                best, best_score = profile, score
+        return best
+
+    def draw_error(self, profile: FaultProfile) -> Optional[str]:
+        """
+        :return: "rate_limited", "server_error", "unavailable", "dropped" or None
+        """
+        draw = self.rng.random()
+        for kind in ERROR_KINDS:
+            draw -= getattr(profile, kind)
+            if draw < 0:
+                return kind
+        return None
+
+    def stats(self) -> dict:
+        return dict(profiles=self.profiles, injected=dict(self.injected))
+
+
+# Status of the error responses by kind.
+ERROR_STATUS = {"rate_limited": 429, "server_error": 500, "unavailable": 503}
+
+
+class FaultInjectionMiddleware:
+    """ASGI middleware delaying and failing the requests as the profiles say."""
+
+    def __init__(self, app, injector: FaultInjector):
+        self.app = app
+        self.injector = injector
+
+    async def __call__(self, scope, receive, send):
+        profile = None
+        if scope["type"] == "http":
+            profile = self.injector.get_profile(scope["method"], scope["path"])
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        injector = self.injector
+        delay = profile.latency.sample(injector.rng)
+        if delay:
+            await asyncio.sleep(delay)
+
+        error = injector.draw_error(profile)
+        if error:
+            injector.injected[error] += 1
+        if error in ERROR_STATUS:
+            await self._send_error(send, ERROR_STATUS[error], profile)
+            return
+        if error == "dropped":
+            send = self._dropping(send)
+        elif injector.rng.random() < profile.slow_body:
+            injector.injected["slow_body"] += 1
+            send = self._slowing(send, profile)
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _send_error(send, status: int, profile: FaultProfile):
+        body = json.dumps({"detail": "Fault injected by the mock server"}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        if status == 429:
+            headers.append((b"retry-after", str(profile.retry_after).encode()))
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _dropping(send):
+        """Sends the headers and half of the body, then drops the connection."""
+
+        async def dropping_send(message):
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": body[: len(body) // 2],
+                    "more_body": True,
+                }
+            )
+            raise ConnectionDropped()
+
+        return dropping_send
+
+    @staticmethod
+    def _slowing(send, profile: FaultProfile):
+        """Sends the body in parts, waiting between them."""
+
+        async def slowing_send(message):
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            size = max(math.ceil(len(body) / profile.slow_body_chunks), 1)
+            parts = [body[start : start + size] for start in range(0, len(body), size)]
+            for part in parts[:-1]:
+                await send(
+                    {"type": "http.response.body", "body": part, "more_body": True}
+                )
+                await asyncio.sleep(profile.slow_body_delay)
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": parts[-1] if parts else b"",
+                    "more_body": message.get("more_body", False),
+                }
+            )
+
+        return slowing_send
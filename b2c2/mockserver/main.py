@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 import datetime
 import uuid
-from collections import OrderedDict
 from decimal import Decimal
+from typing import Dict, Union
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 
+from b2c2.api_client.errors import APIError, PaginationOffsetTooBig
 from b2c2.common.models import (
     OrderRequest,
     OrderResponse,
@@ -13,42 +15,105 @@ from b2c2.common.models import (
     RFQResponse,
     Trade,
 )
-from b2c2.mockserver.defaults import BALANCE, INSTRUMENT_PRICES
-from b2c2.mockserver.settings import VALIDITY_WINDOW
-from b2c2.mockserver.utils import (
-    get_base_balance,
-    get_pair,
-    get_price,
-    get_quote_balance,
+from b2c2.mockserver.faults import (
+    CONTROL_PATH,
+    FaultInjectionMiddleware,
+    FaultInjector,
+    parse_profiles,
 )
+from b2c2.mockserver.settings import (
+    DEFAULT_PAGE_SIZE,
+    FAULTS,
+    FAULTS_SEED,
+    HISTORY_RETENTION,
+    MAX_PAGE_SIZE,
+    MAX_PAGINATION_OFFSET,
+    STATE_BACKEND,
+    STATE_PATH,
+    VALIDITY_WINDOW,
+)
+from b2c2.mockserver.state import DEFAULT_ACCOUNT, HistoryQuery, create_backend
+from b2c2.mockserver.utils import get_pair, get_price, instruments, market, to_naive_utc
 
 app = FastAPI()
 
-balance = BALANCE
-orders_by_id = OrderedDict()  # type: OrderedDict[str, OrderResponse]
-orders_by_client_order_id = OrderedDict()  # type: OrderedDict[str, OrderResponse]
-trades_by_id = OrderedDict()  # type: OrderedDict[str, Trade]
+# Balances, orders and trades, and the quotes which orders can refer to with
+# their `rfq_id`.
+state = create_backend(STATE_BACKEND, STATE_PATH, HISTORY_RETENTION)
+# Latency and faults of the responses, changed with the control endpoint.
+faults = FaultInjector(FAULTS, seed=int(FAULTS_SEED) if FAULTS_SEED else None)
+app.add_middleware(FaultInjectionMiddleware, injector=faults)
+
+
+@app.on_event("startup")
+def start_market():
+    market.start()
+
+
+@app.on_event("shutdown")
+def stop_market():
+    market.stop()
+
+
+@app.exception_handler(APIError)
+def api_error_handler(request: Request, exc: APIError):
+    """Answers the API errors like the B2C2 API does."""
+    return JSONResponse(
+        status_code=400,
+        content={"errors": [{"code": exc.code, "message": exc.message}]},
+    )
+
+
+@app.get(CONTROL_PATH)
+def get_faults():
+    return faults.stats()
+
+
+@app.put(CONTROL_PATH)
+def set_faults(profiles: Union[str, Dict[str, dict]] = Body(...)):
+    """Replaces the profiles with a preset name or profiles by endpoint."""
+    try:
+        faults.profiles = parse_profiles(profiles)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return faults.stats()
+
+
+@app.delete(CONTROL_PATH)
+def clear_faults():
+    faults.profiles = {}
+    faults.injected.clear()
+    return faults.stats()
+
+
+def get_account(authorization: str = Header(None)) -> str:
+    """Each token has its own balance, orders and trades."""
+    if authorization and authorization.startswith("Token "):
+        return authorization[len("Token ") :]
+    return DEFAULT_ACCOUNT
 
 
 @app.get("/balance/")
-def get_balance():
-    return dict([(base, str(value)) for base, value in balance.items()])
+def get_balance(account: str = Depends(get_account)):
+    return {
+        currency: str(value) for currency, value in state.get_balance(account).items()
+    }
 
 
 @app.get("/instruments/")
 def get_instruments():
-    return [dict(name=instrument_name) for instrument_name in INSTRUMENT_PRICES.keys()]
+    return [dict(name=instrument_name) for instrument_name in instruments.names]
 
 
 @app.post("/request_for_quote/")
-def get_request_for_quote(rfq: RFQRequest):
+def get_request_for_quote(rfq: RFQRequest, account: str = Depends(get_account)):
     # Check average price for the instrument
     price = get_price(rfq.instrument)
     # Set the dates for creation and validity.
-    created = datetime.datetime.now()
+    created = datetime.datetime.utcnow()
     valid_until = created + datetime.timedelta(seconds=VALIDITY_WINDOW)
 
-    return RFQResponse(
+    rfq_response = RFQResponse(
         valid_until=valid_until,
         rfq_id=str(uuid.uuid4()),
         client_rfq_id=rfq.client_rfq_id,
@@ -58,34 +123,61 @@ def get_request_for_quote(rfq: RFQRequest):
         price=price,
         created=created,
     )
+    state.add_quote(account, rfq_response)
+    return rfq_response
 
 
 @app.get("/order/{order_id}/")
-def get_order(order_id: str):
-    order = orders_by_id.get(order_id)
+def get_order(order_id: str, account: str = Depends(get_account)):
+    order = state.get_order(account, order_id)
     if not order:
-        order = orders_by_client_order_id.get(order_id)
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 
 @app.get("/trade/{trade_id}/")
-def get_trade(trade_id: str):
-    trade = trades_by_id.get(trade_id)
+def get_trade(trade_id: str, account: str = Depends(get_account)):
+    trade = state.get_trade(account, trade_id)
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
     return trade
 
 
+def get_history_query(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    instrument: str = None,
+    since: datetime.datetime = None,
+    created__gte: datetime.datetime = None,
+    created__lt: datetime.datetime = None,
+) -> HistoryQuery:
+    """Filters and page of the /order/ and /trade/ listings."""
+    if offset > MAX_PAGINATION_OFFSET:
+        raise PaginationOffsetTooBig()
+    lower_bounds = [to_naive_utc(value) for value in (since, created__gte) if value]
+    return HistoryQuery(
+        created__gte=max(lower_bounds) if lower_bounds else None,
+        created__lt=to_naive_utc(created__lt) if created__lt else None,
+        instrument=instrument,
+        offset=offset,
+        limit=limit,
+    )
+
+
 @app.get("/order/")
-def get_orders():
-    return list(orders_by_id.values())
+def get_orders(
+    account: str = Depends(get_account),
+    query: HistoryQuery = Depends(get_history_query),
+):
+    return state.list_orders(account, query)
 
 
 @app.get("/trade/")
-def get_trades():
-    return list(trades_by_id.values())
+def get_trades(
+    account: str = Depends(get_account),
+    query: HistoryQuery = Depends(get_history_query),
+):
+    return state.list_trades(account, query)
 
 
 @app.get("/ledger/")
@@ -94,70 +186,73 @@ def get_ledgers():
     pass
 
 
+def duplicate_order() -> HTTPException:
+    return HTTPException(status_code=400, detail="An order with this id already exists")
+
+
 @app.post("/order/")
-def post_order(order_request: OrderRequest):
-    if order_request.client_order_id in orders_by_client_order_id.keys():
-        raise HTTPException(
-            status_code=400, detail="An order with this id already exists"
-        )
+def post_order(order_request: OrderRequest, account: str = Depends(get_account)):
+    # A resent order is refused as a duplicate, even if it used its quote up.
+    if state.get_order(account, order_request.client_order_id) is not None:
+        raise duplicate_order()
     order_id = str(uuid.uuid4())
-    price = get_price(order_request.instrument)
+    if order_request.rfq_id:
+        # Executed at the price of the quote, if the order matches it.
+        price = state.check_quote(account, order_request).price
+    else:
+        price = get_price(order_request.instrument)
     if not order_request.price:
         order_request.price = price
     total_amount = price * order_request.quantity
-    order_created = datetime.datetime.now()
-    base_balance = get_base_balance(balance, order_request.instrument)
-    quote_balance = get_quote_balance(balance, order_request.instrument)
-
-    if (
-        order_request.side == "buy"
-        and price / Decimal(order_request.price) > 1.11
-        or quote_balance < total_amount
-    ) or (order_request.side == "sell" and base_balance < order_request.quantity):
-        # reject it. price is way too low or not sufficient balance.
-        executed_price = None
-        trades = []
+    order_created = datetime.datetime.utcnow()
+    base, quote = get_pair(order_request.instrument)
+
+    if order_request.side == "buy" and price / Decimal(order_request.price) > 1.11:
+        # reject it. price is way too low.
+        changes = None
+    elif order_request.side == "buy":
+        changes = {quote: -total_amount, base: order_request.quantity}
     else:
-        base, quote = get_pair(order_request.instrument)
-        if order_request.side == "buy":
-            balance[quote] -= total_amount
-            balance[base] += order_request.quantity
-        elif order_request.side == "sell":
-            balance[quote] += total_amount
-            balance[base] -= order_request.quantity
-
-        executed_price = price
-
-        trades = [
-            Trade(
-                instrument=order_request.instrument,
-                trade_id=str(uuid.uuid4()),
-                origin="rest",
-                rfq_id=None,
-                created=order_created,  # use multiple created if multiple trades
-                price=executed_price,
-                quantity=order_request.quantity,
-                order=order_id,
-                side=order_request.side,
-                executing_unit=order_request.executing_unit,
+        changes = {quote: total_amount, base: -order_request.quantity}
+
+    def build_order(filled: bool) -> OrderResponse:
+        # Rejected if the price is too low or the balance is not sufficient.
+        executed_price = price if filled else None
+        trades = []
+        if filled and order_request.rfq_id:
+            # Only a filled order uses the quote up.
+            state.consume_quote(order_request.rfq_id)
+        if filled:
+            trades.append(
+                Trade(
+                    instrument=order_request.instrument,
+                    trade_id=str(uuid.uuid4()),
+                    origin="rest",
+                    rfq_id=order_request.rfq_id,
+                    created=order_created,  # use multiple created if multiple trades
+                    price=executed_price,
+                    quantity=order_request.quantity,
+                    order=order_id,
+                    side=order_request.side,
+                    executing_unit=order_request.executing_unit,
+                )
             )
-        ]
-
-    response = OrderResponse(
-        order_id=order_id,
-        client_order_id=order_request.client_order_id,
-        quantity=order_request.quantity,
-        side=order_request.side,
-        instrument=order_request.instrument,
-        price=order_request.price,
-        executed_price=executed_price,  # TODO: add some deviation
-        executing_unit=order_request.executing_unit,
-        trades=trades,
-        created=order_created,
-    )
+        return OrderResponse(
+            order_id=order_id,
+            client_order_id=order_request.client_order_id,
+            quantity=order_request.quantity,
+            side=order_request.side,
+            instrument=order_request.instrument,
+            price=order_request.price,
+            executed_price=executed_price,  # TODO: add some deviation
+            executing_unit=order_request.executing_unit,
+            trades=trades,
+            created=order_created,
+        )
 
-    orders_by_id[response.order_id] = response
-    orders_by_client_order_id[response.client_order_id] = response
-    for trade in trades:
-        trades_by_id[trade.trade_id] = trade
+    response = state.place_order(
+        account, order_request.client_order_id, changes, build_order
+    )
+    if response is None:
+        raise duplicate_order()
     return response
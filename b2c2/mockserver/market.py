@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Simulated market of the mock server.
+
+The price of each instrument follows a geometric Brownian motion sampled every
+`step` seconds from the start of the simulation. The paths are generated with
+numpy in chunks of `chunk_size` steps for all the instruments at once, each chunk
+from its own seed derived from the simulation seed, so a run with the same seed
+sees the same prices at the same time since the start. Looking a price up is an
+array access into the chunk of the timestamp.
+
+A background thread generates the next chunk before the lookups reach it, and
+only the most recent chunks are kept in memory. Older chunks are generated again
+if needed, from the level saved at their start.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+# Seconds between two prices of the paths.
+DEFAULT_STEP = 0.1
+# Steps generated at once: an hour at the default step.
+DEFAULT_CHUNK_SIZE = 36000
+# Chunks kept in memory.
+DEFAULT_CACHED_CHUNKS = 3
+
+
+class MarketSimulator:
+    """
+    Seeded geometric Brownian motion price paths of a set of instruments.
+        market = MarketSimulator(INSTRUMENT_PRICES, seed=42, volatility=0.8)
+        market.start()
+        price = market.get_price("BTCUSD.SPOT")
+    """
+
+    def __init__(
+        self,
+        prices: Dict[str, Decimal],
+        seed: int = 0,
+        volatility: Union[float, Dict[str, float]] = 0.8,
+        drift: Union[float, Dict[str, float]] = 0.0,
+        step: float = DEFAULT_STEP,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        cached_chunks: int = DEFAULT_CACHED_CHUNKS,
+        start: float = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        :param prices: prices of the instruments at the start
+        :param seed: seed of the paths
+        :param volatility: annualized volatility, by instrument or for all of them
+        :param drift: annualized drift, by instrument or for all of them
+        :param step: seconds between two prices
+        :param chunk_size: number of steps generated at once
+        :param cached_chunks: number of chunks kept in memory
+        :param start: timestamp of the start of the paths, now if None
+        :param clock: returns the current timestamp
+        """
+        self.names = list(prices)
+        self.seed = seed
+        self.step = step
+        self.chunk_size = chunk_size
+        self.cached_chunks = max(cached_chunks, 2)
+        self.clock = clock
+        self.start_time = clock() if start is None else start
+        # Index of the instruments in the rows of the chunks.
+        self._rows = {name: row for row, name in enumerate(self.names)}
+        # Decimal places of the prices, those of the start prices.
+        self._places = [
+            max(-prices[name].as_tuple().exponent, 0) for name in self.names
+        ]
+
+        dt = step / SECONDS_PER_YEAR
+        sigma = self._by_instrument(volatility)
+        mu = self._by_instrument(drift)
+        # Per step log-return: (mu - sigma^2 / 2) dt + sigma sqrt(dt) Z
+        self._mean = ((mu - sigma ** 2 / 2) * dt)[:, None]
+        self._scale = (sigma * math.sqrt(dt))[:, None]
+
+        # Log prices at the start of each chunk generated so far.
+        self._levels = {0: np.log([float(prices[name]) for name in self.names])}
+        self._chunks = OrderedDict()  # type: OrderedDict[int, np.ndarray]
+        self._lock = threading.Lock()
+        self._wanted = threading.Condition(self._lock)
+        self._next_chunk = 1
+        self._stopped = True
+        self._generator = None  # type: Optional[threading.Thread]
+
+    def _by_instrument(self, value: Union[float, Dict[str, float]]) -> np.ndarray:
+        if isinstance(value, dict):
+            return np.array([float(value.get(name, 0.0)) for name in self.names])
+        return np.full(len(self.names), float(value))
+
+    def _generate(self, index: int, level: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param index: index of the chunk, seeding its random numbers
+        :param level: log prices at the start of the chunk
+        :return: prices of the chunk (one row per instrument), log prices at the
+        start of the next chunk
+        """
+        rng = np.random.default_rng([self.seed, index])
+        log_returns = rng.standard_normal((len(self.names), self.chunk_size))
+        log_returns *= self._scale
+        log_returns += self._mean
+        log_prices = np.cumsum(log_returns, axis=1)
+        next_level = level + log_prices[:, -1]
+        # The first price of a chunk is its level.
+        log_prices -= log_returns
+        log_prices += level[:, None]
+        return np.exp(log_prices, out=log_prices), next_level
+
+    def _get_chunk(self, index: int) -> np.ndarray:
+        """Must be called with the lock held."""
+        chunk = self._chunks.get(index)
+        if chunk is not None:
+            self._chunks.move_to_end(index)
+            return chunk
+        # The levels are known up to the chunk following the last one generated.
+        for missing in range(min(index, max(self._levels)), index + 1):
+            chunk = self._add(missing, *self._generate(missing, self._levels[missing]))
+        return chunk
+
+    def _add(self, index: int, chunk: np.ndarray, next_level: np.ndarray):
+        """Must be called with the lock held."""
+        self._levels.setdefault(index + 1, next_level)
+        self._chunks[index] = chunk
+        self._chunks.move_to_end(index)
+        while len(self._chunks) > self.cached_chunks:
+            self._chunks.popitem(last=False)
+        return chunk
+
+    def _lookup(self, timestamp: Optional[float]) -> Tuple[np.ndarray, int]:
+        """
+        :return: the chunk of the timestamp and the column of the timestamp in it
+        """
+        timestamp = self.clock() if timestamp is None else timestamp
+        position = max(int((timestamp - self.start_time) / self.step), 0)
+        index, column = divmod(position, self.chunk_size)
+        with self._lock:
+            chunk = self._get_chunk(index)
+            if index + 1 not in self._chunks and not self._stopped:
+                self._next_chunk = index + 1
+                self._wanted.notify()
+        return chunk, column
+
+    def get_prices(self, timestamp: float = None) -> Dict[str, Decimal]:
+        """
+        :param timestamp: time of the prices, now if None
+        :return: prices of all the instruments at that time
+        """
+        chunk, column = self._lookup(timestamp)
+        return {
+            name: self._to_decimal(row, chunk[row, column])
+            for name, row in self._rows.items()
+        }
+
+    def get_price(self, instrument: str, timestamp: float = None) -> Decimal:
+        """
+        :param instrument: name of the instrument
+        :param timestamp: time of the price, now if None
+        :return: the price, with the decimal places of the start price
+        :raise KeyError: if the instrument is not simulated
+        """
+        row = self._rows[instrument]
+        chunk, column = self._lookup(timestamp)
+        return self._to_decimal(row, chunk[row, column])
+
+    def _to_decimal(self, row: int, price: float) -> Decimal:
+        return Decimal(f"{price:.{self._places[row]}f}")
+
+    def start(self):
+        """Generates the next chunks in a background thread."""
+        with self._lock:
+            if not self._stopped:
+                return
+            self._stopped = False
+
+        def run():
+            while True:
+                with self._lock:
+                    while not self._stopped and (
+                        self._next_chunk in self._chunks
+                        or self._next_chunk not in self._levels
+                    ):
+                        self._wanted.wait()
+                    if self._stopped:
+                        return
+                    index = self._next_chunk
+                    level = self._levels[index]
+                # Generated without holding the lock, so lookups go on meanwhile.
+                chunk, next_level = self._generate(index, level)
+                with self._lock:
+                    if index not in self._chunks:
+                        self._add(index, chunk, next_level)
+
+        self._generator = threading.Thread(target=run, name="b2c2-market", daemon=True)
+        self._generator.start()
+
+    def stop(self):
+        """Stops the background generation."""
+        with self._lock:
+            self._stopped = True
+            self._wanted.notify_all()
+        if self._generator is not None:
+            self._generator.join()
+            self._generator = None
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import datetime
+import heapq
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from b2c2.api_client.errors import (
+    DifferentInstrument,
+    DifferentPrice,
+    DifferentQuantity,
+    DifferentSide,
+    QuoteIsNotValid,
+    TheRfqDoesNotBelongToYou,
+)
+from b2c2.common.models import OrderRequest, RFQResponse
+
+
+def check_quote(
+    account: str, order_request: OrderRequest, quote: Optional[Tuple[str, RFQResponse]]
+) -> RFQResponse:
+    """
+    Checks an order against the quote it refers to.
+    :param account: token of the client sending the order
+    :param order_request: order with an `rfq_id`
+    :param quote: (account, quote) issued with the `rfq_id`, None if there is no
+    unexpired one
+    :return: the quote
+    :raise QuoteIsNotValid: if the quote is unknown, expired or used
+    :raise TheRfqDoesNotBelongToYou: if the quote was issued to another client
+    :raise DifferentInstrument, DifferentSide, DifferentQuantity, DifferentPrice:
+    if the order does not match the quote
+    """
+    if quote is None:
+        raise QuoteIsNotValid()
+    owner, rfq = quote
+    if owner != account:
+        raise TheRfqDoesNotBelongToYou()
+    if order_request.instrument != rfq.instrument:
+        raise DifferentInstrument()
+    if order_request.side != rfq.side:
+        raise DifferentSide()
+    if order_request.quantity != rfq.quantity:
+        raise DifferentQuantity()
+    if order_request.price is not None and order_request.price != rfq.price:
+        raise DifferentPrice()
+    return rfq
+
+
+class RFQRegistry:
+    """
+    Quotes issued by the mock server, until they expire or an order uses them.
+    Kept in the process by `MemoryBackend`.
+
+    A min-heap of (valid_until, rfq_id) gives the next quote to expire, so the
+    expired quotes are evicted in O(log n) each as the time goes by. Quotes used by
+    a filled order are removed from the registry right away and their heap entries
+    are skipped when they come up.
+    """
+
+    def __init__(self, clock: Callable[[], datetime.datetime] = None):
+        """
+        :param clock: returns the current naive UTC time of the server
+        """
+        self.clock = clock or datetime.datetime.utcnow
+        self._quotes = {}  # type: Dict[str, Tuple[str, RFQResponse]]
+        self._expiries = []  # type: List[Tuple[datetime.datetime, str]]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def _evict(self, now: datetime.datetime):
+        """Must be called with the lock held."""
+        while self._expiries and self._expiries[0][0] <= now:
+            _, rfq_id = heapq.heappop(self._expiries)
+            quote = self._quotes.get(rfq_id)
+            # The quote may have been used, or issued again with another expiry.
+            if quote is not None and quote[1].valid_until <= now:
+                del self._quotes[rfq_id]
+
+    def add(self, account: str, rfq: RFQResponse):
+        """
+        :param account: token of the client the quote was issued to
+        """
+        with self._lock:
+            self._evict(self.clock())
+            self._quotes[rfq.rfq_id] = (account, rfq)
+            heapq.heappush(self._expiries, (rfq.valid_until, rfq.rfq_id))
+
+    def get(self, rfq_id: str) -> Optional[Tuple[str, RFQResponse]]:
+        """
+        :return: (account, quote) of an unexpired quote, None if there is none
+        """
+        with self._lock:
+            self._evict(self.clock())
+            return self._quotes.get(rfq_id)
+
+    def check(self, account: str, order_request: OrderRequest) -> RFQResponse:
+        """
+        Checks an order against the quote it refers to. The quote is kept until
+        the order is filled (see `consume`).
+        :param account: token of the client sending the order
+        :param order_request: order with an `rfq_id`
+        :return: the quote
+        """
+        return check_quote(account, order_request, self.get(order_request.rfq_id))
+
+    def consume(self, rfq_id: str):
+        """
+        Removes the quote used by a filled order.
+        :raise QuoteIsNotValid: if another order used it since it was checked
+        """
+        with self._lock:
+            if self._quotes.pop(rfq_id, None) is None:
+                raise QuoteIsNotValid()
@@ -1,2 +1,33 @@
 # -*- coding: utf-8 -*-
+from b2c2.common.settings import config
+
 VALIDITY_WINDOW = 10  # RFQRequest Validity in seconds
+
+# Backend of the balances, orders and trades: "memory" for a single worker, or
+# "sqlite" to share them between several uvicorn workers.
+STATE_BACKEND = config.get("MOCK_STATE_BACKEND", "memory")
+# Database file of the "sqlite" backend.
+STATE_PATH = config.get("MOCK_STATE_PATH", "mockserver.sqlite3")
+# Orders and trades kept by account, the oldest ones are evicted. 0 keeps them all.
+HISTORY_RETENTION = int(config.get("MOCK_HISTORY_RETENTION", 10000))
+# Number of records listed by /order/ and /trade/ without `limit`, and maximum.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Largest `offset` accepted before answering PaginationOffsetTooBig (1102).
+MAX_PAGINATION_OFFSET = int(config.get("MOCK_MAX_PAGINATION_OFFSET", 1000))
+
+# Seed of the simulated price paths, the same seed gives the same prices.
+MARKET_SEED = int(config.get("MOCK_MARKET_SEED", 0))
+# Annualized volatility of all the simulated prices, INSTRUMENT_VOLATILITY
+# by instrument if 0.
+MARKET_VOLATILITY = float(config.get("MOCK_MARKET_VOLATILITY") or 0)
+# Annualized drift of the simulated prices.
+MARKET_DRIFT = float(config.get("MOCK_MARKET_DRIFT", 0))
+# Seconds between two simulated prices.
+MARKET_STEP = float(config.get("MOCK_MARKET_STEP", 0.1))
+
+# Latency and faults injected into the responses: name of a preset of
+# b2c2.mockserver.faults or profiles by endpoint in JSON. None by default.
+FAULTS = config.get("MOCK_FAULTS")
+# Seed of the fault draws, random if not set.
+FAULTS_SEED = config.get("MOCK_FAULTS_SEED")
@@ -0,0 +1,665 @@
+# -*- coding: utf-8 -*-
+"""
+State of the mock server: balances, orders and trades by account.
+
+Orders are placed with `place_order()`, which checks the `client_order_id`, applies
+the balance changes and stores the order as a single atomic step, so concurrent
+orders can not overdraw an account or be stored twice.
+
+- `MemoryBackend` keeps the state in the process, with a lock per account.
+- `SQLiteBackend` keeps it in a SQLite database, so that several uvicorn workers
+  share it. Each order is placed in an immediate transaction.
+
+The quotes issued by the server are kept by the backend as well, so that an order
+can refer to a quote issued by another worker. Filling an order consumes its quote
+within the same atomic step.
+
+Orders and trades are indexed by creation time for the history listings, and only
+the most recent `retention` of each are kept by account. The `client_order_id` of
+an evicted order is refused until `EVICTED_IDS_FACTOR * retention` other orders
+were evicted.
+"""
+import datetime
+import itertools
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from b2c2.api_client.errors import QuoteIsNotValid
+from b2c2.common.models import OrderRequest, OrderResponse, RFQResponse, Trade
+from b2c2.mockserver.defaults import BALANCE
+from b2c2.mockserver.rfq import RFQRegistry, check_quote
+
+# Account of the requests without token.
+DEFAULT_ACCOUNT = "default"
+
+# The client_order_ids of the evicted orders are refused until this many times
+# `retention` orders were evicted after them.
+EVICTED_IDS_FACTOR = 10
+
+# Builds the order once it is known whether it could be filled.
+OrderBuilder = Callable[[bool], OrderResponse]
+
+
+@dataclass
+class HistoryQuery:
+    """Filters and page of a history listing. Records are listed newest first."""
+
+    # Only the records created at or after this datetime.
+    created__gte: Optional[datetime.datetime] = None
+    # Only the records created before this datetime.
+    created__lt: Optional[datetime.datetime] = None
+    instrument: Optional[str] = None
+    # Number of records skipped.
+    offset: int = 0
+    # Maximum number of records listed, all of them if None.
+    limit: Optional[int] = None
+
+
+class StateBackend(ABC):
+    """Interface of the state backends."""
+
+    @abstractmethod
+    def get_balance(self, account: str) -> Dict[str, Decimal]:
+        """
+        :return: the balance of the account by currency
+        """
+
+    @abstractmethod
+    def place_order(
+        self,
+        account: str,
+        client_order_id: str,
+        changes: Optional[Dict[str, Decimal]],
+        build_order: OrderBuilder,
+    ) -> Optional[OrderResponse]:
+        """
+        Atomically fills and stores an order.
+        :param account: token of the client
+        :param client_order_id: identifier given by the client
+        :param changes: balance changes of the fill by currency, None if the order
+        must be rejected anyway. The order is rejected if a currency would go
+        negative.
+        :param build_order: called with whether the order was filled. The order
+        is not placed, and the state is left unchanged, if it raises.
+        :return: the order, None if the `client_order_id` was already used
+        """
+
+    @abstractmethod
+    def get_order(self, account: str, order_id: str) -> Optional[OrderResponse]:
+        """
+        :param order_id: `order_id` or `client_order_id`
+        """
+
+    @abstractmethod
+    def get_trade(self, account: str, trade_id: str) -> Optional[Trade]:
+        """
+        :return: the trade, None if it is unknown or was evicted
+        """
+
+    @abstractmethod
+    def list_orders(
+        self, account: str, query: HistoryQuery = None
+    ) -> List[OrderResponse]:
+        """
+        :param query: filters and page, all the orders if None
+        :return: the orders, newest first
+        """
+
+    @abstractmethod
+    def list_trades(self, account: str, query: HistoryQuery = None) -> List[Trade]:
+        """
+        :param query: filters and page, all the trades if None
+        :return: the trades, newest first
+        """
+
+    @abstractmethod
+    def add_quote(self, account: str, rfq: RFQResponse):
+        """
+        :param account: token of the client the quote was issued to
+        """
+
+    @abstractmethod
+    def get_quote(self, rfq_id: str) -> Optional[Tuple[str, RFQResponse]]:
+        """
+        :return: (account, quote) of an unexpired quote, None if there is none
+        """
+
+    @abstractmethod
+    def consume_quote(self, rfq_id: str):
+        """
+        Removes the quote used by a filled order. Called from the `build_order` of
+        `place_order`, so that the quote is used in the same atomic step.
+        :raise QuoteIsNotValid: if another order used it since it was checked
+        """
+
+    def check_quote(self, account: str, order_request: OrderRequest) -> RFQResponse:
+        """
+        Checks an order against the quote it refers to. The quote is kept until
+        the order is filled (see `consume_quote`).
+        :param account: token of the client sending the order
+        :param order_request: order with an `rfq_id`
+        :return: the quote
+        """
+        return check_quote(account, order_request, self.get_quote(order_request.rfq_id))
+
+
+def can_apply(balance: Dict[str, Decimal], changes) -> bool:
+    """
+    :param balance: current balance
+    :param changes: balance changes by currency, None for a rejection
+    :return: whether no currency would go negative
+    """
+    if changes is None:
+        return False
+    zero = Decimal(0)
+    return all(
+        balance.get(currency, zero) + change >= 0
+        for currency, change in changes.items()
+    )
+
+
+Record = Union[OrderResponse, Trade]
+
+
+class _History:
+    """
+    Records of an account by identifier, indexed by creation time overall and by
+    instrument. The oldest records are evicted beyond `retention`.
+
+    Evicted entries are skipped from the start of the indexes, and only removed
+    from the lists once they outnumber the live ones, so evicting costs O(1)
+    amortized instead of shifting the lists on every record.
+    """
+
+    def __init__(self, retention: int):
+        self.retention = retention
+        self.records = {}  # type: Dict[str, Record]
+        # Entries (created, sequence, identifier) sorted by creation time. The
+        # sequence keeps the insertion order of the records created together.
+        self._index = []  # type: List[tuple]
+        self._by_instrument = defaultdict(list)  # type: Dict[str, List[tuple]]
+        # Number of evicted entries at the start of `_index`. They are also the
+        # oldest entries of the instrument indexes.
+        self._evicted = 0
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self._index) - self._evicted
+
+    def get(self, key: str) -> Optional[Record]:
+        return self.records.get(key)
+
+    def add(self, key: str, record: Record) -> List[Record]:
+        """
+        :return: the records evicted to make room
+        """
+        entry = (record.created, next(self._sequence), key)
+        if self._evicted and entry < self._index[self._evicted]:
+            # Older than the live records: the evicted entries must go first.
+            self._compact()
+        insort(self._index, entry)
+        insort(self._by_instrument[record.instrument], entry)
+        self.records[key] = record
+
+        evicted = []
+        while self.retention and len(self) > self.retention:
+            oldest_key = self._index[self._evicted][2]
+            self._evicted += 1
+            evicted.append(self.records.pop(oldest_key))
+        if self._evicted > len(self):
+            self._compact()
+        return evicted
+
+    def _compact(self):
+        """Removes the evicted entries from the indexes."""
+        if self._evicted == len(self._index):
+            self._index.clear()
+            self._by_instrument.clear()
+        else:
+            oldest = self._index[self._evicted]
+            del self._index[: self._evicted]
+            for instrument, index in list(self._by_instrument.items()):
+                del index[: bisect_left(index, oldest)]
+                if not index:
+                    del self._by_instrument[instrument]
+        self._evicted = 0
+
+    def select(self, query: HistoryQuery = None) -> List[Record]:
+        """
+        :return: the records matching the query, newest first
+        """
+        query = query or HistoryQuery()
+        if not len(self):
+            return []
+        oldest = self._index[self._evicted]
+        if query.instrument:
+            index = self._by_instrument.get(query.instrument, [])
+        else:
+            index = self._index
+        # The entries older than the oldest record kept were evicted.
+        low = bisect_left(index, oldest)
+        if query.created__gte:
+            # A 1-tuple sorts before the entries created at the same time.
+            low = max(low, bisect_left(index, (query.created__gte,)))
+        high = (
+            bisect_left(index, (query.created__lt,))
+            if query.created__lt
+            else len(index)
+        )
+        stop = max(low, high - query.offset)
+        start = low if query.limit is None else max(low, stop - query.limit)
+        return [self.records[key] for _, _, key in reversed(index[start:stop])]
+
+
+class _Account:
+    def __init__(self, retention: int):
+        self.lock = threading.Lock()
+        self.balance = dict(BALANCE)  # type: Dict[str, Decimal]
+        self.orders = _History(retention)
+        self.orders_by_client_order_id = {}  # type: Dict[str, OrderResponse]
+        # client_order_ids of the evicted orders, still refused for a while.
+        self.evicted_client_order_ids = OrderedDict()  # type: Dict[str, None]
+        self.evicted_ids_kept = retention * EVICTED_IDS_FACTOR
+        self.trades = _History(retention)
+
+    def is_used(self, client_order_id: str) -> bool:
+        return (
+            client_order_id in self.orders_by_client_order_id
+            or client_order_id in self.evicted_client_order_ids
+        )
+
+    def forget(self, order: OrderResponse):
+        """Removes an evicted order, keeping its client_order_id for a while."""
+        del self.orders_by_client_order_id[order.client_order_id]
+        self.evicted_client_order_ids[order.client_order_id] = None
+        while len(self.evicted_client_order_ids) > self.evicted_ids_kept:
+            self.evicted_client_order_ids.popitem(last=False)
+
+
+class MemoryBackend(StateBackend):
+    """State kept in the process, with a lock per account."""
+
+    def __init__(
+        self, retention: int = 0, clock: Callable[[], datetime.datetime] = None
+    ):
+        """
+        :param retention: orders and trades kept by account, all of them if 0
+        :param clock: returns the current naive UTC time of the server
+        """
+        self.retention = retention
+        self._accounts = {}  # type: Dict[str, _Account]
+        self._lock = threading.Lock()
+        self.quotes = RFQRegistry(clock)
+
+    def _get_account(self, account: str) -> _Account:
+        state = self._accounts.get(account)
+        if state is None:
+            with self._lock:
+                state = self._accounts.setdefault(account, _Account(self.retention))
+        return state
+
+    def get_balance(self, account: str) -> Dict[str, Decimal]:
+        state = self._get_account(account)
+        with state.lock:
+            return dict(state.balance)
+
+    def place_order(self, account, client_order_id, changes, build_order):
+        state = self._get_account(account)
+        with state.lock:
+            if state.is_used(client_order_id):
+                return None
+            filled = can_apply(state.balance, changes)
+            order = build_order(filled)
+            if filled:
+                zero = Decimal(0)
+                for currency, change in changes.items():
+                    state.balance[currency] = state.balance.get(currency, zero) + change
+            state.orders_by_client_order_id[order.client_order_id] = order
+            for evicted in state.orders.add(order.order_id, order):
+                state.forget(evicted)
+            for trade in order.trades:
+                state.trades.add(trade.trade_id, trade)
+            return order
+
+    def get_order(self, account, order_id):
+        state = self._get_account(account)
+        with state.lock:
+            order = state.orders.get(order_id)
+            if order is None:
+                order = state.orders_by_client_order_id.get(order_id)
+            return order
+
+    def get_trade(self, account, trade_id):
+        state = self._get_account(account)
+        with state.lock:
+            return state.trades.get(trade_id)
+
+    def list_orders(self, account, query=None):
+        state = self._get_account(account)
+        with state.lock:
+            return state.orders.select(query)
+
+    def list_trades(self, account, query=None):
+        state = self._get_account(account)
+        with state.lock:
+            return state.trades.select(query)
+
+    def add_quote(self, account, rfq):
+        self.quotes.add(account, rfq)
+
+    def get_quote(self, rfq_id):
+        return self.quotes.get(rfq_id)
+
+    def consume_quote(self, rfq_id):
+        # The account lock is held: the order is placed once the quote is used.
+        self.quotes.consume(rfq_id)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS balances (
+    account TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (account, currency)
+);
+CREATE TABLE IF NOT EXISTS orders (
+    account TEXT NOT NULL,
+    order_id TEXT NOT NULL,
+    client_order_id TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    created TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (account, order_id),
+    UNIQUE (account, client_order_id)
+);
+CREATE INDEX IF NOT EXISTS orders_created ON orders (account, created);
+CREATE INDEX IF NOT EXISTS orders_instrument_created
+    ON orders (account, instrument, created);
+CREATE TABLE IF NOT EXISTS trades (
+    account TEXT NOT NULL,
+    trade_id TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    created TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (account, trade_id)
+);
+CREATE TABLE IF NOT EXISTS evicted_client_order_ids (
+    account TEXT NOT NULL,
+    client_order_id TEXT NOT NULL,
+    PRIMARY KEY (account, client_order_id)
+);
+CREATE INDEX IF NOT EXISTS trades_created ON trades (account, created);
+CREATE INDEX IF NOT EXISTS trades_instrument_created
+    ON trades (account, instrument, created);
+CREATE TABLE IF NOT EXISTS rfqs (
+    rfq_id TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    valid_until TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rfqs_valid_until ON rfqs (valid_until);
+"""
+
+
+def format_created(created: datetime.datetime) -> str:
+    """Formats a creation time so that the text sorts like the datetimes."""
+    return created.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+class SQLiteBackend(StateBackend):
+    """
+    State kept in a SQLite database, shared by the processes using the same file.
+    Each thread has its own connection.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        retention: int = 0,
+        clock: Callable[[], datetime.datetime] = None,
+    ):
+        """
+        :param path: database file
+        :param retention: orders and trades kept by account, all of them if 0
+        :param clock: returns the current naive UTC time of the server
+        """
+        self.path = path
+        self.retention = retention
+        self.clock = clock or datetime.datetime.utcnow
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Transactions are started explicitly.
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _read_balance(self, connection, account: str) -> Dict[str, Decimal]:
+        rows = connection.execute(
+            "SELECT currency, amount FROM balances WHERE account = ?", (account,)
+        ).fetchall()
+        if not rows:
+            connection.executemany(
+                "INSERT OR IGNORE INTO balances VALUES (?, ?, ?)",
+                [
+                    (account, currency, str(amount))
+                    for currency, amount in BALANCE.items()
+                ],
+            )
+            return dict(BALANCE)
+        return {currency: Decimal(amount) for currency, amount in rows}
+
+    def get_balance(self, account):
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            balance = self._read_balance(connection, account)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return balance
+
+    def place_order(self, account, client_order_id, changes, build_order):
+        connection = self._connect()
+        # Takes the write lock of the database until the order is stored.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            exists = connection.execute(
+                "SELECT 1 FROM orders WHERE account = ? AND client_order_id = ? "
+                "UNION ALL SELECT 1 FROM evicted_client_order_ids "
+                "WHERE account = ? AND client_order_id = ?",
+                (account, client_order_id, account, client_order_id),
+            ).fetchone()
+            if exists:
+                connection.execute("ROLLBACK")
+                return None
+            balance = self._read_balance(connection, account)
+            filled = can_apply(balance, changes)
+            if filled:
+                zero = Decimal(0)
+                connection.executemany(
+                    "INSERT OR REPLACE INTO balances VALUES (?, ?, ?)",
+                    [
+                        (account, currency, str(balance.get(currency, zero) + change))
+                        for currency, change in changes.items()
+                    ],
+                )
+            order = build_order(filled)
+            self._insert_order(connection, account, order)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return order
+
+    def _insert_order(self, connection, account: str, order: OrderResponse):
+        connection.execute(
+            "INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                account,
+                order.order_id,
+                order.client_order_id,
+                order.instrument,
+                format_created(order.created),
+                order.json(),
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO trades VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    account,
+                    trade.trade_id,
+                    trade.instrument,
+                    format_created(trade.created),
+                    trade.json(),
+                )
+                for trade in order.trades
+            ],
+        )
+        if self.retention:
+            for table in ("orders", "trades"):
+                self._evict(connection, table, account)
+
+    def _evict(self, connection, table: str, account: str):
+        """Deletes the records of the account beyond the most recent `retention`."""
+        evicted = (
+            f"SELECT rowid FROM {table} WHERE account = ? "
+            "ORDER BY created DESC, rowid DESC LIMIT -1 OFFSET ?"
+        )
+        params = (account, self.retention)
+        if table == "orders":
+            # Their client_order_ids are still refused for a while.
+            connection.execute(
+                "INSERT OR IGNORE INTO evicted_client_order_ids "
+                f"SELECT account, client_order_id FROM orders WHERE rowid IN ({evicted})",
+                params,
+            )
+            connection.execute(
+                "DELETE FROM evicted_client_order_ids WHERE rowid IN ("
+                "SELECT rowid FROM evicted_client_order_ids WHERE account = ? "
+                "ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                (account, self.retention * EVICTED_IDS_FACTOR),
+            )
+        connection.execute(f"DELETE FROM {table} WHERE rowid IN ({evicted})", params)
+
+    def _select(self, table: str, account: str, query: HistoryQuery = None):
+        """
+        :return: the payloads of the records matching the query, newest first
+        """
+        query = query or HistoryQuery()
+        conditions = ["account = ?"]
+        params = [account]
+        if query.instrument:
+            conditions.append("instrument = ?")
+            params.append(query.instrument)
+        if query.created__gte:
+            conditions.append("created >= ?")
+            params.append(format_created(query.created__gte))
+        if query.created__lt:
+            conditions.append("created < ?")
+            params.append(format_created(query.created__lt))
+        limit = -1 if query.limit is None else query.limit
+        rows = self._connect().execute(
+            f"SELECT payload FROM {table} WHERE {' AND '.join(conditions)} "
+            "ORDER BY created DESC, rowid DESC LIMIT ? OFFSET ?",
+            (*params, limit, query.offset),
+        )
+        return [json.loads(payload) for (payload,) in rows]
+
+    def get_order(self, account, order_id):
+        row = (
+            self._connect()
+            .execute(
+                "SELECT payload FROM orders WHERE account = ? "
+                "AND (order_id = ? OR client_order_id = ?)",
+                (account, order_id, order_id),
+            )
+            .fetchone()
+        )
+        return OrderResponse(**json.loads(row[0])) if row else None
+
+    def get_trade(self, account, trade_id):
+        row = (
+            self._connect()
+            .execute(
+                "SELECT payload FROM trades WHERE account = ? AND trade_id = ?",
+                (account, trade_id),
+            )
+            .fetchone()
+        )
+        return Trade(**json.loads(row[0])) if row else None
+
+    def list_orders(self, account, query=None):
+        return [
+            OrderResponse(**payload)
+            for payload in self._select("orders", account, query)
+        ]
+
+    def list_trades(self, account, query=None):
+        return [Trade(**payload) for payload in self._select("trades", account, query)]
+
+    def add_quote(self, account, rfq):
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "DELETE FROM rfqs WHERE valid_until <= ?",
+                (format_created(self.clock()),),
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO rfqs VALUES (?, ?, ?, ?)",
+                (rfq.rfq_id, account, format_created(rfq.valid_until), rfq.json()),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def get_quote(self, rfq_id):
+        row = (
+            self._connect()
+            .execute(
+                "SELECT account, payload FROM rfqs "
+                "WHERE rfq_id = ? AND valid_until > ?",
+                (rfq_id, format_created(self.clock())),
+            )
+            .fetchone()
+        )
+        return (row[0], RFQResponse(**json.loads(row[1]))) if row else None
+
+    def consume_quote(self, rfq_id):
+        # Within the transaction of `place_order`: only one order can delete the
+        # quote, and it is restored if the order is not placed.
+        cursor = self._connect().execute("DELETE FROM rfqs WHERE rfq_id = ?", (rfq_id,))
+        if not cursor.rowcount:
+            raise QuoteIsNotValid()
+
+
+def create_backend(
+    name: str = "memory", path: str = None, retention: int = 0
+) -> StateBackend:
+    """
+    :param name: "memory" or "sqlite"
+    :param path: database file of the SQLite backend
+    :param retention: orders and trades kept by account, all of them if 0
+    """
+    if name == "memory":
+        return MemoryBackend(retention)
+    if name == "sqlite":
+        return SQLiteBackend(path, retention)
+    raise ValueError(f"Unknown state backend: {name}")
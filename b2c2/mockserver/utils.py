@@ -1,21 +1,47 @@
 # -*- coding: utf-8 -*-
-import random
+import datetime
 from decimal import Decimal
 
 from fastapi import HTTPException
 
-from b2c2.mockserver.defaults import INSTRUMENT_PRICES
+from b2c2.common.instruments import InstrumentRegistry
+from b2c2.common.models import Instrument
+from b2c2.mockserver.defaults import INSTRUMENT_PRICES, INSTRUMENT_VOLATILITY
+from b2c2.mockserver.market import MarketSimulator
+from b2c2.mockserver.settings import (
+    MARKET_DRIFT,
+    MARKET_SEED,
+    MARKET_STEP,
+    MARKET_VOLATILITY,
+)
+
+# Instruments served by the mock server, parsed once.
+instruments = InstrumentRegistry(INSTRUMENT_PRICES)
+
+# Prices of the instruments, started with the server.
+market = MarketSimulator(
+    INSTRUMENT_PRICES,
+    seed=MARKET_SEED,
+    volatility=MARKET_VOLATILITY or INSTRUMENT_VOLATILITY,
+    drift=MARKET_DRIFT,
+    step=MARKET_STEP,
+)
+
+
+def get_instrument(instrument) -> Instrument:
+    """Returns the registered instrument with the given name"""
+    registered = instruments.find(instrument)
+    if registered is None:
+        raise HTTPException(status_code=400, detail="No such instrument found")
+    return registered
 
 
 def get_instrument_type(instrument):
-    pair, instrument_type = instrument.split(".")
-    return instrument_type
+    return get_instrument(instrument).type
 
 
 def get_pair(instrument):
-    pair, instrument_type = instrument.split(".")
-    base, quote = pair[:3], pair[3:]
-    return base, quote
+    return get_instrument(instrument).pair()
 
 
 def get_base(instrument):
@@ -38,17 +64,16 @@ def get_base_balance(balance, instrument):
     return balance.get(base)
 
 
-def get_price(instrument, fluctuation=(-1, 1)) -> Decimal:
-    """Returns the price of the given instrument"""
-    price = INSTRUMENT_PRICES.get(instrument)
-    if not price:
+def get_price(instrument) -> Decimal:
+    """Returns the current simulated price of the given instrument"""
+    try:
+        return market.get_price(instrument)
+    except KeyError:
         raise HTTPException(status_code=400, detail="No such instrument found")
 
-    if fluctuation:
-        # Add some fluctuation to the average price
-        fluctuation_lower, fluctuation_higher = fluctuation
-        fluctuation_percent = (
-            random.randrange(fluctuation_lower * 100, fluctuation_higher * 100) / 10000
-        )
-        price *= Decimal(1 + fluctuation_percent)
-    return price
+
+def to_naive_utc(value: datetime.datetime) -> datetime.datetime:
+    """Converts a datetime to the naive UTC datetimes the mock server stores."""
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Compares building history models with validation (default) and without it
+(trusted mode).
+
+    $ python -m benchmarks.history_parsing --trades 50000
+"""
+import argparse
+import datetime
+import time
+import uuid
+
+from b2c2.common.construct import construct_model
+from b2c2.common.models import OrderResponse, Trade
+
+
+def get_trade_payloads(count):
+    created = datetime.datetime(2021, 11, 9, 12, 41, 43, 20149)
+    return [
+        {
+            "instrument": "BTCUSD.SPOT",
+            "trade_id": str(uuid.uuid4()),
+            "origin": "rest",
+            "rfq_id": None,
+            "created": (created + datetime.timedelta(seconds=index)).isoformat(),
+            "price": "57549.00000000",
+            "quantity": "1.0000000000",
+            "order": str(uuid.uuid4()),
+            "side": "buy" if index % 2 else "sell",
+            "executing_unit": "tag",
+        }
+        for index in range(count)
+    ]
+
+
+def get_order_payloads(trades):
+    return [
+        {
+            "order_id": trade["order"],
+            "client_order_id": str(uuid.uuid4()),
+            "quantity": trade["quantity"],
+            "side": trade["side"],
+            "instrument": trade["instrument"],
+            "price": trade["price"],
+            "executed_price": trade["price"],
+            "executing_unit": trade["executing_unit"],
+            "trades": [trade],
+            "created": trade["created"],
+        }
+        for trade in trades
+    ]
+
+
+def measure(build, model_class, payloads, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for payload in payloads:
+            build(model_class, payload)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def validate(model_class, payload):
+    return model_class(**payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trades", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    trades = get_trade_payloads(args.trades)
+    orders = get_order_payloads(trades)
+    print(f"{'payload':10s} {'validated':>12s} {'trusted':>12s} {'speedup':>8s}")
+    for name, model_class, payloads in (
+        ("trades", Trade, trades),
+        ("orders", OrderResponse, orders),
+    ):
+        validated = measure(validate, model_class, payloads, args.repeat)
+        trusted = measure(construct_model, model_class, payloads, args.repeat)
+        print(
+            f"{name:10s} {validated:>11.3f}s {trusted:>11.3f}s "
+            f"{validated / trusted:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import json
+from decimal import Decimal
+from http import HTTPStatus
+
+import httpx
+import pytest
+
+from b2c2.api_client import errors
+from b2c2.api_client.async_api import AsyncB2C2Client
+from b2c2.api_client.exceptions import ConnectionLost
+from b2c2.common.models import FillOrKillOrderRequest, Instrument
+
+
+def get_async_client(handler, **kwargs):
+    """Returns an AsyncB2C2Client whose requests are answered by the handler."""
+    session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncB2C2Client(token="token", session=session, **kwargs)
+
+
+def run(client, coroutine):
+    async def wrapper():
+        async with client:
+            return await coroutine
+
+    return asyncio.run(wrapper())
+
+
+def test_get_balance(balance: dict):
+    """Given a balance response, test whether client can retrieve properly"""
+    client = get_async_client(lambda request: httpx.Response(200, json=balance))
+    balance_response = run(client, client.get_balance())
+    assert balance_response["USD"] == balance["USD"]
+
+
+def test_get_instruments(instruments: dict):
+    """Given an /instrument/ response, test whether client can retrieve properly"""
+    client = get_async_client(lambda request: httpx.Response(200, json=instruments))
+    instruments_response = run(client, client.list_instruments())
+    assert Instrument(name="BTCUSD.SPOT") in instruments_response
+
+
+def test_request_for_quote(request_for_quote: dict):
+    """Given an POST /request_for_quote/ response, test whether client can process properly"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(HTTPStatus.CREATED, json=request_for_quote)
+
+    client = get_async_client(handler)
+    rfq_response = run(
+        client,
+        client.get_rfq(
+            instrument=request_for_quote["instrument"],
+            side=request_for_quote["side"],
+            quantity=Decimal(request_for_quote["quantity"]),
+        ),
+    )
+    assert requests[0].url.path == "/request_for_quote/"
+    assert requests[0].headers["Authorization"] == "Token token"
+    assert rfq_response.instrument == request_for_quote["instrument"]
+    assert rfq_response.quantity == Decimal(request_for_quote["quantity"])
+
+
+def test_order(order: dict):
+    """Given an POST /order/ response, test whether client can process properly"""
+    client = get_async_client(
+        lambda request: httpx.Response(HTTPStatus.CREATED, json=order)
+    )
+    fok_order_request = FillOrKillOrderRequest(
+        instrument="BTCUSD.SPOT",
+        side="buy",
+        quantity=Decimal("1.0"),
+        valid_until=datetime.datetime.now() + datetime.timedelta(seconds=10),
+        executing_unit="tag",
+        force_open=False,
+        price=Decimal("57635.3"),
+        acceptable_slippage_in_basis_points=Decimal("2"),
+    )
+    order_response = run(client, client.create_fok_order(fok_order_request))
+    assert order_response.side == fok_order_request.side
+    assert order_response.price == fok_order_request.price
+
+
+def test_order_and_trade_history(order_history: dict, trade_history: dict):
+    """Given GET /order/ and /trade/ responses, test whether client can retrieve properly"""
+    routes = {"/order/": order_history, "/trade/": trade_history}
+    client = get_async_client(
+        lambda request: httpx.Response(200, json=routes[request.url.path])
+    )
+
+    async def get_histories():
+        return await asyncio.gather(
+            client.get_order_history(), client.get_trade_history()
+        )
+
+    orders, trades = run(client, get_histories())
+    assert orders[0].order_id == order_history[0]["order_id"]
+    assert trades[0].trade_id == trade_history[0]["trade_id"]
+
+
+def test_api_error():
+    """Given an API error response, test whether the same APIError is raised"""
+    response = dict(errors=[{"code": 1001, "message": "Instrument not allowed"}])
+    client = get_async_client(lambda request: httpx.Response(400, json=response))
+    with pytest.raises(errors.InstrumentNotAllowed):
+        run(client, client.get_rfq("NONEXISTENT", "buy", "1.0"))
+
+
+def test_order_connection_lost():
+    """Given a connection failure, test whether ConnectionLost is raised on orders"""
+
+    def handler(request):
+        raise httpx.ConnectError("Connection refused", request=request)
+
+    client = get_async_client(handler)
+    with pytest.raises(ConnectionLost):
+        run(client, client.create_order({"instrument": "BTCUSD.SPOT"}))
+
+
+def test_request_for_quotes(request_for_quote: dict):
+    """Given several RFQs, test whether results are returned in input order"""
+
+    def handler(request):
+        data = json.loads(request.content)
+        if data["instrument"] == "NONEXISTENT":
+            response = dict(errors=[{"code": 1001, "message": "Not allowed"}])
+            return httpx.Response(400, json=response)
+        return httpx.Response(
+            HTTPStatus.CREATED,
+            json={
+                **request_for_quote,
+                "instrument": data["instrument"],
+                "client_rfq_id": data["client_rfq_id"],
+            },
+        )
+
+    client = get_async_client(handler)
+    rfq_requests = [
+        ("BTCUSD.SPOT", "buy", Decimal("1")),
+        ("NONEXISTENT", "buy", Decimal("1")),
+        ("ETHUSD.SPOT", "sell", Decimal("2")),
+    ]
+    batch = run(client, client.get_rfqs(rfq_requests, max_concurrency=2))
+
+    assert [result.ok for result in batch] == [True, False, True]
+    assert batch[0].response.client_rfq_id == batch[0].client_rfq_id
+    assert isinstance(batch[1].error, errors.InstrumentNotAllowed)
+    assert batch[2].response.instrument == "ETHUSD.SPOT"
+
+
+def test_trade_details(trade_details: dict):
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        return httpx.Response(HTTPStatus.OK, json=trade_details)
+
+    client = get_async_client(handler)
+    trade = run(client, client.get_trade_detail(trade_details["trade_id"]))
+    assert trade.trade_id == trade_details["trade_id"]
+    assert paths == [f"/trade/{trade_details['trade_id']}/"]
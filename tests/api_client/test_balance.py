@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import copy
+from decimal import Decimal
+
+import pytest
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.balance import BalanceTracker
+from b2c2.common.models import Balance, OrderResponse, Trade, UnknownInstrument
+
+
+def get_tracker(mocker: MockerFixture, balance: dict, now: list):
+    client = B2C2Client(token="token")
+    get_balance = mocker.patch.object(
+        client, "get_balance", side_effect=lambda: Balance(**balance)
+    )
+    tracker = BalanceTracker(client, resync_interval=60, clock=lambda: now[0])
+    return tracker, get_balance
+
+
+def test_order_fills_are_applied_locally(
+    mocker: MockerFixture, balance: dict, order: dict
+):
+    now = [0.0]
+    tracker, get_balance = get_tracker(mocker, balance, now)
+    assert tracker.get("USD") == Decimal("400000")
+
+    order_response = OrderResponse(**order)
+    tracker.apply_order(order_response)
+    # Applied once, even when its trade is seen again.
+    tracker.apply_order(order_response)
+    tracker.apply_trade(order_response.trades[0])
+    assert tracker.get("USD") == Decimal("400000") - Decimal("57549.0")
+    assert tracker.get("BTC") == Decimal("1.0")
+    assert get_balance.call_count == 1
+
+    assert tracker.can_afford("BTCUSD.SPOT", "sell", "1", "60000")
+    assert not tracker.can_afford("BTCUSD.SPOT", "sell", "1.5", "60000")
+    assert tracker.can_afford("BTCUSD.SPOT", "buy", "5", "60000")
+    assert not tracker.can_afford("BTCUSD.SPOT", "buy", "6", "60000")
+    assert get_balance.call_count == 1
+
+
+def test_rejected_orders_are_ignored(mocker: MockerFixture, balance: dict, order: dict):
+    tracker, _ = get_tracker(mocker, balance, [0.0])
+    rejected = dict(order, executed_price=None, trades=[])
+    tracker.apply_order(OrderResponse(**rejected))
+    assert tracker.get_balance() == Balance(
+        {currency: Decimal(value) for currency, value in balance.items()}
+    )
+
+
+def test_resync_on_interval_and_drift(
+    mocker: MockerFixture, balance: dict, order: dict
+):
+    now = [0.0]
+    tracker, get_balance = get_tracker(mocker, balance, now)
+    tracker.get_balance()
+    tracker.apply_order(OrderResponse(**order))
+
+    now[0] = 60.0
+    # The server did not see the order: the difference is reported as drift.
+    assert tracker.get("BTC") == Decimal(0)
+    assert get_balance.call_count == 2
+    assert tracker.drift == {"BTC": Decimal("-1.0"), "USD": Decimal("57549.0")}
+
+    # A fill which can not be applied forces a sync.
+    trade = copy.deepcopy(order["trades"][0])
+    trade.update(trade_id="cfd-trade", instrument="BTCUSD.CFD")
+    tracker.apply_trade(Trade(**trade))
+    assert tracker.needs_sync
+    tracker.get_balance()
+    assert get_balance.call_count == 3
+
+    tracker.mark_stale()
+    tracker.get_balance()
+    assert get_balance.call_count == 4
+
+
+def test_tracker_without_client(balance: dict, order: dict):
+    tracker = BalanceTracker()
+    tracker.update(balance)
+    tracker.apply_order(OrderResponse(**order))
+    assert tracker.get("BTC") == Decimal("1.0")
+    assert not tracker.needs_sync
+
+
+def test_can_afford_unknown_instrument(balance: dict):
+    """Given an instrument name which can not be parsed, test whether a specific
+    error is raised"""
+    tracker = BalanceTracker()
+    tracker.update(balance)
+    assert tracker.can_afford("BTCUSD.SPOT", "buy", "1", "50000")
+    with pytest.raises(UnknownInstrument):
+        tracker.can_afford("BTCUSDX.SPOT", "buy", "1", "50000")
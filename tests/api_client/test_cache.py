@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import json
+from decimal import Decimal
+from http import HTTPStatus
+from unittest import TestCase
+
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.cache import QuoteCache
+from b2c2.common.models import RFQResponse
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQuoteCache(TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.cache = QuoteCache(maxsize=2, safety_margin=5, clock=self.clock)
+        # Valid for 60 seconds.
+        self.rfq = RFQResponse(
+            **{
+                **RFQResponse.sample_value(),
+                "created": "2021-11-09T12:41:15",
+                "valid_until": "2021-11-09T12:42:15",
+            }
+        )
+
+    def test_hit_and_miss(self):
+        self.assertIsNone(self.cache.get("BTCUSD.SPOT", "buy", 1))
+        self.cache.put("BTCUSD.SPOT", "buy", 1, self.rfq)
+        self.assertIs(self.cache.get("BTCUSD.SPOT", "buy", Decimal("1.0")), self.rfq)
+        self.assertIsNone(self.cache.get("BTCUSD.SPOT", "sell", 1))
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 2)
+        self.assertEqual(self.cache.hit_ratio, 1 / 3)
+
+    def test_expiry_with_safety_margin(self):
+        self.cache.put("BTCUSD.SPOT", "buy", 1, self.rfq)
+        self.clock.now = 54.9
+        self.assertIsNotNone(self.cache.get("BTCUSD.SPOT", "buy", 1))
+        self.clock.now = 55
+        self.assertIsNone(self.cache.get("BTCUSD.SPOT", "buy", 1))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru_eviction(self):
+        self.cache.put("BTCUSD.SPOT", "buy", 1, self.rfq)
+        self.cache.put("BTCUSD.SPOT", "buy", 2, self.rfq)
+        self.cache.get("BTCUSD.SPOT", "buy", 1)
+        self.cache.put("BTCUSD.SPOT", "buy", 3, self.rfq)
+        self.assertIsNotNone(self.cache.get("BTCUSD.SPOT", "buy", 1))
+        self.assertIsNone(self.cache.get("BTCUSD.SPOT", "buy", 2))
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_quantity_buckets(self):
+        cache = QuoteCache(quantity_step="0.1", clock=self.clock)
+        cache.put("BTCUSD.SPOT", "buy", "0.15", self.rfq)
+        self.assertIs(cache.get("BTCUSD.SPOT", "buy", "0.12"), self.rfq)
+        self.assertIsNone(cache.get("BTCUSD.SPOT", "buy", "0.2001"))
+
+
+def test_get_rfq_cached(mocker: MockerFixture, request_for_quote: dict):
+    """Given a client with a RFQ cache, test whether unexpired quotes are reused"""
+    client = B2C2Client(token="token", rfq_cache=True)
+    fake_resp = mocker.Mock()
+    fake_resp.content = json.dumps(request_for_quote).encode()
+    fake_resp.status_code = HTTPStatus.CREATED
+    session_post = mocker.patch("requests.Session.post", return_value=fake_resp)
+
+    first = client.get_rfq("BTCUSD.SPOT", "buy", "1.0")
+    assert client.get_rfq("BTCUSD.SPOT", "buy", 1) is first
+    assert session_post.call_count == 1
+    client.get_rfq("BTCUSD.SPOT", "buy", 1, use_cache=False)
+    assert session_post.call_count == 2
+    assert client.rfq_cache.stats()["hits"] == 1
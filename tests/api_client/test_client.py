@@ -1,20 +1,23 @@
 # -*- coding: utf-8 -*-
 import datetime
+import json
 from decimal import Decimal
 from http import HTTPStatus
 
+import pytest
 from pytest_mock import MockerFixture
 
 from b2c2.api_client.api import B2C2Client
-from b2c2.common.models import FillOrKillOrderRequest, Instrument
+from b2c2.api_client.errors import InstrumentNotAllowed
+from b2c2.common.models import FillOrKillOrderRequest, Instrument, Trade
 
 
 def test_get_balance(mocker: MockerFixture, client: B2C2Client, balance: dict):
     """Given a balance response, test whether client can retrieve properly"""
     fake_resp = mocker.Mock()
-    fake_resp.json = mocker.Mock(return_value=balance)
+    fake_resp.content = json.dumps(balance).encode()
     fake_resp.status_code = HTTPStatus.OK
-    mocker.patch("requests.get", return_value=fake_resp)
+    mocker.patch("requests.Session.get", return_value=fake_resp)
 
     balance_response = client.get_balance()
     assert balance_response["USD"] == balance["USD"]
@@ -23,9 +26,9 @@ def test_get_balance(mocker: MockerFixture, client: B2C2Client, balance: dict):
 def test_get_instruments(mocker: MockerFixture, client: B2C2Client, instruments: dict):
     """Given an /instrument/ response, test whether client can retrieve properly"""
     fake_resp = mocker.Mock()
-    fake_resp.json = mocker.Mock(return_value=instruments)
+    fake_resp.content = json.dumps(instruments).encode()
     fake_resp.status_code = HTTPStatus.OK
-    mocker.patch("requests.get", return_value=fake_resp)
+    mocker.patch("requests.Session.get", return_value=fake_resp)
 
     instruments_response = client.list_instruments()
     assert Instrument(name="BTCUSD.SPOT") in instruments_response
@@ -34,9 +37,9 @@ def test_get_instruments(mocker: MockerFixture, client: B2C2Client, instruments:
 def test_order(mocker: MockerFixture, client: B2C2Client, order: dict):
     """Given an POST /order/ response, test whether client can process properly"""
     fake_resp = mocker.Mock()
-    fake_resp.json = mocker.Mock(return_value=order)
+    fake_resp.content = json.dumps(order).encode()
     fake_resp.status_code = HTTPStatus.CREATED
-    mocker.patch("requests.post", return_value=fake_resp)
+    mocker.patch("requests.Session.post", return_value=fake_resp)
 
     fok_order_request = FillOrKillOrderRequest(
         instrument="BTCUSD.SPOT",
@@ -57,9 +60,9 @@ def test_order(mocker: MockerFixture, client: B2C2Client, order: dict):
 def test_order_details(mocker: MockerFixture, client: B2C2Client, order_details: dict):
     """Given an GET /order/:orderID response, test whether client can retrieve properly"""
     fake_resp = mocker.Mock()
-    fake_resp.json = mocker.Mock(return_value=order_details)
+    fake_resp.content = json.dumps(order_details).encode()
     fake_resp.status_code = HTTPStatus.OK
-    mocker.patch("requests.get", return_value=fake_resp)
+    mocker.patch("requests.Session.get", return_value=fake_resp)
     order_response = client.get_order_detail(order_details["order_id"])
     assert order_response.instrument == order_details["instrument"]
     assert order_response.side == order_details["side"]
@@ -69,9 +72,9 @@ def test_order_details(mocker: MockerFixture, client: B2C2Client, order_details:
 def test_order_history(mocker: MockerFixture, client: B2C2Client, order_history: dict):
     """Given an GET /order/ response, test whether client can retrieve properly"""
     fake_resp = mocker.Mock()
-    fake_resp.json = mocker.Mock(return_value=order_history)
+    fake_resp.content = json.dumps(order_history).encode()
     fake_resp.status_code = HTTPStatus.OK
-    mocker.patch("requests.get", return_value=fake_resp)
+    mocker.patch("requests.Session.get", return_value=fake_resp)
     order_response_list = client.get_order_history()
     assert len(order_response_list) == 1
     order_response = order_response_list[0]
@@ -86,9 +89,9 @@ def test_request_for_quote(
 ):
     """Given an POST /request_for_quote/ response, test whether client can process properly"""
     fake_resp = mocker.Mock()
-    fake_resp.json = mocker.Mock(return_value=request_for_quote)
+    fake_resp.content = json.dumps(request_for_quote).encode()
     fake_resp.status_code = HTTPStatus.CREATED
-    mocker.patch("requests.post", return_value=fake_resp)
+    mocker.patch("requests.Session.post", return_value=fake_resp)
 
     rfq_response = client.get_rfq(
         instrument=request_for_quote["instrument"],
@@ -105,10 +108,11 @@ def test_request_for_quote(
 def test_trade_details(mocker: MockerFixture, client: B2C2Client, trade_details: dict):
     """Given an GET /trade/:tradeID response, test whether client can retrieve properly"""
     fake_resp = mocker.Mock()
-    fake_resp.json = mocker.Mock(return_value=trade_details)
+    fake_resp.content = json.dumps(trade_details).encode()
     fake_resp.status_code = HTTPStatus.OK
-    mocker.patch("requests.get", return_value=fake_resp)
+    session_get = mocker.patch("requests.Session.get", return_value=fake_resp)
     trade_response = client.get_trade_detail(trade_details["trade_id"])
+    assert session_get.call_args[0][0].endswith(f"/trade/{trade_details['trade_id']}/")
     assert trade_response.instrument == trade_details["instrument"]
     assert trade_response.side == trade_details["side"]
     assert trade_response.price == Decimal(trade_details["price"])
@@ -117,9 +121,9 @@ def test_trade_details(mocker: MockerFixture, client: B2C2Client, trade_details:
 def test_trade_history(mocker: MockerFixture, client: B2C2Client, trade_history: dict):
     """Given an GET /trade/ response, test whether client can retrieve properly"""
     fake_resp = mocker.Mock()
-    fake_resp.json = mocker.Mock(return_value=trade_history)
+    fake_resp.content = json.dumps(trade_history).encode()
     fake_resp.status_code = HTTPStatus.OK
-    mocker.patch("requests.get", return_value=fake_resp)
+    mocker.patch("requests.Session.get", return_value=fake_resp)
     trade_response_list = client.get_trade_history()
     assert len(trade_response_list) == 1
     trade_response = trade_response_list[0]
@@ -127,3 +131,95 @@ def test_trade_history(mocker: MockerFixture, client: B2C2Client, trade_history:
     assert trade_response.instrument == trade_details["instrument"]
     assert trade_response.side == trade_details["side"]
     assert trade_response.price == Decimal(trade_details["price"])
+
+
+def test_session_is_reused(mocker: MockerFixture, client: B2C2Client, balance: dict):
+    """Given several requests, test whether they all go through the same session"""
+    fake_resp = mocker.Mock()
+    fake_resp.content = json.dumps(balance).encode()
+    fake_resp.status_code = HTTPStatus.OK
+    session_get = mocker.patch.object(client.session, "get", return_value=fake_resp)
+
+    client.get_balance()
+    client.get_balance()
+    assert session_get.call_count == 2
+
+
+def test_session_pool_configuration():
+    """Given pool settings, test whether the session adapter is configured with them"""
+    client = B2C2Client(token="token", pool_connections=2, pool_maxsize=32)
+    adapter = client.session.get_adapter(client.api_url)
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 32
+
+
+def test_context_manager_closes_session(mocker: MockerFixture):
+    """Given a client used as a context manager, test whether the session is closed"""
+    with B2C2Client(token="token") as client:
+        session_close = mocker.patch.object(client.session, "close")
+    session_close.assert_called_once()
+
+
+def test_request_for_quotes(
+    mocker: MockerFixture, client: B2C2Client, request_for_quote: dict
+):
+    """Given several RFQs, test whether results are returned in input order"""
+
+    def post(url, data=None, headers=None, timeout=None):
+        data = json.loads(data)
+        if data["instrument"] == "NONEXISTENT":
+            raise InstrumentNotAllowed()
+        fake_resp = mocker.Mock()
+        fake_resp.content = json.dumps(
+            {
+                **request_for_quote,
+                "instrument": data["instrument"],
+                "client_rfq_id": data["client_rfq_id"],
+            }
+        ).encode()
+        fake_resp.status_code = HTTPStatus.CREATED
+        return fake_resp
+
+    mocker.patch("requests.Session.post", side_effect=post)
+    rfq_requests = [
+        ("BTCUSD.SPOT", "buy", Decimal("1")),
+        ("NONEXISTENT", "buy", Decimal("1")),
+        (Instrument(name="ETHUSD.SPOT"), "sell", Decimal("2")),
+    ]
+    batch = client.get_rfqs(rfq_requests, max_concurrency=2)
+
+    assert len(batch) == 3
+    assert batch[0].response.instrument == "BTCUSD.SPOT"
+    assert batch[0].response.client_rfq_id == batch[0].client_rfq_id
+    assert isinstance(batch[1].error, InstrumentNotAllowed)
+    assert batch.errors == [batch[1]]
+    assert batch[2].response.instrument == "ETHUSD.SPOT"
+    assert batch.elapsed >= max(result.elapsed for result in batch)
+
+
+def test_trusted_trade_history(mocker: MockerFixture, trade_history: dict):
+    """Given a trusted client, test whether models are built without validation"""
+    client = B2C2Client(token="token", trusted=True)
+    fake_resp = mocker.Mock()
+    fake_resp.content = json.dumps(trade_history).encode()
+    fake_resp.status_code = HTTPStatus.OK
+    mocker.patch("requests.Session.get", return_value=fake_resp)
+    expected = [Trade(**trade) for trade in trade_history]
+    validate_model = mocker.patch("pydantic.main.validate_model")
+
+    trade_response_list = client.get_trade_history()
+    validate_model.assert_not_called()
+    assert trade_response_list == expected
+
+
+def test_parse_trade(mocker: MockerFixture, trade_history: dict):
+    """Test whether payloads are parsed like the client's, validated unless trusted"""
+    record = trade_history[0]
+    expected = Trade(**record)
+    assert B2C2Client(token="token").parse_trade(record) == expected
+    with pytest.raises(ValueError):
+        B2C2Client(token="token").parse_trade(dict(record, created="yesterday"))
+
+    validate_model = mocker.patch("pydantic.main.validate_model")
+    assert B2C2Client(token="token", trusted=True).parse_trade(record) == expected
+    validate_model.assert_not_called()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+from http import HTTPStatus
+from unittest import TestCase
+
+import requests
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.clock import ServerClock, parse_date_header
+from b2c2.api_client.execution import QUOTE_EXPIRED
+
+EPOCH = datetime.datetime(2021, 11, 9, 12, tzinfo=datetime.timezone.utc)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestServerClock(TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        # The local clock reads EPOCH when the monotonic clock reads 100.
+        self.server_clock = ServerClock(
+            clock=self.clock, wall_clock=lambda: EPOCH.timestamp()
+        )
+
+    def test_no_sample(self):
+        self.assertEqual(self.server_clock.offset, 0)
+        self.assertIsNone(self.server_clock.rtt)
+        self.assertEqual(self.server_clock.now(), EPOCH)
+
+    def test_offset(self):
+        # Server is 5 seconds ahead, the request took 0.2 seconds.
+        server_time = EPOCH + datetime.timedelta(seconds=5.1)
+        self.server_clock.observe(100.0, 100.2, server_time)
+        self.assertAlmostEqual(self.server_clock.offset, 5)
+        self.assertAlmostEqual(self.server_clock.uncertainty, 0.1)
+        self.assertAlmostEqual(self.server_clock.rtt, 0.2)
+
+        self.clock.now = 110
+        expected = EPOCH + datetime.timedelta(seconds=15)
+        self.assertAlmostEqual(
+            self.server_clock.now().timestamp(), expected.timestamp()
+        )
+
+    def test_most_accurate_sample(self):
+        self.server_clock.observe(100.0, 102.0, EPOCH + datetime.timedelta(seconds=9))
+        self.server_clock.observe(100.0, 100.2, EPOCH + datetime.timedelta(seconds=5.1))
+        self.assertAlmostEqual(self.server_clock.offset, 5)
+
+    def test_expiry(self):
+        self.server_clock.observe(100.0, 100.0, EPOCH + datetime.timedelta(seconds=5))
+        # valid_until of the API is naive, in UTC.
+        valid_until = datetime.datetime(2021, 11, 9, 12, 0, 10)
+        self.assertAlmostEqual(self.server_clock.time_left(valid_until), 5)
+        self.assertFalse(self.server_clock.has_expired(valid_until))
+        self.assertTrue(self.server_clock.has_expired(valid_until, margin=5))
+        self.clock.now = 105
+        self.assertTrue(self.server_clock.has_expired(valid_until))
+
+    def test_observe_response(self):
+        headers = {"Date": "Tue, 09 Nov 2021 12:00:05 GMT"}
+        self.server_clock.observe_response(100.0, 100.0, headers)
+        self.assertAlmostEqual(self.server_clock.offset, 5.5)
+        payload = {"created": "2021-11-09T12:00:05.200000"}
+        self.server_clock.observe_response(100.0, 100.0, headers, payload)
+        self.assertAlmostEqual(self.server_clock.offset, 5.2)
+        # Unusable headers and payloads are ignored.
+        self.server_clock.observe_response(100.0, 100.0, object(), {"created": 1})
+        self.assertAlmostEqual(self.server_clock.offset, 5.2)
+
+    def test_parse_date_header(self):
+        self.assertEqual(parse_date_header("Tue, 09 Nov 2021 12:00:00 GMT"), EPOCH)
+        self.assertIsNone(parse_date_header("yesterday"))
+        self.assertIsNone(parse_date_header(None))
+
+
+def test_expired_quote_not_executed(mocker: MockerFixture, request_for_quote: dict):
+    """Given a quote which would expire before an order reaches the server, test
+    whether no order is sent"""
+    client = B2C2Client(token="token")
+    clock = FakeClock()
+    client.server_clock = ServerClock(clock=clock)
+
+    def post(url, data=None, headers=None, timeout=None):
+        # The quote is valid for 60 seconds. It reaches us 35 seconds after its
+        # creation, and an order would take 35 more seconds to reach the server.
+        clock.now += 70
+        fake_resp = requests.Response()
+        fake_resp._content = json.dumps(request_for_quote).encode()
+        fake_resp.status_code = HTTPStatus.CREATED
+        return fake_resp
+
+    session_post = mocker.patch("requests.Session.post", side_effect=post)
+    result = client.execute_rfq("BTCUSD.SPOT", "buy", "1")
+    assert result.reason == QUOTE_EXPIRED
+    assert session_post.call_count == 1
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.coalescing import AsyncSingleFlight, SingleFlight, get_request_key
+from b2c2.api_client.exceptions import DeadlineExceeded
+from tests.api_client.test_async_client import get_async_client, run
+
+
+def make_response(payload, status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(payload).encode()
+    return response
+
+
+def test_get_request_key():
+    assert get_request_key("/balance/") == ("/balance/", ())
+    assert get_request_key("/trade/", {"offset": 10, "limit": 5}) == get_request_key(
+        "/trade/", {"limit": "5", "offset": "10"}
+    )
+
+
+def test_concurrent_calls_share_the_result():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    released = threading.Event()
+    calls = []
+
+    def function():
+        calls.append(1)
+        started.set()
+        released.wait(5)
+        return {"USD": "1"}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(single_flight.do, ("/balance/", ()), function)
+        started.wait(5)
+        followers = [
+            executor.submit(single_flight.do, ("/balance/", ()), function)
+            for _ in range(4)
+        ]
+        while single_flight.shared < 4:
+            time.sleep(0.001)
+        released.set()
+        results = [leader.result()] + [future.result() for future in followers]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert single_flight.stats() == dict(calls=1, shared=4, cache_hits=0)
+
+
+def test_concurrent_calls_share_the_error():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    released = threading.Event()
+
+    def function():
+        started.set()
+        released.wait(5)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, "key", function)
+        started.wait(5)
+        follower = executor.submit(single_flight.do, "key", function)
+        while not single_flight.shared:
+            time.sleep(0.001)
+        released.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+    # Errors are not cached.
+    assert single_flight.do("key", lambda: 1) == 1
+
+
+def test_waiting_caller_gives_up_at_its_deadline():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    released = threading.Event()
+
+    def function():
+        started.set()
+        released.wait(5)
+        return 1
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(single_flight.do, "key", function)
+        started.wait(5)
+        with pytest.raises(DeadlineExceeded):
+            single_flight.do("key", function, expires_at=time.monotonic() + 0.01)
+        released.set()
+        assert leader.result() == 1
+
+
+def test_micro_cache():
+    now = [0.0]
+    single_flight = SingleFlight(ttl=0.5, clock=lambda: now[0])
+    assert single_flight.do("key", lambda: 1) == 1
+    assert single_flight.do("key", lambda: 2) == 1
+    now[0] = 0.5
+    assert single_flight.do("key", lambda: 3) == 3
+    single_flight.clear()
+    assert single_flight.do("key", lambda: None) is None
+    assert single_flight.do("key", lambda: 4) == 4
+    assert single_flight.stats() == dict(calls=4, shared=0, cache_hits=1)
+
+
+def test_client_coalesces_concurrent_gets(mocker: MockerFixture, balance: dict):
+    released = threading.Event()
+
+    def get(url, params=None, headers=None, timeout=None):
+        released.wait(5)
+        return make_response(balance)
+
+    session_get = mocker.patch("requests.Session.get", side_effect=get)
+    client = B2C2Client(token="token", coalescing=SingleFlight(ttl=10))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(client.get_balance) for _ in range(4)]
+        while client.single_flight.calls + client.single_flight.shared < 4:
+            time.sleep(0.001)
+        released.set()
+        assert all(future.result() == futures[0].result() for future in futures)
+    assert session_get.call_count == 1
+
+    # Served by the micro-cache until an order is sent.
+    client.get_balance()
+    assert session_get.call_count == 1
+    mocker.patch("requests.Session.post", return_value=make_response({}, 201))
+    client._post("/order/", data={})
+    client.get_balance()
+    assert session_get.call_count == 2
+
+
+def test_async_client_coalesces_concurrent_gets(balance: dict):
+    requests_sent = []
+
+    async def handler(request):
+        requests_sent.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=balance)
+
+    client = get_async_client(handler)
+    client.single_flight = AsyncSingleFlight()
+
+    async def get_balances():
+        return await asyncio.gather(*(client.get_balance() for _ in range(5)))
+
+    balances = run(client, get_balances())
+    assert len(requests_sent) == 1
+    assert all(item == balances[0] for item in balances)
+    assert client.single_flight.stats() == dict(calls=1, shared=4, cache_hits=0)
+
+
+def test_async_waiting_caller_gives_up_at_its_deadline():
+    single_flight = AsyncSingleFlight(ttl=10)
+
+    async def function():
+        await asyncio.sleep(0.05)
+        return 1
+
+    async def main():
+        leader = asyncio.ensure_future(single_flight.do("key", function))
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded):
+            await single_flight.do("key", function, expires_at=time.monotonic() + 0.001)
+        assert await leader == 1
+        # The result is cached once received.
+        assert await single_flight.do("key", function) == 1
+
+    asyncio.run(main())
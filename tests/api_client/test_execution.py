@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import json
+from decimal import Decimal
+from http import HTTPStatus
+
+import httpx
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.exceptions import ConnectionLost
+from b2c2.api_client.execution import (
+    PRICE_NOT_ACCEPTABLE,
+    build_fok_order_template,
+    is_price_acceptable,
+)
+from b2c2.common.instruments import InstrumentRegistry
+from b2c2.common.models import UnknownInstrument
+from tests.api_client.test_async_client import get_async_client, run
+
+
+def get_fake_response(status_code, payload):
+    fake_resp = requests.Response()
+    fake_resp._content = json.dumps(payload).encode()
+    fake_resp.status_code = status_code
+    return fake_resp
+
+
+def test_build_fok_order_template():
+    """Given order details, test whether the payload lacks only the price"""
+    order = build_fok_order_template(
+        "BTCUSD.SPOT", "buy", Decimal("1.5"), slippage=2, executing_unit="desk"
+    )
+    assert order["order_type"] == "FOK"
+    assert order["quantity"] == "1.5"
+    assert order["acceptable_slippage_in_basis_points"] == "2"
+    assert "price" not in order
+    assert "force_open" not in order
+    assert build_fok_order_template("BTCUSD.CFD", "sell", 1)["force_open"] is False
+    with pytest.raises(UnknownInstrument):
+        build_fok_order_template("ABCDEFG.SPOT", "buy", 1)
+
+
+def test_build_execution_data_uses_the_interned_instrument(
+    mocker: MockerFixture, client: B2C2Client
+):
+    """Given an instrument name, test whether the client's registry resolves it"""
+    client.instrument_registry = InstrumentRegistry()
+    build = mocker.patch(
+        "b2c2.api_client.base.build_fok_order_template", return_value={}
+    )
+    client._build_execution_data("BTCUSD.SPOT", "buy", 1)
+    assert build.call_args[0][0] is client.instrument_registry.find("BTCUSD.SPOT")
+
+
+def test_is_price_acceptable():
+    """Given a price limit, test whether buy and sell quotes are checked against it"""
+    assert is_price_acceptable("buy", Decimal("100"), "100")
+    assert not is_price_acceptable("buy", Decimal("100.1"), 100)
+    assert is_price_acceptable("sell", Decimal("100.1"), 100)
+    assert not is_price_acceptable("sell", Decimal("99"), 100)
+    assert is_price_acceptable("sell", Decimal("99"))
+
+
+def test_execute_rfq(
+    mocker: MockerFixture, client: B2C2Client, request_for_quote: dict, order: dict
+):
+    """Given an acceptable quote, test whether a FOK order is sent at its price"""
+    session_post = mocker.patch(
+        "requests.Session.post",
+        side_effect=[
+            get_fake_response(HTTPStatus.CREATED, request_for_quote),
+            get_fake_response(HTTPStatus.CREATED, order),
+        ],
+    )
+    result = client.execute_rfq(
+        "BTCUSD.SPOT", "buy", "1", slippage=2, price_limit="60000"
+    )
+    assert result.executed
+    assert result.order.order_id == order["order_id"]
+    order_data = json.loads(session_post.call_args_list[1][1]["data"])
+    assert order_data["price"] == request_for_quote["price"]
+    assert order_data["rfq_id"] == request_for_quote["rfq_id"]
+    assert order_data["order_type"] == "FOK"
+    assert result.quote_rtt > 0 and result.order_rtt > 0
+    assert result.elapsed >= result.quote_to_order
+
+
+def test_execute_rfq_price_not_acceptable(
+    mocker: MockerFixture, client: B2C2Client, request_for_quote: dict
+):
+    """Given a quote beyond the price limit, test whether no order is sent"""
+    session_post = mocker.patch(
+        "requests.Session.post",
+        return_value=get_fake_response(HTTPStatus.CREATED, request_for_quote),
+    )
+    result = client.execute_rfq("BTCUSD.SPOT", "buy", "1", price_limit="50000")
+    assert result.order is None
+    assert result.reason == PRICE_NOT_ACCEPTABLE
+    assert session_post.call_count == 1
+
+
+def test_execute_rfq_connection_lost(mocker: MockerFixture, client: B2C2Client):
+    """Given no answer to the RFQ, test whether ConnectionLost is raised"""
+    mocker.patch(
+        "requests.Session.post", side_effect=requests.exceptions.ConnectionError()
+    )
+    with pytest.raises(ConnectionLost):
+        client.execute_rfq("BTCUSD.SPOT", "buy", "1")
+
+
+def test_execute_rfq_async(request_for_quote: dict, order: dict):
+    """Given an acceptable quote, test whether the async client sends the order"""
+
+    def handler(request):
+        if request.url.path == "/request_for_quote/":
+            return httpx.Response(HTTPStatus.CREATED, json=request_for_quote)
+        return httpx.Response(HTTPStatus.CREATED, json=order)
+
+    client = get_async_client(handler)
+    result = run(client, client.execute_rfq("BTCUSD.SPOT", "buy", "1"))
+    assert result.executed
+
+
+def test_execute_rfq_async_price_not_acceptable(request_for_quote: dict):
+    """Given a quote beyond the price limit, test whether the async client sends
+    no order"""
+    requests_sent = []
+
+    def handler(request):
+        requests_sent.append(request)
+        return httpx.Response(HTTPStatus.CREATED, json=request_for_quote)
+
+    client = get_async_client(handler)
+    result = run(
+        client, client.execute_rfq("BTCUSD.SPOT", "buy", "1", price_limit="50000")
+    )
+    assert result.order is None
+    assert result.reason == PRICE_NOT_ACCEPTABLE
+    assert len(requests_sent) == 1
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+import time
+
+import pytest
+
+from b2c2.api_client import errors
+from b2c2.api_client.executor import OrderExecutor
+
+
+class FakeClient:
+    """Records the orders in flight and answers them once released."""
+
+    def __init__(self):
+        self.released = threading.Event()
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def create_order(self, order_data):
+        with self._lock:
+            self.sent.append(order_data["client_order_id"])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.released.wait(5)
+        with self._lock:
+            self.in_flight -= 1
+        if order_data["side"] == "reject":
+            raise errors.NotEnoughBalance()
+        return order_data["client_order_id"]
+
+
+def get_order(client_order_id, instrument="BTCUSD.SPOT", side="buy"):
+    return dict(client_order_id=client_order_id, instrument=instrument, side=side)
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_futures_resolve_to_responses_and_errors():
+    client = FakeClient()
+    client.released.set()
+    with OrderExecutor(client, workers=2) as executor:
+        ok = executor.submit(get_order("1"))
+        rejected = executor.submit(
+            get_order("2", instrument="ETHUSD.SPOT", side="reject")
+        )
+        assert ok.result(5) == "1"
+        with pytest.raises(errors.NotEnoughBalance):
+            rejected.result(5)
+    stats = executor.stats()
+    assert (stats["submitted"], stats["completed"], stats["failed"]) == (2, 1, 1)
+    assert stats["latency"]["count"] == 2
+    assert stats["queue_depth"] == 0
+
+
+def test_in_flight_orders_are_capped_per_instrument():
+    client = FakeClient()
+    executor = OrderExecutor(client, workers=4, max_in_flight_per_instrument=1)
+    futures = [
+        executor.submit(get_order("btc-1")),
+        executor.submit(get_order("btc-2")),
+        executor.submit(get_order("eth-1", instrument="ETHUSD.SPOT")),
+    ]
+    # The second BTC order waits while the ETH one goes ahead.
+    wait_for(lambda: len(client.sent) == 2)
+    assert sorted(client.sent) == ["btc-1", "eth-1"]
+    assert executor.queue_depth == 1
+    assert executor.in_flight == {"BTCUSD.SPOT": 1, "ETHUSD.SPOT": 1}
+
+    client.released.set()
+    assert [future.result(5) for future in futures] == ["btc-1", "btc-2", "eth-1"]
+    executor.shutdown()
+    assert client.sent.index("btc-1") < client.sent.index("btc-2")
+
+
+def test_full_queue_and_shutdown():
+    client = FakeClient()
+    executor = OrderExecutor(client, workers=1, max_queue_size=1)
+    executor.submit(get_order("1"))
+    wait_for(lambda: client.sent)
+    pending = executor.submit(get_order("2"))
+    with pytest.raises(queue.Full):
+        executor.submit(get_order("3"), block=False)
+
+    executor.shutdown(wait=False, cancel_pending=True)
+    assert pending.cancelled()
+    with pytest.raises(RuntimeError):
+        executor.submit(get_order("4"))
+    client.released.set()
+    executor.shutdown()
+    assert client.sent == ["1"]
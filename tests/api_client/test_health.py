@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+import httpx
+import requests
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.exceptions import DeadlineExceeded
+from b2c2.api_client.health import DOWN, UNKNOWN, UP, ConnectionHealth
+from b2c2.api_client.metrics import ClientMetrics, RequestInfo
+from tests.api_client.test_async_client import get_async_client, run
+
+
+def test_state_expires_after_ttl():
+    now = [0.0]
+    health = ConnectionHealth(ttl=10, clock=lambda: now[0])
+    assert health.state == UNKNOWN
+    health.record(True)
+    assert health.state == UP
+    now[0] = 10.0
+    assert health.state == UNKNOWN
+    health.record(False)
+    health.record(False)
+    assert health.state == DOWN
+    assert health.failures == 2
+
+
+def test_observe_request_outcomes():
+    health = ConnectionHealth()
+    info = RequestInfo("get", "https://api/balance/", "/balance/")
+    info.error = requests.exceptions.ConnectionError()
+    health.observe(info)
+    assert health.state == DOWN
+    # A missed deadline says nothing about the connection.
+    health.observe(
+        RequestInfo(
+            "get", "https://api/balance/", "/balance/", error=DeadlineExceeded()
+        )
+    )
+    assert health.state == DOWN
+    health.observe(
+        RequestInfo("get", "https://api/balance/", "/balance/", status_code=500)
+    )
+    assert health.state == UP
+
+
+def test_check_only_blocks_when_down():
+    health = ConnectionHealth()
+    probed = threading.Event()
+
+    def probe():
+        probed.set()
+        return True
+
+    # Unknown: the probe runs in the background.
+    assert health.check(probe)
+    assert probed.wait(5)
+
+    calls = []
+    health.record(True)
+    assert health.check(lambda: calls.append(1))
+    assert not calls
+
+    health.record(False)
+    assert not health.check(lambda: False)
+    assert health.check(lambda: True)
+    assert health.state == UP
+
+
+def test_client_updates_health_from_requests(mocker: MockerFixture, balance: dict):
+    client = B2C2Client(token="token")
+    check_connection = mocker.patch.object(
+        client, "check_connection", return_value=True
+    )
+    mocker.patch(
+        "requests.Session.get", side_effect=requests.exceptions.ConnectionError()
+    )
+    assert client._get("/balance/") is None
+    assert client.health.state == DOWN
+
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(balance).encode()
+    mocker.patch("requests.Session.get", return_value=response)
+    client.get_balance()
+    assert client.health.state == UP
+    assert client.is_available()
+    assert not check_connection.called
+
+
+def test_check_connection_handles_timeouts(mocker: MockerFixture):
+    client = B2C2Client(token="token")
+    mocker.patch("requests.Session.get", side_effect=requests.ReadTimeout())
+    assert client.check_connection() is False
+
+
+def test_async_client_probes_when_down(balance: dict):
+    client = get_async_client(lambda request: httpx.Response(200, json=balance))
+    client.health.record(False)
+    assert run(client, client.is_available())
+    assert client.health.state == UP
+
+
+def test_async_client_close_stops_the_prober(balance: dict):
+    client = get_async_client(lambda request: httpx.Response(200, json=balance))
+    client.health.start(lambda: True, interval=60)
+    run(client, client.get_balance())
+    assert client.health._prober is None
+
+
+def test_shared_health_is_probed_until_every_start_is_stopped():
+    health = ConnectionHealth()
+    health.start(lambda: True, interval=60)
+    prober = health._prober
+    health.start(lambda: True, interval=60)
+    assert health._prober is prober
+
+    health.stop()
+    assert health._prober is prober
+    health.stop()
+    assert health._prober is None
+    prober.join(5)
+    assert not prober.is_alive()
+
+
+def test_client_close_keeps_a_shared_health():
+    health = ConnectionHealth()
+    health.start(lambda: True, interval=60)
+    B2C2Client(token="token", health=health).close()
+    assert health._prober is not None
+    health.stop()
+    assert health._prober is None
+
+
+def test_client_close_removes_its_hook_from_shared_metrics(balance: dict):
+    metrics = ClientMetrics()
+    client = B2C2Client(token="token", metrics=metrics)
+    other = B2C2Client(token="token", metrics=metrics)
+    client.close()
+    assert metrics.post_request_hooks == [other.health.observe]
+    client.close()
+    assert metrics.post_request_hooks == [other.health.observe]
+
+    async_client = get_async_client(
+        lambda request: httpx.Response(200, json=balance), metrics=metrics
+    )
+    run(async_client, async_client.get_balance())
+    assert metrics.post_request_hooks == [other.health.observe]
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import json
+from http import HTTPStatus
+from unittest import TestCase
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.errors import InstrumentNotAllowed
+from b2c2.api_client.metrics import (
+    TOTAL,
+    TTFB,
+    ClientMetrics,
+    LatencyHistogram,
+    get_endpoint_template,
+)
+
+
+class TestLatencyHistogram(TestCase):
+    def test_buckets(self):
+        for value in (0, 1, 63, 64, 65, 1000, 123_456, 10 ** 9):
+            bucket = LatencyHistogram.get_bucket(value)
+            limit = LatencyHistogram.get_bucket_limit(bucket)
+            self.assertTrue(value <= limit <= value * 1.04 + 1, value)
+
+    def test_quantiles(self):
+        histogram = LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.5, delta=0.5 * 0.04)
+        self.assertAlmostEqual(histogram.quantile(0.99), 0.99, delta=0.99 * 0.04)
+        self.assertEqual(histogram.quantile(1), 1)
+        self.assertIsNone(LatencyHistogram().quantile(0.5))
+
+
+class TestClientMetrics(TestCase):
+    def test_endpoint_template(self):
+        self.assertEqual(get_endpoint_template("/order/"), "/order/")
+        self.assertEqual(get_endpoint_template("/order/abc-123/"), "/order/{id}/")
+        self.assertEqual(get_endpoint_template("/trade/abc"), "/trade/{id}")
+
+    def test_track(self):
+        metrics = ClientMetrics()
+        calls = []
+        metrics.add_hooks(
+            pre=lambda info: calls.append(("pre", info.endpoint)),
+            post=lambda info: calls.append(("post", info.status_code)),
+        )
+        with metrics.track("get", "https://api/order/abc/") as info:
+            info.status_code = 200
+            info.elapsed = 0.1
+            info.ttfb = 0.05
+            info.response_size = 100
+        with pytest.raises(ValueError):
+            with metrics.track("get", "https://api/order/def/") as info:
+                raise ValueError()
+
+        self.assertEqual(calls[:2], [("pre", "/order/{id}/"), ("post", 200)])
+        endpoint = metrics.snapshot()["get /order/{id}/"]
+        self.assertEqual(endpoint["requests"], {200: 1})
+        self.assertEqual(endpoint["errors"], {"ValueError": 1})
+        self.assertEqual(endpoint["response_bytes"], 100)
+        self.assertEqual(endpoint["latency"][TOTAL]["count"], 1)
+        self.assertEqual(endpoint["latency"][TTFB]["count"], 1)
+
+    def test_failing_hook(self):
+        metrics = ClientMetrics()
+        metrics.add_hooks(pre=lambda info: 1 / 0)
+        with metrics.track("get", "https://api/balance/"):
+            pass
+
+    def test_prometheus(self):
+        metrics = ClientMetrics()
+        with metrics.track("post", "https://api/order/") as info:
+            info.status_code = 201
+            info.elapsed = 0.2
+        text = metrics.to_prometheus()
+        self.assertIn(
+            'b2c2_client_requests_total{method="post",endpoint="/order/",status="201"} 1',
+            text,
+        )
+        self.assertIn(
+            'b2c2_client_request_duration_seconds_count{method="post",'
+            'endpoint="/order/",phase="total"} 1',
+            text,
+        )
+        self.assertIn('quantile="0.99"} 0.2', text)
+
+
+def get_fake_response(status_code, payload):
+    fake_resp = requests.Response()
+    fake_resp._content = json.dumps(payload).encode()
+    fake_resp.status_code = status_code
+    return fake_resp
+
+
+def test_client_metrics(mocker: MockerFixture, balance: dict):
+    """Given successful and failed requests, test whether the client records them"""
+    client = B2C2Client(token="token")
+    mocker.patch(
+        "requests.Session.get", return_value=get_fake_response(HTTPStatus.OK, balance)
+    )
+    client.get_balance()
+    errors = {"errors": [{"code": 1001, "message": "Instrument not allowed"}]}
+    mocker.patch(
+        "requests.Session.post",
+        return_value=get_fake_response(HTTPStatus.BAD_REQUEST, errors),
+    )
+    with pytest.raises(InstrumentNotAllowed):
+        client.create_order({"instrument": "BTCUSD.SPOT"})
+
+    snapshot = client.metrics.snapshot()
+    assert snapshot["get /balance/"]["requests"] == {200: 1}
+    assert snapshot["get /balance/"]["response_bytes"] > 0
+    assert snapshot["post /order/"]["errors"] == {"InstrumentNotAllowed": 1}
+    assert snapshot["post /order/"]["request_bytes"] > 0
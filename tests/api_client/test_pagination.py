@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import json
+
+import httpx
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.async_api import AsyncB2C2Client
+from b2c2.api_client.errors import PaginationOffsetTooBig
+from b2c2.api_client.pagination import HistoryPaginator
+
+
+def get_trades(count):
+    """Returns `count` trades, most recent first, two of them per timestamp."""
+    start = datetime.datetime(2021, 11, 9, 12, 0, 0)
+    return [
+        {
+            "instrument": "BTCUSD.SPOT",
+            "trade_id": f"trade-{index}",
+            "origin": "rest",
+            "rfq_id": None,
+            "created": (start + datetime.timedelta(seconds=index // 2)).isoformat(),
+            "price": "57549.0",
+            "quantity": "1.0",
+            "order": f"order-{index}",
+            "side": "buy",
+            "executing_unit": "tag",
+        }
+        for index in reversed(range(count))
+    ]
+
+
+def paginate(trades, params, max_offset):
+    """Answers a GET /trade/ request like the API does."""
+    offset, limit = int(params["offset"]), int(params["limit"])
+    if offset > max_offset:
+        return 400, {"errors": [{"code": 1102, "message": "Offset too big"}]}
+    if "created__lt" in params:
+        created__lt = datetime.datetime.fromisoformat(params["created__lt"])
+        trades = [
+            trade
+            for trade in trades
+            if datetime.datetime.fromisoformat(trade["created"]) < created__lt
+        ]
+    return 200, trades[offset : offset + limit]
+
+
+def test_paginator_filters():
+    since = datetime.datetime(2021, 11, 9, 12, 0, 0)
+    paginator = HistoryPaginator("trade_id", page_size=10, since=since)
+    assert paginator.params == {
+        "since": "2021-11-09T12:00:00",
+        "offset": 0,
+        "limit": 10,
+    }
+    assert not paginator.narrow()
+
+
+def test_iter_trades(mocker: MockerFixture, client: B2C2Client):
+    """Given a long trade history, test whether every trade is yielded exactly once"""
+    trades = get_trades(25)
+
+    def get(url, params=None, headers=None, timeout=None):
+        status_code, payload = paginate(trades, params, max_offset=1000)
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = json.dumps(payload).encode()
+        return response
+
+    session_get = mocker.patch("requests.Session.get", side_effect=get)
+    trade_iterator = client.iter_trades(page_size=10)
+    first_trade = next(trade_iterator)
+    # Pages are fetched on demand.
+    assert session_get.call_count == 1
+    trade_ids = [first_trade.trade_id] + [trade.trade_id for trade in trade_iterator]
+    assert trade_ids == [trade["trade_id"] for trade in trades]
+    assert session_get.call_count == 3
+
+
+def test_iter_trades_offset_too_big(mocker: MockerFixture, client: B2C2Client):
+    """Given a PaginationOffsetTooBig error, test whether the query is narrowed"""
+    trades = get_trades(25)
+
+    def get(url, params=None, headers=None, timeout=None):
+        status_code, payload = paginate(trades, params, max_offset=5)
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = json.dumps(payload).encode()
+        return response
+
+    mocker.patch("requests.Session.get", side_effect=get)
+    trade_ids = [trade.trade_id for trade in client.iter_trades(page_size=4)]
+    assert trade_ids == [trade["trade_id"] for trade in trades]
+
+
+def test_iter_trades_offset_too_big_at_start(mocker: MockerFixture):
+    """Given a PaginationOffsetTooBig error on the first page, test whether it is raised"""
+    client = B2C2Client(token="token")
+
+    def get(url, params=None, headers=None, timeout=None):
+        response = requests.Response()
+        response.status_code = 400
+        response._content = b'{"errors": [{"code": 1102, "message": "Too big"}]}'
+        return response
+
+    mocker.patch("requests.Session.get", side_effect=get)
+    with pytest.raises(PaginationOffsetTooBig):
+        list(client.iter_orders())
+
+
+def test_async_iter_trades():
+    """Given a long trade history, test whether the async client pages through it"""
+    trades = get_trades(25)
+
+    def handler(request):
+        status_code, payload = paginate(trades, request.url.params, max_offset=5)
+        return httpx.Response(status_code, json=payload)
+
+    session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = AsyncB2C2Client(token="token", session=session)
+
+    async def get_trade_ids():
+        async with client:
+            return [trade.trade_id async for trade in client.iter_trades(page_size=4)]
+
+    trade_ids = asyncio.run(get_trade_ids())
+    assert trade_ids == [trade["trade_id"] for trade in trades]
+
+
+def test_get_trade_frame(mocker: MockerFixture, client: B2C2Client):
+    """Given a long trade history, test whether it is downloaded into a TradeFrame"""
+    pytest.importorskip("numpy")
+    trades = get_trades(25)
+
+    def get(url, params=None, headers=None, timeout=None):
+        status_code, payload = paginate(trades, params, max_offset=1000)
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = json.dumps(payload).encode()
+        return response
+
+    mocker.patch("requests.Session.get", side_effect=get)
+    frame = client.get_trade_frame(page_size=10)
+    assert frame["trade_id"].tolist() == [trade["trade_id"] for trade in trades]
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import json
+from http import HTTPStatus
+from unittest import TestCase
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.exceptions import TooManyRequests
+from b2c2.api_client.ratelimit import (
+    DEFAULT,
+    HISTORY,
+    ORDER,
+    RFQ,
+    RateLimiter,
+    RetryPolicy,
+    TokenBucket,
+    get_endpoint_group,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(rate=2, capacity=2, clock=self.clock)
+
+    def test_burst_then_wait(self):
+        self.assertEqual(self.bucket.reserve(), 0)
+        self.assertEqual(self.bucket.reserve(), 0)
+        self.assertEqual(self.bucket.reserve(), 0.5)
+        self.assertEqual(self.bucket.reserve(), 1.0)
+
+    def test_refill(self):
+        self.bucket.reserve()
+        self.bucket.reserve()
+        self.clock.now = 10
+        self.assertEqual(self.bucket.reserve(), 0)
+
+    def test_try_reserve(self):
+        self.assertTrue(self.bucket.try_reserve())
+        self.assertTrue(self.bucket.try_reserve())
+        # Not available now: nothing is taken.
+        self.assertFalse(self.bucket.try_reserve())
+        self.clock.now = 0.5
+        self.assertTrue(self.bucket.try_reserve())
+        self.bucket.pause(3)
+        self.clock.now = 10
+        self.assertEqual(self.bucket.reserve(), 0)
+
+    def test_pause(self):
+        self.bucket.pause(3)
+        self.assertEqual(self.bucket.reserve(), 3)
+        self.clock.now = 3
+        self.assertEqual(self.bucket.reserve(), 0)
+
+
+class TestRateLimiter(TestCase):
+    def test_endpoint_groups(self):
+        self.assertEqual(get_endpoint_group("post", "/request_for_quote/"), RFQ)
+        self.assertEqual(get_endpoint_group("post", "/order/"), ORDER)
+        self.assertEqual(get_endpoint_group("get", "/order/"), HISTORY)
+        self.assertEqual(get_endpoint_group("get", "/trade/abc/"), HISTORY)
+
+    def test_separate_budgets(self):
+        limiter = RateLimiter({RFQ: (1, 1), ORDER: (1, 1)}, clock=FakeClock())
+        self.assertEqual(limiter.reserve("post", "/request_for_quote/"), 0)
+        self.assertEqual(limiter.reserve("post", "/order/"), 0)
+        self.assertEqual(limiter.reserve("post", "/request_for_quote/"), 1)
+        # Groups without a budget are not limited.
+        self.assertEqual(limiter.reserve("get", "/balance/"), 0)
+
+
+class TestRetryPolicy(TestCase):
+    def test_backoff(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+        self.assertEqual(policy.get_backoff(0), 1)
+        self.assertEqual(policy.get_backoff(2), 4)
+        self.assertEqual(policy.get_backoff(10), 5)
+        self.assertEqual(policy.get_backoff(0, retry_after=3), 3)
+        self.assertTrue(0 <= RetryPolicy(backoff_factor=1).get_backoff(1) <= 2)
+
+    def test_should_retry(self):
+        policy = RetryPolicy(max_retries=1)
+        self.assertTrue(policy.should_retry(429, 0))
+        self.assertTrue(policy.should_retry(503, 0))
+        self.assertFalse(policy.should_retry(429, 1))
+        self.assertFalse(policy.should_retry(500, 0))
+        self.assertTrue(policy.should_retry(503, 0, "post", "/request_for_quote/"))
+        # Orders may have been accepted upstream, they are never retried blindly.
+        self.assertFalse(policy.should_retry(503, 0, "post", "/order/"))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("2"), 2)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+def get_fake_response(status_code, payload, headers=None):
+    fake_resp = requests.Response()
+    fake_resp._content = json.dumps(payload).encode()
+    fake_resp.status_code = status_code
+    fake_resp.headers.update(headers or {})
+    return fake_resp
+
+
+def test_retry_throttled_request(mocker: MockerFixture, balance: dict):
+    """Given a 429 response with Retry-After, test whether the request is retried"""
+    client = B2C2Client(token="token", rate_limits={DEFAULT: (1, 1)})
+    sleep = mocker.patch("b2c2.api_client.api.time.sleep")
+    mocker.patch(
+        "requests.Session.get",
+        side_effect=[
+            get_fake_response(HTTPStatus.TOO_MANY_REQUESTS, {}, {"Retry-After": "2"}),
+            get_fake_response(HTTPStatus.OK, balance),
+        ],
+    )
+
+    balance_response = client.get_balance()
+    assert balance_response["USD"] == balance["USD"]
+    # Backoff honours Retry-After, and the endpoint's budget is paused as well.
+    assert sleep.call_args_list[0][0][0] >= 2
+    assert client.rate_limiter.reserve("get", "/instruments/") > 0
+
+
+def test_retries_exhausted(mocker: MockerFixture):
+    """Given only 429 responses, test whether TooManyRequests is raised in the end"""
+    client = B2C2Client(token="token", retry_policy=RetryPolicy(max_retries=2))
+    mocker.patch("b2c2.api_client.api.time.sleep")
+    session_get = mocker.patch(
+        "requests.Session.get",
+        return_value=get_fake_response(HTTPStatus.TOO_MANY_REQUESTS, {}),
+    )
+    with pytest.raises(TooManyRequests):
+        client.get_balance()
+    assert session_get.call_count == 3
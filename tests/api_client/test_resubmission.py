@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+from decimal import Decimal
+from http import HTTPStatus
+
+import httpx
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.exceptions import (
+    ConnectionLost,
+    OrderNotReceived,
+    ServiceUnavailable,
+)
+from b2c2.api_client.execution import OrderResubmission
+from b2c2.common.models import MarketOrderRequest
+from tests.api_client.test_async_client import get_async_client, run
+
+
+def get_fake_response(status_code, payload):
+    fake_resp = requests.Response()
+    fake_resp._content = json.dumps(payload).encode()
+    fake_resp.status_code = status_code
+    return fake_resp
+
+
+def get_order_data(order: dict, seconds=10) -> dict:
+    valid_until = datetime.datetime.utcnow() + datetime.timedelta(seconds=seconds)
+    return MarketOrderRequest(
+        instrument=order["instrument"],
+        side=order["side"],
+        quantity=Decimal(order["quantity"]),
+        valid_until=valid_until,
+        executing_unit=order["executing_unit"],
+        client_order_id=order["client_order_id"],
+    ).dict()
+
+
+def test_market_order_request_keeps_client_order_id(order: dict):
+    assert get_order_data(order)["client_order_id"] == order["client_order_id"]
+    request = MarketOrderRequest(
+        instrument="BTCUSD.SPOT",
+        side="buy",
+        quantity=1,
+        valid_until=datetime.datetime.utcnow(),
+    )
+    assert request.client_order_id
+
+
+def test_order_resubmission(order: dict):
+    """Given lookups of an order, test whether it is resent while it is valid"""
+    valid_until = datetime.datetime(2021, 11, 9, tzinfo=datetime.timezone.utc)
+    expired = []
+    resubmission = OrderResubmission(
+        {"client_order_id": "abc"}, valid_until, lambda _: bool(expired), attempts=2
+    )
+    assert resubmission.lookup_endpoint == "/order/abc/"
+    assert resubmission.found(order) == order
+    with pytest.raises(ConnectionLost):
+        resubmission.found(None)
+
+    resubmission.not_found()
+    assert not resubmission.done
+    resubmission.not_found()
+    assert resubmission.done
+
+    expired.append(True)
+    with pytest.raises(OrderNotReceived):
+        resubmission.not_found()
+
+
+def test_lost_order_found_on_lookup(mocker: MockerFixture, order: dict):
+    """Given an order received by the server but whose response was lost, test that it is not sent again"""
+    session_post = mocker.patch(
+        "requests.Session.post", side_effect=requests.exceptions.Timeout()
+    )
+    session_get = mocker.patch(
+        "requests.Session.get", return_value=get_fake_response(HTTPStatus.OK, order)
+    )
+    client = B2C2Client(token="token", resubmit_orders=True)
+    order_response = client.create_order(get_order_data(order))
+    assert order_response.order_id == order["order_id"]
+    assert session_post.call_count == 1
+    assert session_get.call_args[0][0].endswith(f"/order/{order['client_order_id']}/")
+
+
+def test_missing_order_is_resent(mocker: MockerFixture, order: dict):
+    """Given an order which did not reach the server, test that it is sent again with the same identifier"""
+    session_post = mocker.patch(
+        "requests.Session.post",
+        side_effect=[
+            requests.exceptions.ConnectionError(),
+            get_fake_response(HTTPStatus.CREATED, order),
+        ],
+    )
+    mocker.patch(
+        "requests.Session.get",
+        return_value=get_fake_response(HTTPStatus.NOT_FOUND, {"detail": "Not found"}),
+    )
+    client = B2C2Client(token="token", resubmit_orders=True)
+    order_response = client.create_order(get_order_data(order))
+    assert order_response.order_id == order["order_id"]
+    payloads = [json.loads(call[1]["data"]) for call in session_post.call_args_list]
+    assert payloads[0] == payloads[1]
+
+
+def test_expired_order_is_not_resent(mocker: MockerFixture, order: dict):
+    session_post = mocker.patch(
+        "requests.Session.post", side_effect=requests.exceptions.ConnectionError()
+    )
+    mocker.patch(
+        "requests.Session.get",
+        return_value=get_fake_response(HTTPStatus.NOT_FOUND, {"detail": "Not found"}),
+    )
+    client = B2C2Client(token="token", resubmit_orders=True)
+    with pytest.raises(OrderNotReceived):
+        client.create_order(get_order_data(order, seconds=-1))
+    assert session_post.call_count == 1
+
+
+def test_unavailable_order_is_not_retried(mocker: MockerFixture, order: dict):
+    session_post = mocker.patch(
+        "requests.Session.post",
+        return_value=get_fake_response(HTTPStatus.SERVICE_UNAVAILABLE, {}),
+    )
+    client = B2C2Client(token="token")
+    with pytest.raises(ServiceUnavailable):
+        client.create_order(get_order_data(order))
+    assert session_post.call_count == 1
+
+
+def test_unavailable_order_is_looked_up(mocker: MockerFixture, order: dict):
+    """Given a 503 to an order accepted upstream, test that it is found, not sent again"""
+    session_post = mocker.patch(
+        "requests.Session.post",
+        return_value=get_fake_response(HTTPStatus.SERVICE_UNAVAILABLE, {}),
+    )
+    mocker.patch(
+        "requests.Session.get", return_value=get_fake_response(HTTPStatus.OK, order)
+    )
+    client = B2C2Client(token="token", resubmit_orders=True)
+    order_response = client.create_order(get_order_data(order))
+    assert order_response.order_id == order["order_id"]
+    assert session_post.call_count == 1
+
+
+def test_unknown_outcome_without_resubmission(mocker: MockerFixture, order: dict):
+    mocker.patch(
+        "requests.Session.post", side_effect=requests.exceptions.ConnectionError()
+    )
+    session_get = mocker.patch("requests.Session.get")
+    client = B2C2Client(token="token")
+    with pytest.raises(ConnectionLost):
+        client.create_order(get_order_data(order))
+    assert not session_get.called
+
+
+def test_async_missing_order_is_resent(order: dict):
+    posts = []
+
+    def handler(request):
+        if request.method == "GET":
+            return httpx.Response(HTTPStatus.NOT_FOUND, json={"detail": "Not found"})
+        posts.append(json.loads(request.content))
+        if len(posts) == 1:
+            raise httpx.ConnectError("Connection refused", request=request)
+        return httpx.Response(HTTPStatus.CREATED, json=order)
+
+    client = get_async_client(handler)
+    client.resubmit_orders = True
+    order_response = run(client, client.create_order(get_order_data(order)))
+    assert order_response.order_id == order["order_id"]
+    assert len(posts) == 2
+    assert posts[0]["client_order_id"] == posts[1]["client_order_id"]
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import copy
+import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.async_api import AsyncB2C2Client
+from b2c2.api_client.store import HistoryStore
+from b2c2.common.models import Side
+
+
+def filter_history(history, filters):
+    created__gte = filters.get("created__gte")
+    for record in history:
+        created = datetime.datetime.fromisoformat(record["created"])
+        if created__gte is None or created >= created__gte:
+            yield record
+
+
+class FakeClient(B2C2Client):
+    """Serves the history given, filtered with created__gte like the API."""
+
+    def __init__(self, orders, trades, trusted=False):
+        super().__init__(token="token", trusted=trusted)
+        self.history = {"/order/": orders, "/trade/": trades}
+        self.requested_filters = []
+
+    def _iter_history(self, endpoint, id_field, page_size, filters):
+        self.requested_filters.append(filters)
+        return filter_history(self.history[endpoint], filters)
+
+
+class FakeAsyncClient(AsyncB2C2Client):
+    """Serves the history given, filtered with created__gte like the API."""
+
+    def __init__(self, orders, trades):
+        super().__init__(token="token")
+        self.history = {"/order/": orders, "/trade/": trades}
+
+    async def _iter_history(self, endpoint, id_field, page_size, filters):
+        for record in filter_history(self.history[endpoint], filters):
+            yield record
+
+
+def make_trade(trade: dict, index: int, instrument: str, side: str) -> dict:
+    trade = copy.deepcopy(trade)
+    trade.update(
+        trade_id=f"trade-{index}",
+        order=f"order-{index}",
+        instrument=instrument,
+        side=side,
+        created=f"2021-11-09T12:41:{index:02d}.000000",
+    )
+    return trade
+
+
+@pytest.fixture()
+def store():
+    with HistoryStore() as store:
+        yield store
+
+
+def test_sync_and_query(store: HistoryStore, trade_history: list, order: dict):
+    """Given a history, test whether it is stored and queried locally"""
+    trade = trade_history[0]
+    trades = [
+        make_trade(trade, 1, "BTCUSD.SPOT", "buy"),
+        make_trade(trade, 2, "ETHUSD.SPOT", "sell"),
+        make_trade(trade, 3, "BTCUSD.SPOT", "sell"),
+    ]
+    client = FakeClient([order], trades)
+
+    assert store.sync(client) == (1, 3)
+    assert [t.trade_id for t in store.get_trades()] == ["trade-3", "trade-2", "trade-1"]
+    assert [t.trade_id for t in store.get_trades(instrument="BTCUSD.SPOT")] == [
+        "trade-3",
+        "trade-1",
+    ]
+    assert [t.trade_id for t in store.get_trades(side=Side.sell, limit=1)] == [
+        "trade-3"
+    ]
+    assert [
+        t.trade_id
+        for t in store.get_trades(
+            created__gte=datetime.datetime(2021, 11, 9, 12, 41, 2),
+            created__lt="2021-11-09T12:41:03",
+        )
+    ] == ["trade-2"]
+    assert store.get_order(order["client_order_id"]).order_id == order["order_id"]
+    assert store.get_trade("trade-2").instrument == "ETHUSD.SPOT"
+    assert store.get_trade("unknown") is None
+
+
+def test_delta_sync(store: HistoryStore, trade_history: list):
+    """Given a synchronized store, test whether only new records are requested"""
+    trade = trade_history[0]
+    client = FakeClient([], [make_trade(trade, 1, "BTCUSD.SPOT", "buy")])
+    store.sync(client)
+
+    client.history["/trade/"].append(make_trade(trade, 5, "BTCUSD.SPOT", "buy"))
+    # The record at the boundary timestamp is downloaded again, but not duplicated.
+    assert store.sync(client) == (0, 2)
+    assert client.requested_filters[-1]["created__gte"] == datetime.datetime(
+        2021, 11, 9, 12, 41, 1
+    )
+    assert len(store.get_trades()) == 2
+    assert store.get_last_created("trades") == datetime.datetime(2021, 11, 9, 12, 41, 5)
+
+
+def test_async_sync(store: HistoryStore, trade_history: list, order: dict):
+    """Given an async client, test whether the history is stored"""
+    trade = trade_history[0]
+    client = FakeAsyncClient([order], [make_trade(trade, 1, "BTCUSD.SPOT", "buy")])
+
+    async def sync():
+        async with client:
+            return await store.async_sync(client)
+
+    assert asyncio.run(sync()) == (1, 1)
+    assert store.get_trade("trade-1").order == "order-1"
+    assert (
+        store.get_order(order["order_id"]).client_order_id == order["client_order_id"]
+    )
+
+
+def test_sync_validates_records(store: HistoryStore, trade_history: list):
+    """Given an invalid record, test whether it is stored only by a trusted client"""
+    trade = make_trade(trade_history[0], 1, "BTCUSD.SPOT", "buy")
+    trade["origin"] = None
+
+    with pytest.raises(ValidationError):
+        store.sync(FakeClient([], [trade]))
+    assert store.get_last_created("trades") is None
+
+    assert store.sync(FakeClient([], [trade], trusted=True)) == (0, 1)
+    assert store.get_last_created("trades") == datetime.datetime(2021, 11, 9, 12, 41, 1)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from b2c2.api_client.api import B2C2Client
+from b2c2.api_client.exceptions import DeadlineExceeded
+from b2c2.api_client.hedging import HedgePolicy
+from b2c2.api_client.metrics import HEDGE_SENT, HEDGE_WON, ClientMetrics
+from b2c2.api_client.ratelimit import DEFAULT, RateLimiter
+from b2c2.api_client.timeouts import Timeouts, deadline
+from tests.api_client.test_async_client import get_async_client, run
+
+
+def make_response(payload, status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(payload).encode()
+    return response
+
+
+def test_timeouts_create():
+    assert Timeouts.create() == Timeouts()
+    assert Timeouts.create(5) == Timeouts(connect=5, read=5)
+    assert Timeouts.create((1, 2)) == Timeouts(connect=1, read=2)
+    assert Timeouts.create((1, 2, 3)) == Timeouts(connect=1, read=2, total=3)
+    timeouts = Timeouts(read=1)
+    assert Timeouts.create(timeouts) is timeouts
+
+
+def test_for_attempt_is_bounded_by_the_deadline():
+    timeouts = Timeouts(connect=3, read=10)
+    assert timeouts.for_attempt(None) == (3, 10)
+    connect, read = timeouts.for_attempt(time.monotonic() + 5)
+    assert connect == 3
+    assert 4 < read <= 5
+    with pytest.raises(DeadlineExceeded):
+        timeouts.for_attempt(time.monotonic() - 1)
+
+
+def test_nested_deadline_can_only_shorten():
+    timeouts = Timeouts()
+    assert timeouts.get_expires_at() is None
+    with deadline(1):
+        outer = timeouts.get_expires_at()
+        with deadline(10):
+            assert timeouts.get_expires_at() == outer
+        with deadline(0.1):
+            assert timeouts.get_expires_at() < outer
+    assert timeouts.get_expires_at() is None
+    assert Timeouts(total=2).get_expires_at() <= time.monotonic() + 2
+
+
+def test_timeout_is_passed_to_the_session(mocker: MockerFixture, balance: dict):
+    session_get = mocker.patch(
+        "requests.Session.get", return_value=make_response(balance)
+    )
+    client = B2C2Client(token="token", timeout=(1, 2))
+    client.get_balance()
+    assert session_get.call_args[1]["timeout"] == (1, 2)
+
+    with client.deadline(0.5):
+        client.get_balance()
+    connect, read = session_get.call_args[1]["timeout"]
+    assert connect <= 0.5 and read <= 0.5
+
+
+def test_deadline_exceeded_while_rate_limited(mocker: MockerFixture, balance: dict):
+    session_get = mocker.patch(
+        "requests.Session.get", return_value=make_response(balance)
+    )
+    client = B2C2Client(token="token", rate_limits={DEFAULT: (1, 1)})
+    client.get_balance()
+    # The next token is a second away.
+    with pytest.raises(DeadlineExceeded):
+        with client.deadline(0.1):
+            client.get_balance()
+    assert session_get.call_count == 1
+
+
+def test_hedged_get_wins_over_slow_attempt(mocker: MockerFixture, balance: dict):
+    calls = []
+    released = threading.Event()
+
+    def get(url, params=None, headers=None, timeout=None):
+        calls.append(url)
+        if len(calls) == 1:
+            released.wait(5)
+        return make_response(balance)
+
+    mocker.patch("requests.Session.get", side_effect=get)
+    metrics = ClientMetrics()
+    client = B2C2Client(
+        token="token", metrics=metrics, hedging=HedgePolicy(default_delay=0.01)
+    )
+    try:
+        assert client.get_balance()["USD"] == balance["USD"]
+    finally:
+        released.set()
+        client.close()
+    assert len(calls) == 2
+    assert metrics.hedges[("get", "/balance/", HEDGE_SENT)] == 1
+    assert metrics.hedges[("get", "/balance/", HEDGE_WON)] == 1
+
+
+def test_throttled_hedge_is_skipped(mocker: MockerFixture, balance: dict):
+    calls = []
+
+    def get(url, params=None, headers=None, timeout=None):
+        calls.append(url)
+        time.sleep(0.05)
+        return make_response(balance)
+
+    mocker.patch("requests.Session.get", side_effect=get)
+    rate_limits = RateLimiter({DEFAULT: (1, 1)}, clock=lambda: 0.0)
+    client = B2C2Client(
+        token="token",
+        rate_limits=rate_limits,
+        hedging=HedgePolicy(default_delay=0.001),
+    )
+    try:
+        client.get_balance()
+    finally:
+        client.close()
+    assert len(calls) == 1
+    assert not client.metrics.hedges
+    # The hedge which was not sent took no token.
+    assert rate_limits.buckets[DEFAULT]._tokens == 0
+
+
+def test_post_is_never_hedged(mocker: MockerFixture, request_for_quote: dict):
+    def post(url, data=None, headers=None, timeout=None):
+        time.sleep(0.05)
+        return make_response(request_for_quote, status_code=201)
+
+    session_post = mocker.patch("requests.Session.post", side_effect=post)
+    metrics = ClientMetrics()
+    client = B2C2Client(
+        token="token", metrics=metrics, hedging=HedgePolicy(default_delay=0.001)
+    )
+    client.get_rfq(
+        instrument=request_for_quote["instrument"],
+        side=request_for_quote["side"],
+        quantity=request_for_quote["quantity"],
+    )
+    client.close()
+    assert session_post.call_count == 1
+    assert not metrics.hedges
+
+
+def test_hedge_delay_follows_the_latency_quantile():
+    metrics = ClientMetrics()
+    policy = HedgePolicy(quantile=0.5, min_samples=3, default_delay=1.0)
+    assert policy.get_delay(metrics, "get", "/balance/") == 1.0
+    assert policy.get_delay(metrics, "post", "/order/") is None
+    for elapsed in (0.1, 0.1, 0.2):
+        metrics._get_histogram(("get", "/balance/", "total")).record(elapsed)
+    assert policy.get_delay(metrics, "get", "/balance/") == pytest.approx(0.1, 0.05)
+
+
+def test_async_hedged_get(balance: dict):
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json=balance)
+
+    client = get_async_client(handler)
+    client.metrics = ClientMetrics()
+    client.hedge_policy = HedgePolicy(default_delay=0.01)
+    assert run(client, client.get_balance())["USD"] == balance["USD"]
+    assert len(calls) == 2
+    assert client.metrics.hedges[("get", "/balance/", HEDGE_WON)] == 1
+
+
+def test_async_deadline(balance: dict):
+    client = get_async_client(lambda request: httpx.Response(200, json=balance))
+
+    async def get_balance():
+        with client.deadline(0):
+            return await client.get_balance()
+
+    with pytest.raises(DeadlineExceeded):
+        run(client, get_balance())
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from b2c2.common.codecs import CODECS, JSONCodec, get_codec
+from b2c2.common.models import FillOrKillOrderRequest, Side
+
+
+@pytest.fixture(params=list(CODECS))
+def codec(request):
+    try:
+        return get_codec(request.param)
+    except ImportError:
+        pytest.skip(f"{request.param} is not installed")
+
+
+def test_encode_order_request(codec: JSONCodec):
+    """Given an order request, test whether Decimal and datetime are encoded as the API expects"""
+    fok_order_request = FillOrKillOrderRequest(
+        instrument="BTCUSD.SPOT",
+        side="buy",
+        quantity=Decimal("1.0"),
+        valid_until=datetime.datetime(2021, 11, 9, 12, 41, 43, 20149),
+        executing_unit="tag",
+        price=Decimal("57635.30"),
+    )
+    data = codec.loads(codec.dumps(fok_order_request.dict()))
+    assert data["quantity"] == "1.0"
+    assert data["price"] == "57635.30"
+    assert data["side"] == "buy"
+    assert data["valid_until"] == "2021-11-09T12:41:43"
+    assert data["client_order_id"] == fok_order_request.client_order_id
+
+
+def test_round_trip(codec: JSONCodec, trade_history: list):
+    """Given a history payload, test whether it is decoded back to the same data"""
+    assert codec.loads(codec.dumps(trade_history)) == trade_history
+    assert codec.dumps({"side": Side.sell}) in (b'{"side":"sell"}', b'{"side": "sell"}')
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("pickle")
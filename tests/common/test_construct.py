@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import datetime
+from decimal import Decimal
+
+from b2c2.common.construct import construct_model, to_datetime
+from b2c2.common.models import OrderResponse, RFQResponse, Side, Trade
+
+
+def test_construct_order(order_details: dict):
+    """Given an order payload, test whether the fast path builds the same model"""
+    order = construct_model(OrderResponse, order_details)
+    assert order == OrderResponse(**order_details)
+    assert isinstance(order.trades[0], Trade)
+    assert isinstance(order.price, Decimal)
+    assert order.side is Side.buy
+
+
+def test_construct_rejected_order(order_details: dict):
+    """Given a rejected order payload, test whether optional fields stay None"""
+    payload = {**order_details, "executed_price": None, "trades": []}
+    order = construct_model(OrderResponse, payload)
+    assert order.is_rejected
+    assert order == OrderResponse(**payload)
+
+
+def test_construct_rfq(request_for_quote: dict):
+    rfq = construct_model(RFQResponse, request_for_quote)
+    assert rfq == RFQResponse(**request_for_quote)
+
+
+def test_to_datetime():
+    assert to_datetime("2017-01-01T19:45:22.025464Z") == datetime.datetime(
+        2017, 1, 1, 19, 45, 22, 25464, tzinfo=datetime.timezone.utc
+    )
+    # Formats not supported by fromisoformat fall back to pydantic's parser.
+    assert to_datetime("2017-01-01T19:45:22.0254Z").microsecond == 25400
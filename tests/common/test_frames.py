@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from b2c2.common.frames import OrderFrame, TradeFrame, to_datetime64  # noqa: E402
+
+
+def make_trade(trade_id, instrument, side, price, quantity, created):
+    return {
+        "instrument": instrument,
+        "trade_id": trade_id,
+        "origin": "rest",
+        "rfq_id": None,
+        "created": created,
+        "price": price,
+        "quantity": quantity,
+        "order": f"order-{trade_id}",
+        "side": side,
+        "executing_unit": "tag",
+    }
+
+
+@pytest.fixture
+def trades():
+    return [
+        make_trade("1", "BTCUSD.SPOT", "buy", "50000", "1", "2021-11-09T12:00:00"),
+        make_trade("2", "BTCUSD.SPOT", "sell", "60000", "0.5", "2021-11-09T12:30:00"),
+        make_trade("3", "ETHUSD.SPOT", "buy", "4000", "2", "2021-11-09T13:10:00"),
+    ]
+
+
+def test_from_records(trades: list):
+    """Given trade records, test whether the columns are built with their types"""
+    frame = TradeFrame.from_records(trades)
+    assert len(frame) == 3
+    assert frame.price.dtype == np.float64
+    assert frame.side.tolist() == [1, -1, 1]
+    assert frame.instruments.tolist() == ["BTCUSD.SPOT", "ETHUSD.SPOT"]
+    assert frame["instrument"].tolist() == [t["instrument"] for t in trades]
+    assert frame.created[0] == np.datetime64("2021-11-09T12:00:00")
+
+
+def test_groupby_instrument(trades: list):
+    """Given trades of two instruments, test whether they are aggregated by instrument"""
+    groups = TradeFrame.from_records(trades).groupby_instrument()
+    assert groups["instrument"].tolist() == ["BTCUSD.SPOT", "ETHUSD.SPOT"]
+    assert groups["count"].tolist() == [2, 1]
+    assert groups["volume"].tolist() == [1.5, 2]
+    assert groups["notional"].tolist() == [80000, 8000]
+    assert groups["vwap"][0] == pytest.approx(80000 / 1.5)
+    assert groups["net_quantity"].tolist() == [0.5, 2]
+    assert groups["cash_flow"].tolist() == [-20000, -8000]
+
+
+def test_resample(trades: list):
+    """Given trades over two hours, test whether they are aggregated by hour"""
+    frame = TradeFrame.from_records(trades)
+    buckets = frame.resample("1h")
+    assert buckets["start"].tolist() == [
+        datetime.datetime(2021, 11, 9, 12),
+        datetime.datetime(2021, 11, 9, 13),
+    ]
+    assert buckets["count"].tolist() == [2, 1]
+
+    buckets = frame.resample(datetime.timedelta(minutes=30), instrument="BTCUSD.SPOT")
+    assert buckets["volume"].tolist() == [1, 0.5]
+
+
+def test_filters(trades: list):
+    """Given a frame, test whether rows are selected by instrument and date"""
+    frame = TradeFrame.from_records(trades)
+    assert frame.for_instrument("ETHUSD.SPOT")["trade_id"].tolist() == ["3"]
+    assert len(frame.for_instrument("LTCUSD.SPOT")) == 0
+    selected = frame.between(start="2021-11-09T12:15:00", end="2021-11-09T13:00:00")
+    assert selected["trade_id"].tolist() == ["2"]
+
+
+def test_export(trades: list, tmp_path):
+    """Given a frame, test whether it is exported back to records and CSV"""
+    frame = TradeFrame.from_records(trades)
+    records = frame.to_records()
+    assert records[1]["side"] == "sell"
+    assert records[1]["price"] == 60000
+    assert records[1]["created"] == datetime.datetime(2021, 11, 9, 12, 30)
+
+    path = tmp_path / "trades.csv"
+    frame.to_csv(str(path))
+    lines = path.read_text().splitlines()
+    assert lines[0].startswith("instrument,side,created,price,quantity,trade_id")
+    assert len(lines) == 4
+
+
+def test_order_frame(order_history: list):
+    """Given orders with a rejected one, test whether the rejected one is not counted"""
+    rejected = dict(order_history[0], order_id="rejected", executed_price=None)
+    frame = OrderFrame.from_records(order_history + [rejected])
+    assert frame.rejected.tolist() == [False, True]
+    groups = frame.groupby_instrument()
+    assert groups["count"].tolist() == [1]
+    assert groups["vwap"].tolist() == [57549.0]
+
+
+def test_aware_datetimes():
+    """Given datetimes with a time zone, test whether they are converted to UTC"""
+    created = to_datetime64(["2021-11-09T13:00:00+01:00", "2021-11-09T12:00:00Z"])
+    assert created.tolist() == [datetime.datetime(2021, 11, 9, 12)] * 2
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from b2c2.common.instruments import InstrumentRegistry
+
+
+class TestInstrumentRegistry(TestCase):
+    def setUp(self) -> None:
+        self.registry = InstrumentRegistry(["BTCUSD.SPOT"])
+
+    def test_interned(self):
+        self.assertIs(
+            self.registry.get("BTCUSD.SPOT"), self.registry.get("BTCUSD.SPOT")
+        )
+        self.assertIn("BTCUSD.SPOT", self.registry)
+        self.assertIsNone(self.registry.find("ETHUSD.SPOT"))
+
+    def test_load(self):
+        loaded = self.registry.load([{"name": "USDTUSD.SPOT"}, "BTCUSD.SPOT", "X.Y"])
+        self.assertEqual(
+            [i.name for i in loaded], ["USDTUSD.SPOT", "BTCUSD.SPOT", "X.Y"]
+        )
+        self.assertIs(loaded[1], self.registry.get("BTCUSD.SPOT"))
+        self.assertEqual(loaded[0].base, "USDT")
+        self.assertEqual(self.registry.names, ["BTCUSD.SPOT", "USDTUSD.SPOT", "X.Y"])
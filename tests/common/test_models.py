@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
-from unittest import TestCase
+import datetime
+from unittest import TestCase, mock
 
-from b2c2.common.models import Instrument
+from b2c2.common.models import (
+    Instrument,
+    RFQResponse,
+    UnknownInstrument,
+    parse_instrument_name,
+)
 
 
 class TestInstrument(TestCase):
@@ -22,3 +28,47 @@ class TestInstrument(TestCase):
         self.assertEqual(btcusd_spot.type, "SPOT")
         self.assertEqual(btcusd_spot.base, "USDT")
         self.assertEqual(btcusd_spot.quote, "USD")
+
+    def test_5_3(self):
+        maticusd_spot = Instrument(name="MATICUSD.SPOT")
+        self.assertEqual(maticusd_spot.pair(), ("MATIC", "USD"))
+
+    def test_unexpected(self):
+        with self.assertRaises(UnknownInstrument):
+            Instrument(name="ABCDEFG.SPOT").pair()
+        with self.assertRaises(UnknownInstrument):
+            Instrument(name="ABCDEFG.SPOT").type
+
+    def test_parsed_once(self):
+        btcusd_cfd = Instrument(name="BTCUSD.CFD")
+        with mock.patch(
+            "b2c2.common.models.parse_instrument_name",
+            return_value=("BTC", "USD", "CFD"),
+        ) as parse:
+            self.assertEqual(btcusd_cfd.type, "CFD")
+            self.assertEqual(btcusd_cfd.pair(), ("BTC", "USD"))
+        parse.assert_called_once_with("BTCUSD.CFD")
+        self.assertEqual(parse_instrument_name.cache_info().maxsize, 1024)
+
+    def test_immutable(self):
+        btcusd_spot = Instrument(name="BTCUSD.SPOT")
+        with self.assertRaises(TypeError):
+            btcusd_spot.name = "ETHUSD.SPOT"
+        self.assertEqual(hash(btcusd_spot), hash(Instrument(name="BTCUSD.SPOT")))
+
+
+class TestRFQResponse(TestCase):
+    def test_has_expired(self):
+        # valid_until of the API is naive, in UTC.
+        rfq = RFQResponse(
+            **{**RFQResponse.sample_value(), "valid_until": "2021-11-09T12:00:00"}
+        )
+        utc = datetime.timezone.utc
+        cet = datetime.timezone(datetime.timedelta(hours=1))
+        self.assertFalse(
+            rfq.has_expired(now=datetime.datetime(2021, 11, 9, 11, 59, tzinfo=utc))
+        )
+        self.assertTrue(
+            rfq.has_expired(now=datetime.datetime(2021, 11, 9, 13, 0, tzinfo=cet))
+        )
+        self.assertTrue(rfq.has_expired())
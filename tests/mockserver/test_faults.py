@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import random
+import statistics
+from unittest import TestCase
+
+from fastapi.testclient import TestClient
+
+from b2c2.mockserver import main
+from b2c2.mockserver.faults import (
+    ConnectionDropped,
+    FaultInjector,
+    FaultProfile,
+    Latency,
+    parse_profiles,
+)
+
+
+class TestFaultInjector(TestCase):
+    def test_most_specific_profile_is_used(self):
+        injector = FaultInjector(
+            {"*": {}, "/order/": {"dropped": 0.1}, "POST /order/": {"dropped": 0.2}}
+        )
+        self.assertEqual(injector.get_profile("GET", "/balance/").dropped, 0)
+        self.assertEqual(injector.get_profile("GET", "/order/1/").dropped, 0.1)
+        self.assertEqual(injector.get_profile("POST", "/order/").dropped, 0.2)
+        self.assertIsNone(injector.get_profile("GET", "/faults/"))
+        self.assertIsNone(FaultInjector().get_profile("GET", "/balance/"))
+
+    def test_presets(self):
+        injector = FaultInjector("flaky", seed=1)
+        profile = injector.get_profile("GET", "/balance/")
+        draws = [injector.draw_error(profile) for _ in range(10000)]
+        self.assertAlmostEqual(draws.count("unavailable") / 10000, 0.02, delta=0.005)
+        self.assertAlmostEqual(draws.count(None) / 10000, 0.94, delta=0.01)
+
+    def test_invalid_profiles(self):
+        with self.assertRaises(ValueError):
+            FaultProfile(rate_limited=0.5, unavailable=0.4, dropped=0.2)
+        # Slow bodies are drawn on their own.
+        FaultProfile(unavailable=0.5, dropped=0.5, slow_body=1)
+        with self.assertRaises(ValueError):
+            FaultProfile(slow_body=1, slow_body_chunks=0)
+        for value in ("[1, 2]", {"*": 1}, {"*": "flaky"}):
+            with self.assertRaises(ValueError):
+                parse_profiles(value)
+
+    def test_latency_distributions(self):
+        rng = random.Random(1)
+        self.assertEqual(Latency(delay=0.1).sample(rng), 0.1)
+        normal = Latency(distribution="normal", delay=0.1, jitter=0.01)
+        samples = [normal.sample(rng) for _ in range(5000)]
+        self.assertAlmostEqual(statistics.mean(samples), 0.1, delta=0.001)
+        long_tail = Latency(distribution="long_tail", delay=0.01, jitter=1, max_delay=1)
+        samples = sorted(long_tail.sample(rng) for _ in range(5000))
+        self.assertAlmostEqual(samples[2500], 0.01, delta=0.001)
+        # The 99th percentile is 10 times the median.
+        self.assertGreater(samples[4950], 0.08)
+        self.assertLessEqual(samples[-1], 1)
+        with self.assertRaises(ValueError):
+            Latency(distribution="uniform")
+
+
+class TestFaultInjectionMiddleware(TestCase):
+    def setUp(self):
+        self.client = TestClient(main.app)
+        self.addCleanup(self.client.delete, "/faults/")
+
+    def set_faults(self, profiles):
+        response = self.client.put("/faults/", json=profiles)
+        self.assertEqual(response.status_code, 200)
+
+    def test_error_responses(self):
+        self.set_faults({"/balance/": {"rate_limited": 1, "retry_after": 2}})
+        response = self.client.get("/balance/")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "2.0")
+        self.assertEqual(self.client.get("/instruments/").status_code, 200)
+
+        self.set_faults({"*": FaultProfile(unavailable=1).dict()})
+        self.assertEqual(self.client.get("/instruments/").status_code, 503)
+        self.assertEqual(
+            self.client.get("/faults/").json()["injected"],
+            {"rate_limited": 1, "unavailable": 1},
+        )
+
+    def test_dropped_connection(self):
+        self.set_faults({"*": {"dropped": 1}})
+        with self.assertRaises(ConnectionDropped):
+            self.client.get("/instruments/")
+
+    def test_slow_body_is_complete(self):
+        expected = self.client.get("/instruments/").json()
+        self.set_faults({"*": {"slow_body": 1, "slow_body_delay": 0.001}})
+        self.assertEqual(self.client.get("/instruments/").json(), expected)
+
+    def test_control_endpoint(self):
+        self.set_faults("long_tail")
+        profiles = self.client.get("/faults/").json()["profiles"]
+        self.assertEqual(profiles["*"]["latency"]["distribution"], "long_tail")
+        self.assertEqual(self.client.put("/faults/", json="unknown").status_code, 400)
+        self.assertEqual(
+            self.client.put("/faults/", json={"*": {"unavailable": 2}}).status_code,
+            400,
+        )
+        too_likely = {"*": {"server_error": 0.6, "unavailable": 0.6}}
+        self.assertEqual(self.client.put("/faults/", json=too_likely).status_code, 400)
+        for invalid in ({"*": 1}, [1, 2], 5):
+            response = self.client.put("/faults/", json=invalid)
+            self.assertTrue(400 <= response.status_code < 500, response.status_code)
+        self.assertEqual(profiles, self.client.get("/faults/").json()["profiles"])
+        self.client.delete("/faults/")
+        self.assertEqual(self.client.get("/faults/").json()["profiles"], {})
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import time
+from decimal import Decimal
+from unittest import TestCase
+
+import numpy as np
+
+from b2c2.mockserver.market import MarketSimulator
+
+PRICES = {"BTCUSD.SPOT": Decimal("57497.30"), "USDTUSD.SPOT": Decimal("1.0002")}
+
+
+def get_market(**kwargs):
+    options = dict(seed=1, step=1, chunk_size=100, start=0, clock=lambda: 0)
+    options.update(kwargs)
+    return MarketSimulator(PRICES, **options)
+
+
+class TestMarketSimulator(TestCase):
+    def test_paths_start_at_the_prices(self):
+        market = get_market()
+        self.assertEqual(market.get_price("BTCUSD.SPOT", 0), Decimal("57497.30"))
+        self.assertEqual(market.get_price("USDTUSD.SPOT", 0.5), Decimal("1.0002"))
+        # Timestamps before the start get the start prices.
+        self.assertEqual(market.get_prices(-10), PRICES)
+
+    def test_same_seed_gives_same_prices(self):
+        timestamps = [1, 99, 100, 101, 1234]
+        first = [get_market().get_price("BTCUSD.SPOT", t) for t in timestamps]
+        second = [
+            get_market().get_price("BTCUSD.SPOT", t) for t in reversed(timestamps)
+        ]
+        other = [get_market(seed=2).get_price("BTCUSD.SPOT", t) for t in timestamps]
+        self.assertEqual(first, list(reversed(second)))
+        self.assertNotEqual(first, other)
+
+    def test_evicted_chunks_are_generated_again(self):
+        market = get_market(cached_chunks=2)
+        price = market.get_price("BTCUSD.SPOT", 150)
+        market.get_price("BTCUSD.SPOT", 550)
+        self.assertNotIn(1, market._chunks)
+        self.assertEqual(market.get_price("BTCUSD.SPOT", 150), price)
+
+    def test_paths_are_continuous_with_the_volatility(self):
+        market = get_market(volatility={"BTCUSD.SPOT": 0.8}, step=60, chunk_size=1000)
+        prices = np.array(
+            [
+                float(market.get_price("BTCUSD.SPOT", minute * 60))
+                for minute in range(5000)
+            ]
+        )
+        log_returns = np.diff(np.log(prices))
+        annualized = log_returns.std() * np.sqrt(365 * 24 * 60)
+        self.assertAlmostEqual(annualized, 0.8, delta=0.05)
+        # No jump across the chunk boundaries.
+        self.assertLess(np.abs(log_returns).max(), 0.01)
+        # No volatility given for USDT.
+        self.assertEqual(market.get_price("USDTUSD.SPOT", 4000 * 60), Decimal("1.0002"))
+
+    def test_next_chunk_is_generated_in_background(self):
+        now = [0.0]
+        market = get_market(clock=lambda: now[0])
+        market.start()
+        try:
+            market.get_price("BTCUSD.SPOT")
+            deadline = time.monotonic() + 5
+            while 1 not in market._chunks:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.001)
+        finally:
+            market.stop()
+
+    def test_unknown_instrument(self):
+        with self.assertRaises(KeyError):
+            get_market().get_price("NONEXISTENT.SPOT")
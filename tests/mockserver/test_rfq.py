@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import datetime
+import uuid
+from decimal import Decimal
+from unittest import TestCase
+
+from fastapi.testclient import TestClient
+
+from b2c2.api_client import errors
+from b2c2.api_client.api import B2C2Client
+from b2c2.common.models import OrderRequest, RFQResponse
+from b2c2.mockserver import main
+from b2c2.mockserver.rfq import RFQRegistry
+from b2c2.mockserver.state import MemoryBackend
+
+START = datetime.datetime(2021, 11, 1)
+
+
+def get_rfq(seconds=10, **kwargs):
+    options = dict(
+        valid_until=START + datetime.timedelta(seconds=seconds),
+        rfq_id=str(uuid.uuid4()),
+        client_rfq_id=str(uuid.uuid4()),
+        quantity=Decimal(1),
+        side="buy",
+        instrument="BTCUSD.SPOT",
+        price=Decimal("57497.30"),
+        created=START,
+    )
+    options.update(kwargs)
+    return RFQResponse(**options)
+
+
+def get_order_request(rfq: RFQResponse, **kwargs):
+    options = dict(
+        instrument=rfq.instrument,
+        side=rfq.side,
+        quantity=rfq.quantity,
+        client_order_id=str(uuid.uuid4()),
+        price=rfq.price,
+        order_type="FOK",
+        valid_until=rfq.valid_until,
+        rfq_id=rfq.rfq_id,
+    )
+    options.update(kwargs)
+    return OrderRequest(**options)
+
+
+class TestRFQRegistry(TestCase):
+    def setUp(self):
+        self.now = START
+        self.registry = RFQRegistry(clock=lambda: self.now)
+
+    def test_quote_is_used_once(self):
+        rfq = get_rfq()
+        self.registry.add("token", rfq)
+        self.assertEqual(self.registry.check("token", get_order_request(rfq)), rfq)
+        # Kept until it is consumed.
+        self.assertEqual(self.registry.check("token", get_order_request(rfq)), rfq)
+        self.registry.consume(rfq.rfq_id)
+        with self.assertRaises(errors.QuoteIsNotValid):
+            self.registry.check("token", get_order_request(rfq))
+        with self.assertRaises(errors.QuoteIsNotValid):
+            self.registry.consume(rfq.rfq_id)
+
+    def test_expired_quotes_are_evicted(self):
+        short, long = get_rfq(seconds=5), get_rfq(seconds=20)
+        self.registry.add("token", short)
+        self.registry.add("token", long)
+        self.now = START + datetime.timedelta(seconds=5)
+        with self.assertRaises(errors.QuoteIsNotValid):
+            self.registry.check("token", get_order_request(short))
+        self.assertEqual(len(self.registry), 1)
+        self.assertEqual(self.registry.check("token", get_order_request(long)), long)
+
+    def test_order_must_match_the_quote(self):
+        rfq = get_rfq()
+        self.registry.add("token", rfq)
+        mismatches = [
+            ("other", {}, errors.TheRfqDoesNotBelongToYou),
+            ("token", dict(instrument="ETHUSD.SPOT"), errors.DifferentInstrument),
+            ("token", dict(side="sell"), errors.DifferentSide),
+            ("token", dict(quantity=Decimal(2)), errors.DifferentQuantity),
+            ("token", dict(price=Decimal(1)), errors.DifferentPrice),
+        ]
+        for account, changes, error in mismatches:
+            with self.assertRaises(error):
+                self.registry.check(account, get_order_request(rfq, **changes))
+        # The quote is still there after the mismatches.
+        self.assertEqual(self.registry.check("token", get_order_request(rfq)), rfq)
+
+
+class TestOrderWithQuote(TestCase):
+    def setUp(self):
+        main.state = MemoryBackend()
+        self.client = TestClient(main.app)
+        self.headers = {"Authorization": "Token token"}
+
+    def request_for_quote(self, quantity="1"):
+        response = self.client.post(
+            "/request_for_quote/",
+            headers=self.headers,
+            json=dict(
+                instrument="BTCUSD.SPOT",
+                side="buy",
+                quantity=quantity,
+                client_rfq_id=str(uuid.uuid4()),
+            ),
+        )
+        return response.json()
+
+    def post_order(self, rfq: dict, **kwargs):
+        order = dict(
+            instrument=rfq["instrument"],
+            side=rfq["side"],
+            quantity=rfq["quantity"],
+            client_order_id=str(uuid.uuid4()),
+            price=rfq["price"],
+            order_type="FOK",
+            valid_until=rfq["valid_until"],
+            rfq_id=rfq["rfq_id"],
+            executing_unit="tag",
+        )
+        order.update(kwargs)
+        return self.client.post("/order/", headers=self.headers, json=order)
+
+    def test_order_is_executed_at_the_quoted_price(self):
+        rfq = self.request_for_quote()
+        response = self.post_order(rfq)
+        self.assertEqual(response.status_code, 200)
+        order = response.json()
+        self.assertEqual(Decimal(order["executed_price"]), Decimal(rfq["price"]))
+        self.assertEqual(order["trades"][0]["rfq_id"], rfq["rfq_id"])
+
+    def test_errors_are_returned_like_the_api(self):
+        rfq = self.request_for_quote()
+        response = self.post_order(rfq, side="sell")
+        self.assertEqual(response.status_code, 400)
+        error = response.json()["errors"][0]
+        self.assertEqual(error["code"], 1004)
+        self.assertIs(errors.get_api_error_by_code(error["code"]), errors.DifferentSide)
+
+        self.assertEqual(self.post_order(rfq).status_code, 200)
+        response = self.post_order(rfq)
+        self.assertEqual(response.json()["errors"][0]["code"], 1007)
+
+    def test_resent_order_is_a_duplicate(self):
+        rfq = self.request_for_quote()
+        client_order_id = str(uuid.uuid4())
+        self.assertEqual(
+            self.post_order(rfq, client_order_id=client_order_id).status_code, 200
+        )
+        response = self.post_order(rfq, client_order_id=client_order_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["detail"], "An order with this id already exists"
+        )
+
+    def test_rejected_order_keeps_the_quote(self):
+        rfq = self.request_for_quote(quantity="1000000")
+        response = self.post_order(rfq)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()["executed_price"])
+        self.assertIsNotNone(main.state.get_quote(rfq["rfq_id"]))
+
+    def test_execute_rfq_sends_the_quote(self):
+        api_client = B2C2Client(
+            token="token", api_url="http://testserver", session=self.client
+        )
+        result = api_client.execute_rfq("BTCUSD.SPOT", "buy", "1", executing_unit="tag")
+        self.assertTrue(result.executed)
+        self.assertEqual(result.order.executed_price, result.rfq.price)
+        self.assertEqual(result.order.trades[0].rfq_id, result.rfq.rfq_id)
+        self.assertIsNone(main.state.get_quote(result.rfq.rfq_id))
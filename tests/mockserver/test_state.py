@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+import datetime
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import TestCase, mock
+
+from fastapi.testclient import TestClient
+
+from b2c2.api_client.errors import QuoteIsNotValid
+from b2c2.api_client.pagination import HistoryPaginator
+from b2c2.common.models import OrderRequest, OrderResponse, RFQResponse, Trade
+from b2c2.mockserver import main
+from b2c2.mockserver.state import (
+    HistoryQuery,
+    MemoryBackend,
+    SQLiteBackend,
+    StateBackend,
+    _History,
+)
+
+
+def build_order_builder(
+    client_order_id,
+    quantity=Decimal(1),
+    price=Decimal(100),
+    created=None,
+    instrument="BTCUSD.SPOT",
+):
+    order_id = str(uuid.uuid4())
+    created = created or datetime.datetime.utcnow()
+
+    def build_order(filled):
+        trades = []
+        if filled:
+            trades.append(
+                Trade(
+                    instrument=instrument,
+                    trade_id=str(uuid.uuid4()),
+                    origin="rest",
+                    rfq_id=None,
+                    created=created,
+                    price=price,
+                    quantity=quantity,
+                    order=order_id,
+                    side="buy",
+                    executing_unit="tag",
+                )
+            )
+        return OrderResponse(
+            order_id=order_id,
+            client_order_id=client_order_id,
+            quantity=quantity,
+            side="buy",
+            instrument=instrument,
+            price=price,
+            executed_price=price if filled else None,
+            executing_unit="tag",
+            trades=trades,
+            created=created,
+        )
+
+    return build_order
+
+
+def build_rfq(seconds=10):
+    created = datetime.datetime.utcnow()
+    return RFQResponse(
+        valid_until=created + datetime.timedelta(seconds=seconds),
+        rfq_id=str(uuid.uuid4()),
+        client_rfq_id=str(uuid.uuid4()),
+        quantity=Decimal(1),
+        side="buy",
+        instrument="BTCUSD.SPOT",
+        price=Decimal(100),
+        created=created,
+    )
+
+
+def build_quoted_order_builder(backend, rfq, client_order_id):
+    build_order = build_order_builder(client_order_id, price=rfq.price)
+
+    def build_quoted_order(filled):
+        if filled:
+            backend.consume_quote(rfq.rfq_id)
+        return build_order(filled)
+
+    return build_quoted_order
+
+
+class BackendTestMixin:
+    def create_backend(self, retention=0):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.backend = self.create_backend()
+
+    def buy(self, account, client_order_id, amount, **kwargs):
+        changes = {"USD": -Decimal(amount), "BTC": Decimal(1)}
+        return self.backend.place_order(
+            account,
+            client_order_id,
+            changes,
+            build_order_builder(client_order_id, **kwargs),
+        )
+
+    def place_history(self):
+        # Orders created every minute, alternating BTC and ETH, inserted unsorted.
+        start = datetime.datetime(2021, 1, 1)
+        for minute in (3, 0, 4, 1, 5, 2):
+            instrument = "BTCUSD.SPOT" if minute % 2 else "ETHUSD.SPOT"
+            self.buy(
+                "token",
+                str(minute),
+                1,
+                created=start + datetime.timedelta(minutes=minute),
+                instrument=instrument,
+            )
+        return start
+
+    def test_history_is_listed_newest_first_with_filters(self):
+        start = self.place_history()
+
+        def list_ids(**kwargs):
+            orders = self.backend.list_orders("token", HistoryQuery(**kwargs))
+            return [order.client_order_id for order in orders]
+
+        self.assertEqual(list_ids(), ["5", "4", "3", "2", "1", "0"])
+        self.assertEqual(list_ids(offset=1, limit=2), ["4", "3"])
+        self.assertEqual(list_ids(offset=5, limit=2), ["0"])
+        self.assertEqual(list_ids(offset=6), [])
+        self.assertEqual(list_ids(instrument="BTCUSD.SPOT"), ["5", "3", "1"])
+        self.assertEqual(
+            list_ids(
+                created__gte=start + datetime.timedelta(minutes=1),
+                created__lt=start + datetime.timedelta(minutes=4),
+            ),
+            ["3", "2", "1"],
+        )
+        trades = self.backend.list_trades(
+            "token", HistoryQuery(instrument="ETHUSD.SPOT", limit=2)
+        )
+        self.assertEqual([trade.created.minute for trade in trades], [4, 2])
+
+    def test_oldest_history_is_evicted(self):
+        self.backend = self.create_backend(retention=4)
+        self.place_history()
+        orders = self.backend.list_orders("token")
+        self.assertEqual(
+            [order.client_order_id for order in orders], ["5", "4", "3", "2"]
+        )
+        self.assertEqual(len(self.backend.list_trades("token")), 4)
+        self.assertIsNone(self.backend.get_order("token", "0"))
+        self.assertEqual(
+            len(
+                self.backend.list_orders(
+                    "token", HistoryQuery(instrument="ETHUSD.SPOT")
+                )
+            ),
+            2,
+        )
+        # The identifier of an evicted order can not be used again.
+        self.assertIsNone(self.buy("token", "0", 1))
+
+    def test_concurrent_orders_do_not_overdraw(self):
+        # 400000 USD cover 10 orders of 40000 USD.
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            orders = list(
+                executor.map(
+                    lambda index: self.buy("token", str(index), 40000), range(40)
+                )
+            )
+        filled = [order for order in orders if not order.is_rejected]
+        self.assertEqual(len(filled), 10)
+        balance = self.backend.get_balance("token")
+        self.assertEqual(balance["USD"], Decimal(0))
+        self.assertEqual(balance["BTC"], Decimal(10))
+        self.assertEqual(len(self.backend.list_orders("token")), 40)
+        self.assertEqual(len(self.backend.list_trades("token")), 10)
+
+    def test_client_order_id_is_used_once(self):
+        order = self.buy("token", "same-id", 1)
+        self.assertIsNone(self.buy("token", "same-id", 1))
+        self.assertEqual(self.backend.get_balance("token")["USD"], Decimal(399999))
+        self.assertEqual(self.backend.get_order("token", "same-id"), order)
+        self.assertEqual(self.backend.get_order("token", order.order_id), order)
+        trade = order.trades[0]
+        self.assertEqual(self.backend.get_trade("token", trade.trade_id), trade)
+
+    def test_quote_is_used_by_one_filled_order(self):
+        rfq = build_rfq()
+        self.backend.add_quote("token", rfq)
+        self.assertEqual(self.backend.get_quote(rfq.rfq_id), ("token", rfq))
+        order_request = OrderRequest(
+            instrument=rfq.instrument,
+            side=rfq.side,
+            quantity=rfq.quantity,
+            client_order_id="1",
+            price=rfq.price,
+            order_type="FOK",
+            valid_until=rfq.valid_until,
+            rfq_id=rfq.rfq_id,
+            executing_unit="tag",
+        )
+        self.assertEqual(self.backend.check_quote("token", order_request), rfq)
+
+        changes = {"USD": -rfq.price, "BTC": rfq.quantity}
+        build_order = build_quoted_order_builder(self.backend, rfq, "1")
+        self.backend.place_order("token", "1", changes, build_order)
+        self.assertIsNone(self.backend.get_quote(rfq.rfq_id))
+        build_order = build_quoted_order_builder(self.backend, rfq, "2")
+        with self.assertRaises(QuoteIsNotValid):
+            self.backend.place_order("token", "2", changes, build_order)
+        self.assertIsNone(self.backend.get_order("token", "2"))
+        self.assertEqual(self.backend.get_balance("token")["USD"], Decimal(399900))
+
+    def test_expired_quote_is_not_valid(self):
+        rfq = build_rfq(seconds=-1)
+        self.backend.add_quote("token", rfq)
+        self.assertIsNone(self.backend.get_quote(rfq.rfq_id))
+
+    def test_accounts_are_separate(self):
+        self.buy("first", "1", 400000)
+        self.assertEqual(self.backend.get_balance("first")["USD"], Decimal(0))
+        self.assertEqual(self.backend.get_balance("second")["USD"], Decimal(400000))
+        self.assertIsNone(self.backend.get_order("second", "1"))
+        self.assertEqual(self.backend.list_orders("second"), [])
+
+
+class TestMemoryBackend(BackendTestMixin, TestCase):
+    def create_backend(self, retention=0):
+        return MemoryBackend(retention)
+
+
+class TestStateBackend(TestCase):
+    def test_incomplete_backend_can_not_be_created(self):
+        class IncompleteBackend(StateBackend):
+            def get_balance(self, account):
+                return {}
+
+        with self.assertRaises(TypeError):
+            IncompleteBackend()
+
+
+class TestHistory(TestCase):
+    def test_eviction_keeps_the_most_recent_records(self):
+        history = _History(retention=5)
+        start = datetime.datetime(2021, 1, 1)
+        kept = []
+        # Mostly in creation order, with late records older than the kept ones.
+        minutes = list(range(40)) + [2, 37, 38] + list(range(40, 60))
+        for index, minute in enumerate(minutes):
+            order = build_order_builder(
+                str(index),
+                created=start + datetime.timedelta(minutes=minute),
+                instrument="BTCUSD.SPOT" if index % 3 else "ETHUSD.SPOT",
+            )(True)
+            history.add(order.order_id, order)
+            kept = sorted(kept + [(order.created, index, order)])[-5:]
+            self.assertEqual(len(history), len(kept))
+            self.assertEqual(
+                [order.client_order_id for order in history.select()],
+                [order.client_order_id for _, _, order in reversed(kept)],
+            )
+            self.assertEqual(
+                [
+                    order.client_order_id
+                    for order in history.select(HistoryQuery(instrument="ETHUSD.SPOT"))
+                ],
+                [
+                    order.client_order_id
+                    for _, _, order in reversed(kept)
+                    if order.instrument == "ETHUSD.SPOT"
+                ],
+            )
+        self.assertLess(len(history._index), 11)
+
+
+class TestSQLiteBackend(BackendTestMixin, TestCase):
+    def create_backend(self, retention=0):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return SQLiteBackend(os.path.join(directory.name, "state.sqlite3"), retention)
+
+    def test_quotes_are_shared_by_the_workers(self):
+        other = SQLiteBackend(self.backend.path)
+        rfq = build_rfq()
+        self.backend.add_quote("token", rfq)
+        self.assertEqual(other.get_quote(rfq.rfq_id), ("token", rfq))
+        changes = {"USD": -rfq.price, "BTC": rfq.quantity}
+        other.place_order(
+            "token", "1", changes, build_quoted_order_builder(other, rfq, "1")
+        )
+        self.assertIsNone(self.backend.get_quote(rfq.rfq_id))
+
+    def test_quote_is_kept_if_the_order_is_not_placed(self):
+        rfq = build_rfq()
+        self.backend.add_quote("token", rfq)
+        build_order = build_quoted_order_builder(self.backend, rfq, "1")
+
+        def failing_build_order(filled):
+            build_order(filled)
+            raise ValueError()
+
+        changes = {"USD": -rfq.price, "BTC": rfq.quantity}
+        with self.assertRaises(ValueError):
+            self.backend.place_order("token", "1", changes, failing_build_order)
+        self.assertEqual(self.backend.get_quote(rfq.rfq_id), ("token", rfq))
+
+
+class TestOrderEndpoint(TestCase):
+    def setUp(self):
+        main.state = MemoryBackend()
+        self.client = TestClient(main.app)
+
+    def post_order(self, token, client_order_id, quantity="1"):
+        return self.client.post(
+            "/order/",
+            headers={"Authorization": f"Token {token}"},
+            json=dict(
+                instrument="BTCUSD.SPOT",
+                side="buy",
+                quantity=quantity,
+                client_order_id=client_order_id,
+                price="1000000",
+                order_type="FOK",
+                valid_until="2030-01-01T00:00:00",
+                executing_unit="tag",
+            ),
+        )
+
+    def test_orders_are_kept_by_token(self):
+        response = self.post_order("token", "1")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.json()["executed_price"])
+        self.assertEqual(self.post_order("token", "1").status_code, 400)
+        self.assertEqual(
+            self.client.get(
+                "/order/1/", headers={"Authorization": "Token token"}
+            ).status_code,
+            200,
+        )
+        self.assertEqual(
+            self.client.get(
+                "/order/1/", headers={"Authorization": "Token other"}
+            ).status_code,
+            404,
+        )
+
+    def test_insufficient_balance_is_rejected(self):
+        response = self.post_order("token", "1", quantity="100")
+        self.assertIsNone(response.json()["executed_price"])
+        balance = self.client.get("/balance/", headers={"Authorization": "Token token"})
+        self.assertEqual(Decimal(balance.json()["USD"]), Decimal(400000))
+
+    def test_history_pages_through_offset_limit(self):
+        for index in range(5):
+            self.post_order("token", str(index))
+        response = self.client.get(
+            "/order/",
+            params={"offset": 1, "limit": 2},
+            headers={"Authorization": "Token token"},
+        )
+        self.assertEqual(
+            [order["client_order_id"] for order in response.json()], ["3", "2"]
+        )
+
+    def test_client_paginator_narrows_on_offset_too_big(self):
+        for index in range(7):
+            self.post_order("token", str(index), quantity="0.1")
+        paginator = HistoryPaginator("trade_id", page_size=2)
+        trades = []
+        errors = 0
+        with mock.patch.object(main, "MAX_PAGINATION_OFFSET", 3):
+            while not paginator.done:
+                response = self.client.get(
+                    "/trade/",
+                    params=paginator.params,
+                    headers={"Authorization": "Token token"},
+                )
+                if response.status_code == 400:
+                    self.assertEqual(response.json()["errors"][0]["code"], 1102)
+                    errors += 1
+                    self.assertTrue(paginator.narrow())
+                    continue
+                trades.extend(paginator.feed(response.json()))
+        self.assertGreater(errors, 0)
+        self.assertEqual(len({trade["trade_id"] for trade in trades}), 7)
+        self.assertEqual(len(trades), 7)
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal
+from unittest import TestCase
+
+from fastapi import HTTPException
+
+from b2c2.mockserver import utils
+
+
+class TestInstruments(TestCase):
+    def test_get_pair(self):
+        self.assertEqual(utils.get_pair("BTCUSD.SPOT"), ("BTC", "USD"))
+        self.assertEqual(utils.get_pair("USDTUSD.SPOT"), ("USDT", "USD"))
+        self.assertEqual(utils.get_instrument_type("BTCUSD.CFD"), "CFD")
+
+    def test_unknown_instrument(self):
+        with self.assertRaises(HTTPException):
+            utils.get_pair("NONEXISTENT.SPOT")
+
+    def test_get_price(self):
+        self.assertIsInstance(utils.get_price("BTCUSD.SPOT"), Decimal)
+        with self.assertRaises(HTTPException):
+            utils.get_price("NONEXISTENT.SPOT")